@@ -0,0 +1,70 @@
+"""Measure aggregate tokens/s across replica counts and threads per replica.
+
+Each layout starts a ReplicaPool, fires ``--requests`` concurrent completions
+and reports aggregate throughput, so the best split of cores between replicas
+and intra-op threads can be picked for a host.
+
+Run with ``python -m benchmarks.bench_replicas --replicas 1,2,4 --threads 4,8,16``.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+from src.models import ModelSettings
+from src.replicas import ReplicaPool, available_cpus, numa_nodes
+
+PROMPT = [{"role": "user", "content": "Write three short sentences about local-first software."}]
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def run(replica_counts: List[int], thread_counts: List[int], requests: int, max_new_tokens: int) -> None:
+    settings = ModelSettings(max_new_tokens=max_new_tokens)
+    cpus = available_cpus()
+    print(f"host: {len(cpus)} CPUs across {len(numa_nodes(cpus))} NUMA node(s); model {settings.model_id}")
+    print(f"{'replicas':>8} {'threads':>7} {'tokens':>7} {'seconds':>8} {'tok/s':>8} {'p50 s':>7} {'max s':>7}")
+
+    best = None
+    for replicas in replica_counts:
+        for threads in thread_counts:
+            if replicas * threads > 2 * len(cpus):
+                continue
+            pool = ReplicaPool(settings, replicas=replicas, threads_per_replica=threads).start()
+            try:
+                pool.generate_completion(PROMPT)  # warm every code path once
+                start = time.perf_counter()
+                futures = [pool.submit(PROMPT) for _ in range(requests)]
+                results = [future.result() for future in futures]
+                elapsed = time.perf_counter() - start
+            finally:
+                pool.shutdown()
+            tokens = sum(result.tokens for result in results)
+            latencies = sorted(result.seconds for result in results)
+            throughput = tokens / elapsed
+            print(
+                f"{replicas:>8} {threads:>7} {tokens:>7} {elapsed:>8.2f} {throughput:>8.1f} "
+                f"{latencies[len(latencies) // 2]:>7.2f} {latencies[-1]:>7.2f}"
+            )
+            if best is None or throughput > best[0]:
+                best = (throughput, replicas, threads)
+
+    if best:
+        print(f"best: {best[1]} replicas x {best[2]} threads ({best[0]:.1f} tokens/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=_ints, default=[1, 2, 4])
+    parser.add_argument("--threads", type=_ints, default=[2, 4, 8])
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    args = parser.parse_args()
+    run(args.replicas, args.threads, args.requests, args.max_new_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark the todo store: add, list and complete at 10k+ items.
+
+Run with ``python -m benchmarks.bench_todo --items 20000``.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from src.tools.todo import TodoStore
+
+
+def _timed(label: str, count: int, func) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    per_op = elapsed / max(count, 1) * 1e6
+    print(f"{label:<28} {count:>7} ops  {elapsed:8.3f}s  {per_op:9.1f} µs/op")
+
+
+def run(items: int, list_calls: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TodoStore(Path(tmp) / "todo.db")
+
+        _timed("add", items, lambda: [store.add(f"todo {index}") for index in range(items)])
+        _timed("list (page of 50)", list_calls, lambda: [store.list(limit=50, offset=index * 50 % items) for index in range(list_calls)])
+        _timed("list open (page of 50)", list_calls, lambda: [store.list(completed=False, limit=50) for _ in range(list_calls)])
+        _timed("complete", items // 2, lambda: [store.complete(todo_id) for todo_id in range(1, items, 2)])
+        _timed("list done (page of 50)", list_calls, lambda: [store.list(completed=True, limit=50) for _ in range(list_calls)])
+        _timed("list all", 1, lambda: store.list())
+        store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--list-calls", type=int, default=1_000)
+    args = parser.parse_args()
+    run(args.items, args.list_calls)
+
+
+if __name__ == "__main__":
+    main()
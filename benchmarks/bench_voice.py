@@ -0,0 +1,78 @@
+"""Benchmark the voice pipeline without a microphone.
+
+Runs VAD segmentation and transcription over a WAV file and reports model load
+time, per-utterance latency and real-time factor. Without ``--wav`` a synthetic
+tone/silence file is generated and only VAD is timed.
+
+Run with ``python -m benchmarks.bench_voice --wav sample.wav``.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import tempfile
+import time
+import wave
+from array import array
+from pathlib import Path
+
+from src.voice import SAMPLE_RATE, EnergyVAD, Transcriber, WavFileSource
+
+
+def _synthetic_wav(path: Path, utterances: int) -> None:
+    samples = array("h")
+    for _ in range(utterances):
+        samples.extend(0 for _ in range(int(0.8 * SAMPLE_RATE)))
+        samples.extend(int(8000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) for i in range(int(1.5 * SAMPLE_RATE)))
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+
+
+def run(wav_path: Path, transcribe: bool, whisper_model: str) -> None:
+    with wave.open(str(wav_path), "rb") as wav:
+        audio_seconds = wav.getnframes() / wav.getframerate()
+
+    start = time.perf_counter()
+    segments = list(EnergyVAD().segments(WavFileSource(wav_path).frames()))
+    vad_seconds = time.perf_counter() - start
+    print(f"audio: {audio_seconds:.1f}s  utterances: {len(segments)}  VAD: {vad_seconds * 1000:.1f} ms "
+          f"(RTF {vad_seconds / audio_seconds:.4f})")
+    if not transcribe:
+        return
+
+    transcriber = Transcriber(whisper_model)
+    transcriber.load()
+    print(f"speech model load: {transcriber.load_seconds:.2f}s (paid once per session)")
+    total = 0.0
+    for index, segment in enumerate(segments, start=1):
+        start = time.perf_counter()
+        text = transcriber.transcribe(segment)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        seconds = len(segment) / (2 * SAMPLE_RATE)
+        print(f"#{index:<3} {seconds:5.2f}s audio  {elapsed * 1000:8.1f} ms  {text!r}")
+    if segments:
+        print(f"mean transcription latency: {total / len(segments) * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wav", type=Path, help="16-bit PCM WAV file to process.")
+    parser.add_argument("--utterances", type=int, default=20, help="Utterances in the synthetic file.")
+    parser.add_argument("--whisper-model", default="base")
+    args = parser.parse_args()
+
+    if args.wav:
+        run(args.wav, transcribe=True, whisper_model=args.whisper_model)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "synthetic.wav"
+        _synthetic_wav(path, args.utterances)
+        run(path, transcribe=False, whisper_model=args.whisper_model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# peft's name for "no adapter" inside a mixed-adapter batch.
+BASE_ADAPTER = "__base__"
+
+
+@dataclass
+class AdapterStats:
+    """Cost of one adapter on the shared base model."""
+
+    name: str
+    path: Optional[str]
+    parameter_bytes: int = 0
+    load_seconds: float = 0.0
+    switches: int = 0
+    switch_seconds: float = 0.0
+
+    @property
+    def mean_switch_ms(self) -> float:
+        return 1000 * self.switch_seconds / self.switches if self.switches else 0.0
+
+
+class AdapterManager:
+    """Hot-swaps LoRA adapters on a pipeline's single base model.
+
+    The first adapter wraps ``pipe.model`` in a ``peft.PeftModel``; later ones are
+    added to it. Only one adapter can be active at a time. :meth:`use` holds it
+    active for a generation: requests on the active adapter run concurrently,
+    and a request for another one waits until they finish, then switches. The
+    lock is held only while switching or loading, never during generation.
+    Mixed batches go through :meth:`use_mixed`, which passes peft's per-row
+    ``adapter_names`` and can share the model with any non-base adapter.
+    """
+
+    def __init__(self, pipe) -> None:
+        self.pipe = pipe
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._names: Dict[str, str] = {}
+        self._stats: Dict[str, AdapterStats] = {BASE_ADAPTER: AdapterStats(name=BASE_ADAPTER, path=None)}
+        self._active: Optional[str] = BASE_ADAPTER
+        # Generations running with ``_active`` in place, and requests waiting to switch away from it.
+        self._users = 0
+        self._switches_waiting = 0
+
+    @property
+    def loaded(self) -> bool:
+        return len(self._names) > 0
+
+    @property
+    def supports_mixed_batch(self) -> bool:
+        """peft LoRA layers accept per-row ``adapter_names`` at generation time."""
+        config = getattr(self.pipe.model, "peft_config", {}) or {}
+        return bool(config) and all(getattr(item, "peft_type", None) == "LORA" for item in config.values())
+
+    def _adapter_name(self, path: str) -> str:
+        stem = re.sub(r"\W", "_", Path(path).name) or "adapter"
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:6]
+        return f"{stem}_{digest}"
+
+    def load(self, path: str) -> AdapterStats:
+        """Load the adapter at ``path`` (idempotent) and return its stats."""
+        with self._lock:
+            name = self._names.get(path)
+            if name is not None:
+                return self._stats[name]
+            # Adding modules changes the model, so wait until no generation is using it.
+            self._wait_until(lambda: False)
+            try:
+                from peft import PeftModel
+            except ImportError as exc:  # pragma: no cover - optional dependency
+                raise ImportError("Install `peft` to use per-agent LoRA adapters.") from exc
+
+            name = self._adapter_name(path)
+            start = time.perf_counter()
+            model = self.pipe.model
+            if isinstance(model, PeftModel):
+                model.load_adapter(path, adapter_name=name)
+            else:
+                model = PeftModel.from_pretrained(model, path, adapter_name=name)
+                model.eval()
+                self.pipe.model = model
+            stats = AdapterStats(name=name, path=path, load_seconds=time.perf_counter() - start)
+            stats.parameter_bytes = sum(
+                param.numel() * param.element_size()
+                for param_name, param in model.named_parameters()
+                if f".{name}." in param_name
+            )
+            self._names[path] = name
+            self._stats[name] = stats
+            # PeftModel activates the adapter it was built with; restore whatever was active.
+            self._activate(self._active)
+            logger.info(
+                "Loaded adapter %s (%.1f MB) in %.2fs", path, stats.parameter_bytes / 2**20, stats.load_seconds
+            )
+            return stats
+
+    def _activate(self, name: Optional[str]) -> None:
+        model = self.pipe.model
+        if name == BASE_ADAPTER:
+            # Leaves the LoRA weights resident; only their contribution is switched off.
+            model.base_model.disable_adapter_layers()
+        else:
+            model.base_model.enable_adapter_layers()
+            model.set_adapter(name)
+        self._active = name
+
+    def _wait_until(self, compatible) -> None:
+        """Block (lock held) until the model is idle or ``compatible()`` lets this request join its users.
+
+        A request that needs a switch is counted in ``_switches_waiting``; while
+        one is waiting, new requests wait too instead of joining, so the switch
+        is not starved by a stream of requests for the active adapter.
+        """
+        waiting = False
+        try:
+            while self._users and (not compatible() or (self._switches_waiting and not waiting)):
+                if not waiting and not compatible():
+                    waiting = True
+                    self._switches_waiting += 1
+                self._idle.wait()
+        finally:
+            if waiting:
+                self._switches_waiting -= 1
+
+    def _enter(self, name: str) -> None:
+        self._wait_until(lambda: name == self._active)
+        if self.loaded and name != self._active:
+            start = time.perf_counter()
+            self._activate(name)
+            stats = self._stats[name]
+            stats.switches += 1
+            stats.switch_seconds += time.perf_counter() - start
+        self._users += 1
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if not self._users:
+                self._idle.notify_all()
+
+    @contextmanager
+    def use(self, adapter_path: Optional[str]) -> Iterator[None]:
+        """Hold the model with ``adapter_path`` (or the bare base model for None) active."""
+        with self._lock:
+            self._enter(self.load(adapter_path).name if adapter_path else BASE_ADAPTER)
+        try:
+            yield
+        finally:
+            self._leave()
+
+    @contextmanager
+    def use_mixed(self, adapter_paths: List[Optional[str]]) -> Iterator[Dict[str, Any]]:
+        """Yield generate kwargs routing each batch row through its own adapter."""
+        with self._lock:
+            names = [self.load(path).name if path else BASE_ADAPTER for path in adapter_paths]
+            # Rows pick their adapter themselves; the layers only have to be enabled.
+            self._wait_until(lambda: self._active != BASE_ADAPTER)
+            if self._active == BASE_ADAPTER:
+                self._activate(next(name for name in names if name != BASE_ADAPTER))
+            self._users += 1
+        try:
+            yield {"adapter_names": names}
+        finally:
+            self._leave()
+
+    def report(self) -> List[AdapterStats]:
+        return [stats for stats in self._stats.values() if stats.path is not None or stats.switches]
+
+
+__all__ = ["AdapterManager", "AdapterStats", "BASE_ADAPTER"]
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .cancellation import CancellationToken, CancelledError
+from .models import ModelSettings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Lower rank is served first.
+PRIORITIES: Dict[str, int] = {INTERACTIVE: 0, BATCH: 1}
+# Poll interval while queued, so cancellation and deadlines are noticed promptly.
+_WAIT_SLICE = 0.05
+# Weight of the newest call in the running estimate of service time.
+_EWMA_ALPHA = 0.2
+
+
+class OverloadedError(RuntimeError):
+    """Raised when a generation request is shed; ``retry_after`` is a suggested back-off in seconds."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionStats:
+    """Point-in-time view of the controller, for dashboards and tuning."""
+
+    queue_depth: int
+    in_flight: int
+    peak_depth: int
+    admitted: int
+    shed: Dict[str, int]
+    degraded_tokens: int
+    degraded_model: int
+    wait_p50: float
+    wait_p99: float
+    service_seconds: Optional[float]
+    slo_seconds: float
+
+
+@dataclass
+class _Ticket:
+    priority: str
+    enqueued: float
+    granted: bool = False
+    rejected: Optional[OverloadedError] = None
+    event: threading.Event = field(default_factory=threading.Event)
+
+
+class AdmissionController:
+    """Bounded, priority-ordered gate in front of model calls with an SLO on queue wait.
+
+    At most ``concurrency`` calls run at once; up to ``max_queue`` more wait,
+    interactive before batch. A request is shed with :class:`OverloadedError`
+    when the queue is full (a queued batch request is evicted first to make
+    room for an interactive one) or when its predicted wait exceeds
+    ``reject_factor`` times the SLO (just the SLO for batch requests).
+    Admitted requests degrade instead of failing once the wait they saw, or
+    the backlog behind them, exceeds the SLO: ``max_new_tokens`` is capped at
+    ``degraded_max_new_tokens``, and beyond twice the SLO the call switches to
+    ``fallback_model_id`` when one is configured.
+    """
+
+    def __init__(
+        self,
+        settings: ModelSettings | None = None,
+        concurrency: int = 1,
+        max_queue: int = 16,
+        slo_seconds: float = 2.0,
+        degraded_max_new_tokens: int = 128,
+        fallback_model_id: Optional[str] = None,
+        reject_factor: float = 4.0,
+        window: int = 256,
+    ) -> None:
+        if concurrency < 1 or max_queue < 0 or slo_seconds <= 0:
+            raise ValueError("concurrency must be >= 1, max_queue >= 0 and slo_seconds > 0.")
+        self.settings = settings or ModelSettings()
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.slo_seconds = slo_seconds
+        self.degraded_max_new_tokens = degraded_max_new_tokens
+        self.fallback_model_id = fallback_model_id
+        self.reject_factor = reject_factor
+        self._lock = threading.Lock()
+        self._waiting: List[Tuple[int, int, _Ticket]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._service: Optional[float] = None
+        self._waits: Deque[float] = deque(maxlen=window)
+        self._peak_depth = 0
+        self._admitted = 0
+        self._shed: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._degraded_tokens = 0
+        self._degraded_model = 0
+
+    @classmethod
+    def from_settings(cls, settings: ModelSettings | None = None, allow_fallback: bool = True) -> "AdmissionController":
+        """Build from ``SMOLMIND_ADMISSION_*`` settings; pass ``allow_fallback=False`` when calls go to replicas."""
+        settings = settings or ModelSettings()
+        return cls(
+            settings,
+            concurrency=settings.admission_concurrency or settings.replicas,
+            max_queue=settings.admission_max_queue,
+            slo_seconds=settings.queue_slo_seconds,
+            degraded_max_new_tokens=settings.degraded_max_new_tokens,
+            fallback_model_id=settings.fallback_model_id if allow_fallback else None,
+        )
+
+    # ------------------------------------------------------------------ queueing
+
+    def _estimate_wait(self, ahead: int) -> float:
+        """Predicted wait for a request with ``ahead`` requests queued in front of it."""
+        if self._service is None:
+            return 0.0
+        busy = self._in_flight + ahead - self.concurrency
+        if busy < 0:
+            return 0.0
+        return (busy // self.concurrency + 1) * self._service
+
+    def _ahead_of(self, priority: str) -> int:
+        rank = PRIORITIES[priority]
+        return sum(1 for entry in self._waiting if entry[0] <= rank)
+
+    def _reject(self, ticket: _Ticket, reason: str, retry_after: float) -> OverloadedError:
+        self._shed[ticket.priority] += 1
+        retry_after = round(max(retry_after, self.slo_seconds), 1)
+        logger.warning("Shed %s request (%s); retry after %.1fs", ticket.priority, reason, retry_after)
+        return OverloadedError(f"SmolMind is busy ({reason}). Retry in {retry_after:.0f}s.", retry_after)
+
+    def _enqueue(self, priority: str) -> _Ticket:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of {sorted(PRIORITIES)}.")
+        ticket = _Ticket(priority=priority, enqueued=time.perf_counter())
+        with self._lock:
+            predicted = self._estimate_wait(self._ahead_of(priority))
+            limit = self.slo_seconds * (self.reject_factor if priority == INTERACTIVE else 1.0)
+            if predicted > limit:
+                raise self._reject(ticket, f"predicted wait {predicted:.1f}s", predicted)
+            # A free slot dispatches at once, so only a request that has to wait needs queue room.
+            must_wait = self._in_flight >= self.concurrency
+            if must_wait and len(self._waiting) >= self.max_queue and not self._evict_for(ticket):
+                raise self._reject(ticket, f"queue full at {self.max_queue}", self._estimate_wait(len(self._waiting)))
+            heapq.heappush(self._waiting, (PRIORITIES[priority], next(self._seq), ticket))
+            self._peak_depth = max(self._peak_depth, len(self._waiting))
+            self._dispatch()
+        return ticket
+
+    def _evict_for(self, ticket: _Ticket) -> bool:
+        """Drop the newest queued request of a lower priority to make room for ``ticket``."""
+        rank = PRIORITIES[ticket.priority]
+        victims = [entry for entry in self._waiting if entry[0] > rank]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda entry: (entry[0], entry[1]))
+        self._waiting.remove(victim)
+        heapq.heapify(self._waiting)
+        evicted = victim[2]
+        retry_after = self._estimate_wait(len(self._waiting))
+        evicted.rejected = self._reject(evicted, "evicted by higher-priority work", retry_after)
+        evicted.event.set()
+        return True
+
+    def _dispatch(self) -> None:
+        while self._waiting and self._in_flight < self.concurrency:
+            _, _, ticket = heapq.heappop(self._waiting)
+            self._in_flight += 1
+            ticket.granted = True
+            ticket.event.set()
+
+    def _wait_for_slot(self, ticket: _Ticket, cancel: CancellationToken | None) -> float:
+        while not ticket.event.wait(_WAIT_SLICE):
+            if cancel is not None and cancel.cancelled:
+                with self._lock:
+                    if not ticket.event.is_set():
+                        self._waiting = [entry for entry in self._waiting if entry[2] is not ticket]
+                        heapq.heapify(self._waiting)
+                        raise CancelledError(cancel.reason or "cancelled")
+                break
+        if ticket.rejected is not None:
+            raise ticket.rejected
+        return time.perf_counter() - ticket.enqueued
+
+    def _release(self, seconds: Optional[float]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if seconds is not None:
+                previous = seconds if self._service is None else self._service
+                self._service = _EWMA_ALPHA * seconds + (1 - _EWMA_ALPHA) * previous
+            self._dispatch()
+
+    # ------------------------------------------------------------------ degradation
+
+    def _degrade(self, settings: ModelSettings, waited: float, priority: str) -> ModelSettings:
+        with self._lock:
+            # Only work that would be served first counts; queued batch jobs do not slow a chat turn.
+            backlog = self._estimate_wait(self._ahead_of(priority))
+            self._admitted += 1
+            self._waits.append(waited)
+        pressure = max(waited, backlog) / self.slo_seconds
+        update = {}
+        if pressure > 1 and settings.max_new_tokens > self.degraded_max_new_tokens:
+            update["max_new_tokens"] = self.degraded_max_new_tokens
+        if pressure > 2 and self.fallback_model_id and settings.model_id != self.fallback_model_id:
+            update["model_id"] = self.fallback_model_id
+        if not update:
+            return settings
+        with self._lock:
+            self._degraded_tokens += "max_new_tokens" in update
+            self._degraded_model += "model_id" in update
+        logger.info("Queue wait %.2fs (backlog %.2fs) over SLO; degrading with %s", waited, backlog, update)
+        return settings.model_copy(update=update)
+
+    @contextmanager
+    def admit(
+        self,
+        settings: ModelSettings | None = None,
+        priority: str = INTERACTIVE,
+        cancel: CancellationToken | None = None,
+    ) -> Iterator[ModelSettings]:
+        """Hold a generation slot for the ``with`` block and yield the settings to generate with.
+
+        Raises :class:`OverloadedError` when the request is shed and
+        :class:`CancelledError` when ``cancel`` fires while it is queued.
+        """
+        settings = settings or self.settings
+        ticket = self._enqueue(priority)
+        try:
+            waited = self._wait_for_slot(ticket, cancel)
+        except (CancelledError, OverloadedError):
+            raise
+        except BaseException:
+            # Interrupted while queued: give the slot back if it was granted meanwhile.
+            with self._lock:
+                granted = ticket.granted
+                self._waiting = [entry for entry in self._waiting if entry[2] is not ticket]
+                heapq.heapify(self._waiting)
+            if granted:
+                self._release(None)
+            raise
+        start = time.perf_counter()
+        try:
+            yield self._degrade(settings, waited, priority)
+        finally:
+            self._release(time.perf_counter() - start)
+
+    # ------------------------------------------------------------------ wrappers
+
+    def wrap_completion(self, fn: Callable[..., str], priority: str = INTERACTIVE) -> Callable[..., str]:
+        """Gate a ``generate_completion``-compatible function; a call cancelled while queued returns ``""``."""
+
+        def admitted_completion(messages, settings=None, cancel=None, **kwargs) -> str:
+            try:
+                with self.admit(settings, priority=current_priority() or priority, cancel=cancel) as admitted:
+                    kwargs = self._call_args(settings, admitted, kwargs)
+                    return fn(messages, settings=admitted, cancel=cancel, **kwargs)
+            except CancelledError:
+                return ""
+
+        return admitted_completion
+
+    def wrap_batch(self, fn: Callable[..., List[str]], priority: str = BATCH) -> Callable[..., List[str]]:
+        """Gate a ``generate_batch``-compatible function; a call cancelled while queued returns empty replies."""
+
+        def admitted_batch(conversations, settings=None, cancel=None, **kwargs) -> List[str]:
+            try:
+                with self.admit(settings, priority=current_priority() or priority, cancel=cancel) as admitted:
+                    kwargs = self._call_args(settings, admitted, kwargs)
+                    return fn(conversations, settings=admitted, cancel=cancel, **kwargs)
+            except CancelledError:
+                return ["" for _ in conversations]
+
+        return admitted_batch
+
+    def _call_args(self, requested: ModelSettings | None, admitted: ModelSettings, kwargs: Dict) -> Dict:
+        if admitted.model_id != (requested or self.settings).model_id:
+            # LoRA adapters are trained for the primary model and do not apply to the fallback.
+            kwargs = {key: value for key, value in kwargs.items() if key not in ("adapter", "adapters")}
+        return kwargs
+
+    # ------------------------------------------------------------------ stats
+
+    def stats(self) -> AdmissionStats:
+        with self._lock:
+            waits = sorted(self._waits)
+            return AdmissionStats(
+                queue_depth=len(self._waiting),
+                in_flight=self._in_flight,
+                peak_depth=self._peak_depth,
+                admitted=self._admitted,
+                shed=dict(self._shed),
+                degraded_tokens=self._degraded_tokens,
+                degraded_model=self._degraded_model,
+                wait_p50=waits[len(waits) // 2] if waits else 0.0,
+                wait_p99=waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0,
+                service_seconds=self._service,
+                slo_seconds=self.slo_seconds,
+            )
+
+
+_PRIORITY = threading.local()
+_DEFAULT_CONTROLLER: Optional[AdmissionController] = None
+
+
+def current_priority() -> Optional[str]:
+    return getattr(_PRIORITY, "value", None)
+
+
+@contextmanager
+def priority_scope(name: str) -> Iterator[None]:
+    """Run admitted calls made on this thread inside the block at priority ``name``."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{name}'. Use one of {sorted(PRIORITIES)}.")
+    previous = current_priority()
+    _PRIORITY.value = name
+    try:
+        yield
+    finally:
+        _PRIORITY.value = previous
+
+
+def install_admission_controller(controller: Optional[AdmissionController]) -> None:
+    """Make ``controller`` the process-wide gate used by model calls that have no explicit one (e.g. tools)."""
+    global _DEFAULT_CONTROLLER
+    _DEFAULT_CONTROLLER = controller
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    return _DEFAULT_CONTROLLER
+
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionStats",
+    "BATCH",
+    "INTERACTIVE",
+    "OverloadedError",
+    "PRIORITIES",
+    "current_priority",
+    "get_admission_controller",
+    "install_admission_controller",
+    "priority_scope",
+]
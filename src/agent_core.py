@@ -3,23 +3,36 @@ from __future__ import annotations
 import json
 import logging
 import textwrap
-from dataclasses import dataclass
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Callable, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
-from .models import ModelSettings, generate_completion
+from .admission import OverloadedError
+from .cancellation import CancellationToken, CancelledError
+from .memory import ConversationMemory, MemoryRecord
+from .models import ModelSettings, TokenCallback, generate_batch, generate_completion
 from .tools import ToolContext, ToolRegistry, load_default_tools
+from .tools.intents import IntentMatch, IntentRouter
+from .tools.results import ResultStore, estimate_tokens, preview
+from .tracing import CallTrace, ToolTrace, TraceRecorder, TurnTrace
 
 logger = logging.getLogger(__name__)
 
+HISTORY_WINDOW = 10
+
 
 @dataclass(frozen=True)
 class AgentProfile:
     name: str
     description: str
     system_prompt: str
+    # Optional LoRA adapter (local path or hub id) applied on top of the shared base model.
+    adapter: Optional[str] = None
 
 
 DEFAULT_AGENTS: List[AgentProfile] = [
@@ -74,6 +87,21 @@ class AgentMessage(BaseModel):
 
 class AgentState(BaseModel):
     history: List[AgentMessage] = Field(default_factory=list)
+    session_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+
+class AgentContribution(BaseModel):
+    """One agent's share of a fan-out turn."""
+
+    agent: str
+    text: str
+    # Wall time of the batched generations this agent took part in, shared with the other agents.
+    batch_seconds: float
+    # Time spent in this agent's own tool call.
+    tool_seconds: float = 0.0
+    tool_used: Optional[str] = None
+    tool_output: Optional[str] = None
+    tool_handle: Optional[str] = None
 
 
 class AgentTurn(BaseModel):
@@ -82,6 +110,12 @@ class AgentTurn(BaseModel):
     raw_tool_request: Optional[str] = None
     tool_used: Optional[str] = None
     tool_output: Optional[str] = None
+    # Set when the output was too large for history and was stored out of band.
+    tool_handle: Optional[str] = None
+    contributions: List[AgentContribution] = Field(default_factory=list)
+    truncated: bool = False
+    # Answered by a declared tool intent without calling the model.
+    fast_path: bool = False
 
 
 @dataclass
@@ -99,14 +133,53 @@ class AgentCore:
         tool_registry: ToolRegistry | None = None,
         model_settings: ModelSettings | None = None,
         base_path: Path | None = None,
+        fan_out_agents: List[str] | None = None,
+        completion_fn: Callable[..., str] | None = None,
+        batch_fn: Callable[..., List[str]] | None = None,
+        turn_timeout: float | None = None,
+        memory: ConversationMemory | None = None,
+        recall_k: int = 3,
+        recall_token_budget: int = 256,
+        result_preview_tokens: int = 256,
+        fast_path: bool = True,
+        fast_path_side_effects: bool = False,
+        recorder: TraceRecorder | None = None,
     ) -> None:
-        self.agents = agents or DEFAULT_AGENTS
-        self.agent_lookup = {agent.name: agent for agent in self.agents}
         self.model_settings = model_settings or ModelSettings()
+        adapters = self.model_settings.agent_adapters
+        self.agents = [
+            replace(agent, adapter=adapters[agent.name]) if agent.name in adapters else agent
+            for agent in agents or DEFAULT_AGENTS
+        ]
+        self.agent_lookup = {agent.name: agent for agent in self.agents}
+        # Same signature as models.generate_completion; lets callers route to e.g. a ReplicaPool.
+        self.completion_fn = completion_fn or generate_completion
+        self.batch_fn = batch_fn or generate_batch
+        # Opt-in JSONL trace of every turn (see tracing / replay).
+        self.recorder = recorder
+        self._trace = threading.local()
+        self.turn_timeout = turn_timeout
+        # Long-term memory: finished turns are embedded in the background and relevant
+        # ones are recalled into the system prompt once they scroll out of the window.
+        self.memory = memory
+        self.recall_k = recall_k
+        self.recall_token_budget = recall_token_budget
+        # Tool outputs above this size go to the result store; history keeps a preview and handle.
+        self.result_preview_tokens = result_preview_tokens
+        self.fan_out_agents: List[str] = []
+        if fan_out_agents:
+            self.set_fan_out(fan_out_agents)
 
         self.tool_registry = tool_registry or load_default_tools(base_path=base_path)
-        default_context = getattr(self.tool_registry, "default_context", None)
-        self.tool_context = default_context or ToolContext.build(base_path=base_path)
+        self.tool_context = self.tool_registry.default_context or ToolContext.build(base_path=base_path)
+        self.result_store = ResultStore.for_context(self.tool_context)
+        # Intents that change state (e.g. adding a todo) need their own opt-in.
+        self.intent_router: Optional[IntentRouter] = (
+            IntentRouter(self.tool_registry, allow_side_effects=fast_path_side_effects) if fast_path else None
+        )
+        if self.tool_registry.executor is not None:
+            # Fork tool workers now, before the model is loaded into this process.
+            self.tool_registry.executor.start()
 
         self._default_agent = self.agent_lookup["Researcher"]
 
@@ -116,6 +189,27 @@ class AgentCore:
         except KeyError as exc:
             raise ValueError(f"Unknown agent '{agent_name}'. Available: {list(self.agent_lookup)}") from exc
 
+    def set_fan_out(self, agent_names: List[str]) -> None:
+        """Send every turn to all ``agent_names`` at once (empty list disables fan-out)."""
+        unknown = [name for name in agent_names if name not in self.agent_lookup]
+        if unknown:
+            raise ValueError(f"Unknown agent(s) {unknown}. Available: {list(self.agent_lookup)}")
+        self.fan_out_agents = list(agent_names)
+
+    def core_config(self) -> Dict[str, Any]:
+        """Settings that shape a turn; recorded in trace headers so replay can rebuild this core."""
+        return {
+            "default_agent": self._default_agent.name,
+            "fan_out_agents": list(self.fan_out_agents),
+            "fast_path": self.intent_router is not None,
+            "fast_path_side_effects": self.intent_router is not None and self.intent_router.allow_side_effects,
+            "memory": self.memory is not None,
+            "turn_timeout": self.turn_timeout,
+            "recall_k": self.recall_k,
+            "recall_token_budget": self.recall_token_budget,
+            "result_preview_tokens": self.result_preview_tokens,
+        }
+
     def available_agents(self) -> Dict[str, str]:
         return {agent.name: agent.description for agent in self.agents}
 
@@ -126,20 +220,116 @@ class AgentCore:
                 return self.agent_lookup.get(agent_name, self._default_agent)
         return self._default_agent
 
-    def process_turn(self, user_text: str, state: AgentState | None = None) -> AgentTurn:
+    @staticmethod
+    def _adapter_args(agent: AgentProfile) -> Dict[str, Any]:
+        # Only pass ``adapter`` when set so completion functions without adapter support keep working.
+        return {"adapter": agent.adapter} if agent.adapter else {}
+
+    @staticmethod
+    def _batch_adapter_args(profiles: List[AgentProfile]) -> Dict[str, Any]:
+        if not any(agent.adapter for agent in profiles):
+            return {}
+        return {"adapters": [agent.adapter for agent in profiles]}
+
+    def _turn_token(self, cancel: CancellationToken | None) -> CancellationToken:
+        """Combine the caller's token with this core's per-turn deadline."""
+        if cancel is not None and self.turn_timeout is None:
+            return cancel
+        return CancellationToken(timeout=self.turn_timeout, parent=cancel)
+
+    def process_turn(
+        self,
+        user_text: str,
+        state: AgentState | None = None,
+        on_token: TokenCallback | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> AgentTurn:
+        """Run one user turn; ``on_token`` receives reply text as it streams.
+
+        Tool-call JSON is never streamed, only natural-language replies. When
+        ``cancel`` fires or the turn deadline passes, the text generated so far
+        is returned with ``truncated=True``. A turn shed by admission control
+        raises ``OverloadedError`` and leaves ``state`` unchanged; once a tool has
+        run, a shed follow-up instead keeps the tool messages and returns a
+        truncated turn.
+        """
         if state is None:
             state = AgentState()
+        mark = len(state.history)
+        try:
+            if self.recorder is None:
+                return self._run_turn(user_text, state, on_token, cancel)
+            return self._recorded_turn(user_text, state, on_token, cancel)
+        except OverloadedError:
+            # Only the first model call gets here (before any tool ran): drop the user
+            # message so retrying after the back-off does not duplicate it.
+            del state.history[mark:]
+            raise
+
+    def _recorded_turn(
+        self,
+        user_text: str,
+        state: AgentState,
+        on_token: TokenCallback | None,
+        cancel: CancellationToken | None,
+    ) -> AgentTurn:
+        index = sum(1 for message in state.history if message.role == "user")
+        trace = self.recorder.start_turn(state.session_id, index, user_text)
+        trace.config = self.core_config()
+        self._trace.current = trace
+        start = time.perf_counter()
+        try:
+            turn = self._run_turn(user_text, state, on_token, cancel)
+        except Exception as exc:
+            trace.error = f"{type(exc).__name__}: {exc}"
+            raise
+        else:
+            trace.agent, trace.fast_path, trace.truncated = turn.agent, turn.fast_path, turn.truncated
+            return turn
+        finally:
+            self._trace.current = None
+            trace.seconds = time.perf_counter() - start
+            self.recorder.write(trace)
+
+    def _run_turn(
+        self,
+        user_text: str,
+        state: AgentState,
+        on_token: TokenCallback | None,
+        cancel: CancellationToken | None,
+    ) -> AgentTurn:
+        cancel = self._turn_token(cancel)
+        match = self.intent_router.match(user_text) if self.intent_router is not None else None
+        if match is not None:
+            turn = self._fast_path_turn(user_text, match, state, on_token, cancel)
+            if turn is not None:
+                return turn
+        if len(self.fan_out_agents) > 1:
+            return self.process_fan_out(
+                user_text, self.fan_out_agents, state=state, on_token=on_token, cancel=cancel
+            )
 
         agent = self._pick_agent(user_text)
         logger.debug("Selected agent: %s for input: %s", agent.name, user_text)
 
+        turn_start = time.perf_counter()
         state.history.append(AgentMessage(role="user", content=user_text))
-        messages = self._compose_messages(agent, state.history)
-        assistant_reply = generate_completion(messages, settings=self.model_settings)
+        recalled = self._recall(user_text, state.history)
+        messages = self._compose_messages(agent, state.history, recalled)
+        assistant_reply = self._complete(
+            messages,
+            settings=self.model_settings,
+            on_token=_skip_tool_json(on_token),
+            cancel=cancel,
+            **self._adapter_args(agent),
+        )
+        if cancel.cancelled:
+            return self._truncated_turn(agent, assistant_reply, state, cancel)
 
         tool_call = self._extract_tool_call(assistant_reply)
         if not tool_call:
             state.history.append(AgentMessage(role="assistant", content=assistant_reply, agent=agent.name))
+            self._remember(user_text, assistant_reply, agent.name)
             return AgentTurn(agent=agent.name, text=assistant_reply)
 
         logger.info("Agent requested tool %s with args %s", tool_call.name, tool_call.args)
@@ -147,12 +337,58 @@ class AgentCore:
             AgentMessage(role="assistant", content=assistant_reply, agent=agent.name, tool_name=tool_call.name)
         )
 
-        tool_result = self._run_tool(tool_call)
-        state.history.append(AgentMessage(role="tool", content=tool_result, tool_name=tool_call.name))
-
-        follow_up_messages = self._compose_messages(agent, state.history)
-        final_reply = generate_completion(follow_up_messages, settings=self.model_settings)
+        tool_start = time.perf_counter()
+        try:
+            tool_result = self._run_tool(tool_call, cancel=cancel)
+        except CancelledError:
+            # Answer the tool request so history never holds a request without its result.
+            state.history.append(
+                AgentMessage(
+                    role="tool", content=f"(cancelled: {cancel.reason or 'cancelled'})", tool_name=tool_call.name
+                )
+            )
+            return self._truncated_turn(agent, "", state, cancel, raw_tool_request=assistant_reply)
+        tool_seconds = time.perf_counter() - tool_start
+        history_result, tool_handle = self._history_tool_result(tool_call.name, tool_result)
+        state.history.append(AgentMessage(role="tool", content=history_result, tool_name=tool_call.name))
+
+        follow_up_messages = self._compose_messages(agent, state.history, recalled)
+        try:
+            final_reply = self._complete(
+                follow_up_messages,
+                settings=self.model_settings,
+                on_token=on_token,
+                cancel=cancel,
+                **self._adapter_args(agent),
+            )
+        except OverloadedError as exc:
+            # The tool already ran, so keep its result in history instead of rolling the turn back.
+            logger.warning("Follow-up for %s shed after running %s: %s", agent.name, tool_call.name, exc)
+            return AgentTurn(
+                agent=agent.name,
+                text=f"(stopped: {exc})",
+                truncated=True,
+                raw_tool_request=assistant_reply,
+                tool_used=tool_call.name,
+                tool_output=tool_result,
+                tool_handle=tool_handle,
+            )
+        if cancel.cancelled:
+            return self._truncated_turn(
+                agent,
+                final_reply,
+                state,
+                cancel,
+                raw_tool_request=assistant_reply,
+                tool_used=tool_call.name,
+                tool_output=tool_result,
+                tool_handle=tool_handle,
+            )
         state.history.append(AgentMessage(role="assistant", content=final_reply, agent=agent.name))
+        self._remember(user_text, final_reply, agent.name)
+        if self.intent_router is not None:
+            # Model time a fast-path hit avoids: both generations, not the tool itself.
+            self.intent_router.record_llm_tool_turn(time.perf_counter() - turn_start - tool_seconds)
 
         return AgentTurn(
             agent=agent.name,
@@ -160,9 +396,215 @@ class AgentCore:
             raw_tool_request=assistant_reply,
             tool_used=tool_call.name,
             tool_output=tool_result,
+            tool_handle=tool_handle,
         )
 
-    def _compose_messages(self, agent: AgentProfile, history: List[AgentMessage]) -> List[Dict[str, str]]:
+    def _fast_path_turn(
+        self,
+        user_text: str,
+        match: IntentMatch,
+        state: AgentState,
+        on_token: TokenCallback | None,
+        cancel: CancellationToken,
+    ) -> Optional[AgentTurn]:
+        """Answer an unambiguous tool intent directly; None sends the turn down the model path."""
+        start = time.perf_counter()
+        try:
+            tool_result = self._run_tool(ToolCall(name=match.tool, args=match.args), cancel=cancel)
+        except CancelledError:
+            return None  # the model path turns this into a truncated turn
+        except Exception as exc:  # pylint: disable=broad-except
+            # e.g. a slot that fails validation; the model may still make sense of the request.
+            logger.info("Fast path for %s failed (%s); falling back to the model", match.tool, exc)
+            return None
+        text = match.render(tool_result)
+        agent = self._pick_agent(user_text)
+        history_result, tool_handle = self._history_tool_result(match.tool, tool_result)
+        state.history.extend(
+            [
+                AgentMessage(role="user", content=user_text),
+                AgentMessage(role="tool", content=history_result, tool_name=match.tool),
+                AgentMessage(role="assistant", content=text, agent=agent.name),
+            ]
+        )
+        self._remember(user_text, text, agent.name)
+        if on_token is not None:
+            on_token(text)
+        self.intent_router.record_hit(time.perf_counter() - start)
+        return AgentTurn(
+            agent=agent.name,
+            text=text,
+            tool_used=match.tool,
+            tool_output=tool_result,
+            tool_handle=tool_handle,
+            fast_path=True,
+        )
+
+    def _truncated_turn(
+        self,
+        agent: AgentProfile,
+        partial: str,
+        state: AgentState,
+        cancel: CancellationToken,
+        **turn_fields: Any,
+    ) -> AgentTurn:
+        logger.info("Turn for %s stopped early: %s", agent.name, cancel.reason)
+        if partial:
+            state.history.append(AgentMessage(role="assistant", content=partial, agent=agent.name))
+        text = partial or f"(stopped: {cancel.reason or 'cancelled'})"
+        return AgentTurn(agent=agent.name, text=text, truncated=True, **turn_fields)
+
+    def process_fan_out(
+        self,
+        user_text: str,
+        agent_names: List[str],
+        state: AgentState | None = None,
+        on_token: TokenCallback | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> AgentTurn:
+        """Ask several agents the same question in one batched generation and merge the answers.
+
+        Prompts differ only in the system prompt, so all agents share a single
+        forward pass; agents that request a tool get a second batched pass.
+        """
+        if state is None:
+            state = AgentState()
+        profiles = [self.agent_lookup[name] for name in agent_names]
+        state.history.append(AgentMessage(role="user", content=user_text))
+        recalled = self._recall(user_text, state.history)
+
+        start = time.perf_counter()
+        replies = self._batch(
+            [self._compose_messages(agent, state.history, recalled) for agent in profiles],
+            settings=self.model_settings,
+            cancel=cancel,
+            **self._batch_adapter_args(profiles),
+        )
+        first_pass = time.perf_counter() - start
+        truncated = cancel is not None and cancel.cancelled
+
+        contributions: Dict[str, AgentContribution] = {}
+        follow_ups: List[tuple[AgentProfile, List[AgentMessage]]] = []
+        for agent, reply in zip(profiles, replies):
+            contribution = AgentContribution(agent=agent.name, text=reply, batch_seconds=first_pass)
+            contributions[agent.name] = contribution
+            tool_call = None if truncated else self._extract_tool_call(reply)
+            if not tool_call:
+                continue
+            logger.info("Agent %s requested tool %s with args %s", agent.name, tool_call.name, tool_call.args)
+            tool_start = time.perf_counter()
+            try:
+                tool_result = self._run_tool(tool_call, cancel=cancel)
+            except CancelledError:
+                truncated = True
+                break
+            contribution.tool_seconds = time.perf_counter() - tool_start
+            contribution.tool_used, contribution.tool_output = tool_call.name, tool_result
+            history_result, contribution.tool_handle = self._history_tool_result(tool_call.name, tool_result)
+            scratch = state.history + [
+                AgentMessage(role="assistant", content=reply, agent=agent.name, tool_name=tool_call.name),
+                AgentMessage(role="tool", content=history_result, tool_name=tool_call.name),
+            ]
+            follow_ups.append((agent, scratch))
+
+        if follow_ups and not truncated:
+            start = time.perf_counter()
+            try:
+                final_replies = self._batch(
+                    [self._compose_messages(agent, scratch, recalled) for agent, scratch in follow_ups],
+                    settings=self.model_settings,
+                    cancel=cancel,
+                    **self._batch_adapter_args([agent for agent, _ in follow_ups]),
+                )
+            except OverloadedError as exc:
+                # Tools already ran; report their output rather than rolling the turn back.
+                logger.warning("Fan-out follow-up shed after running tools: %s", exc)
+                final_replies = [f"(stopped: {exc})"] * len(follow_ups)
+                truncated = True
+            second_pass = time.perf_counter() - start
+            truncated = truncated or (cancel is not None and cancel.cancelled)
+            for (agent, _), reply in zip(follow_ups, final_replies):
+                contributions[agent.name].text = reply
+                contributions[agent.name].batch_seconds += second_pass
+
+        ordered = [contributions[agent.name] for agent in profiles]
+        for contribution in ordered:
+            logger.info(
+                "Fan-out agent %s: %.2fs batched generation, %.2fs tool",
+                contribution.agent,
+                contribution.batch_seconds,
+                contribution.tool_seconds,
+            )
+        merged = self._merge_contributions(ordered)
+        label = "+".join(agent_names)
+        state.history.append(AgentMessage(role="assistant", content=merged, agent=label))
+        if not truncated:
+            self._remember(user_text, merged, label)
+        if on_token is not None:
+            on_token(merged)
+
+        return AgentTurn(
+            agent=label,
+            text=merged,
+            contributions=ordered,
+            truncated=truncated,
+            **self._merge_tool_fields(ordered),
+        )
+
+    @staticmethod
+    def _merge_contributions(contributions: List[AgentContribution]) -> str:
+        """Concatenate agent answers under headings, dropping paragraphs another agent already gave."""
+        seen: set[str] = set()
+        sections = []
+        for contribution in contributions:
+            paragraphs = []
+            for paragraph in contribution.text.split("\n\n"):
+                key = " ".join(paragraph.split()).lower()
+                if key and key not in seen:
+                    seen.add(key)
+                    paragraphs.append(paragraph.strip())
+            if paragraphs:
+                sections.append(f"**{contribution.agent}**\n" + "\n\n".join(paragraphs))
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _merge_tool_fields(contributions: List[AgentContribution]) -> Dict[str, Optional[str]]:
+        """AgentTurn tool fields covering every agent that used a tool; several are joined under headings."""
+        used = [contribution for contribution in contributions if contribution.tool_used]
+        if not used:
+            return {}
+        if len(used) == 1:
+            only = used[0]
+            return {"tool_used": only.tool_used, "tool_output": only.tool_output, "tool_handle": only.tool_handle}
+        handles = [contribution.tool_handle for contribution in used if contribution.tool_handle]
+        return {
+            "tool_used": "+".join(contribution.tool_used for contribution in used),
+            "tool_output": "\n\n".join(
+                f"**{contribution.agent}** ({contribution.tool_used})\n{contribution.tool_output}" for contribution in used
+            ),
+            "tool_handle": ", ".join(handles) or None,
+        }
+
+    def _recall(self, user_text: str, history: List[AgentMessage]) -> List[MemoryRecord]:
+        """Past exchanges relevant to ``user_text`` that are not already in the prompt window."""
+        if self.memory is None:
+            return []
+        in_window = {msg.content for msg in history[-HISTORY_WINDOW:-1] if msg.role == "user"}
+        records = self.memory.recall(
+            user_text, k=self.recall_k + len(in_window), token_budget=self.recall_token_budget
+        )
+        return [record for record in records if record.user not in in_window][: self.recall_k]
+
+    def _remember(self, user_text: str, reply: str, agent_name: str) -> None:
+        if self.memory is not None and reply:
+            self.memory.remember(user_text, reply, agent=agent_name)
+
+    def _compose_messages(
+        self,
+        agent: AgentProfile,
+        history: List[AgentMessage],
+        recalled: List[MemoryRecord] | None = None,
+    ) -> List[Dict[str, str]]:
         tool_descriptions = "\n".join(
             f"- {name}: {description}" for name, description in self.tool_registry.describe().items()
         )
@@ -183,9 +625,12 @@ class AgentCore:
             If no tool is needed, respond normally.
             """
         ).strip()
+        if recalled:
+            memories = "\n\n".join(record.render() for record in recalled)
+            system_prompt += f"\n\nRelevant earlier conversation (may be out of date):\n{memories}"
 
         messages: List[Dict[str, str]] = [{"role": "system", "content": system_prompt}]
-        for msg in history[-10:]:
+        for msg in history[-HISTORY_WINDOW:]:
             entry = {"role": msg.role, "content": msg.content}
             if msg.role == "tool" and msg.tool_name:
                 entry["name"] = msg.tool_name
@@ -221,11 +666,94 @@ class AgentCore:
             except json.JSONDecodeError:
                 return None
 
-    def _run_tool(self, tool_call: ToolCall) -> str:
-        return self.tool_registry.call(tool_call.name, tool_call.args, self.tool_context)
+    def _current_trace(self) -> Optional[TurnTrace]:
+        return getattr(self._trace, "current", None)
+
+    def _complete(self, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        start = time.perf_counter()
+        reply = self.completion_fn(messages, **kwargs)
+        trace = self._current_trace()
+        if trace is not None:
+            adapter = kwargs.get("adapter")
+            trace.calls.append(
+                CallTrace(
+                    kind="completion",
+                    prompts=[messages],
+                    outputs=[reply],
+                    seconds=time.perf_counter() - start,
+                    adapters=[adapter] if adapter else None,
+                )
+            )
+        return reply
+
+    def _batch(self, conversations: List[List[Dict[str, str]]], **kwargs: Any) -> List[str]:
+        start = time.perf_counter()
+        replies = self.batch_fn(conversations, **kwargs)
+        trace = self._current_trace()
+        if trace is not None:
+            trace.calls.append(
+                CallTrace(
+                    kind="batch",
+                    prompts=conversations,
+                    outputs=list(replies),
+                    seconds=time.perf_counter() - start,
+                    adapters=kwargs.get("adapters"),
+                )
+            )
+        return replies
+
+    def _run_tool(self, tool_call: ToolCall, cancel: CancellationToken | None = None) -> str:
+        trace = self._current_trace()
+        if trace is None:
+            return self.tool_registry.call(tool_call.name, tool_call.args, self.tool_context, cancel=cancel)
+        record = ToolTrace(name=tool_call.name, args=dict(tool_call.args), seconds=0.0)
+        trace.tools.append(record)
+        start = time.perf_counter()
+        try:
+            result = self.tool_registry.call(tool_call.name, tool_call.args, self.tool_context, cancel=cancel)
+        except Exception as exc:
+            record.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+        record.output_chars = len(result)
+        return result
+
+    def _history_tool_result(self, tool_name: str, result: str) -> tuple[str, Optional[str]]:
+        """Content for the history's tool message plus the result handle when the output was stored."""
+        # read_result output was explicitly requested and is already bounded; storing it again would loop.
+        if tool_name == "read_result" or estimate_tokens(result) <= self.result_preview_tokens:
+            return result, None
+        handle = self.result_store.put(result)
+        logger.info("Stored %d-char %s output as %s", len(result), tool_name, handle)
+        return preview(result, handle, self.result_preview_tokens), handle
+
+
+def _skip_tool_json(on_token: TokenCallback | None) -> TokenCallback | None:
+    """Wrap ``on_token`` so a reply that starts as a JSON tool request is not streamed."""
+    if on_token is None:
+        return None
+    buffer: List[str] = []
+    decided: List[bool] = []
+
+    def forward(text: str) -> None:
+        if decided:
+            if decided[0]:
+                on_token(text)
+            return
+        buffer.append(text)
+        head = "".join(buffer).lstrip()
+        if not head:
+            return
+        decided.append(not head.startswith("{"))
+        if decided[0]:
+            on_token("".join(buffer))
+
+    return forward
 
 
 __all__ = [
+    "AgentContribution",
     "AgentCore",
     "AgentProfile",
     "AgentState",
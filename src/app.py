@@ -1,133 +1,216 @@
 from __future__ import annotations
 
 import json
+import os
+import signal
+import threading
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, List, Optional
 
 import typer
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
+from rich.table import Table
 
 from .agent_core import AgentCore, AgentState
-from .models import ModelSettings
+from .cancellation import CancellationToken
+from .memory import ConversationMemory, SentenceTransformerEmbedder
+from .models import ModelSettings, get_adapter_manager, get_generation_stats
+from .tracing import TraceRecorder
 from .tools import ToolRegistry, load_default_tools
+from .voice import MicrophoneSource, VoicePipeline, WavFileSource
 
 app = typer.Typer(add_completion=False, invoke_without_command=True)
 console = Console()
 
 
-def _init_agent(core_agent: Optional[str], model_settings: ModelSettings, base_path: Path) -> AgentCore:
+def _init_agent(
+    core_agent: Optional[str],
+    model_settings: ModelSettings,
+    base_path: Path,
+    fan_out: Optional[str] = None,
+    turn_timeout: Optional[float] = None,
+    memory: bool = False,
+    trace: Optional[Path] = None,
+    fast_path_writes: bool = False,
+) -> AgentCore:
     registry = load_default_tools(base_path=base_path)
-    agent_core = AgentCore(tool_registry=registry, model_settings=model_settings, base_path=base_path)
+    agent_core = AgentCore(
+        tool_registry=registry,
+        model_settings=model_settings,
+        base_path=base_path,
+        turn_timeout=turn_timeout,
+        memory=_open_memory(registry, model_settings) if memory else None,
+        recorder=TraceRecorder(trace) if trace else None,
+        fast_path_side_effects=fast_path_writes,
+    )
     if core_agent:
         try:
             agent_core.set_default_agent(core_agent)
         except ValueError:
             console.print(f"[yellow]Unknown agent '{core_agent}'. Using automatic routing instead.[/]")
+    if fan_out:
+        try:
+            agent_core.set_fan_out([name.strip() for name in fan_out.split(",") if name.strip()])
+        except ValueError as exc:
+            console.print(f"[yellow]{exc} Fan-out disabled.[/]")
     return agent_core
 
 
-def _listen_for_audio(timeout: int = 5, phrase_time_limit: int = 15) -> str:
-    try:
-        import speech_recognition as sr
-    except ImportError as exc:  # pragma: no cover - optional dependency
-        raise RuntimeError("Speech recognition not available. Install `speechrecognition`.") from exc
-    recogniser = sr.Recognizer()
-    try:
-        with sr.Microphone() as source:
-            console.print("[cyan]Listening...[/]")
-            try:
-                audio = recogniser.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-            except sr.WaitTimeoutError:
-                return ""
-    except AttributeError as exc:
-        raise RuntimeError(
-            "PyAudio is required for microphone input. Install it or run without --voice."
-        ) from exc
-    except OSError as exc:  # e.g. no default input device
-        raise RuntimeError(
-            "No microphone input device detected. Connect a mic or run without --voice."
-        ) from exc
-    try:
-        return recogniser.recognize_whisper(audio)
-    except AttributeError:
-        pass
-    except ModuleNotFoundError:
-        console.print("[yellow]Whisper is not installed; falling back to Google recognizer.[/]")
-    except sr.UnknownValueError:
-        return ""
-    except Exception:
-        console.print("[yellow]Whisper recognition failed; trying Google recognizer.[/]")
+def _open_memory(registry: ToolRegistry, model_settings: ModelSettings) -> Optional[ConversationMemory]:
+    embedder = None
+    if model_settings.embedding_model:
+        try:
+            embedder = SentenceTransformerEmbedder(model_settings.embedding_model)
+        except ImportError as exc:
+            console.print(f"[yellow]{exc} Falling back to the built-in embedder.[/]")
     try:
-        return recogniser.recognize_google(audio)
-    except sr.UnknownValueError:
-        return ""
-    except sr.RequestError as exc:
-        raise RuntimeError(
-            "Google Speech API is unavailable. Install `openai-whisper` or configure another recognizer."
-        ) from exc
+        return ConversationMemory(registry.default_context.data_dir / "memory", embedder=embedder)
+    except ValueError as exc:
+        console.print(f"[yellow]{exc} Long-term memory disabled.[/]")
+        return None
 
 
-def _speak_text(text: str) -> None:
-    try:
-        import pyttsx3
-    except ImportError:  # pragma: no cover - optional dependency
-        console.print("[yellow]pyttsx3 not installed; skipping voice response.[/]")
+def _voice_inputs(pipeline: VoicePipeline, voice_input: Optional[Path]) -> Iterator[str]:
+    """Yield user utterances from a WAV file or, by default, the microphone."""
+    if voice_input is not None:
+        yield from pipeline.utterances(WavFileSource(voice_input))
+        return
+    source = MicrophoneSource()
+    while True:
+        # Do not listen while the assistant is still talking.
+        pipeline.wait_until_spoken()
+        console.print("[cyan]Listening...[/]")
+        yield pipeline.listen(source)
+
+
+@contextmanager
+def _cancel_on_interrupt(token: CancellationToken) -> Iterator[None]:
+    """First Ctrl-C cancels the running turn; a second one ends the session as before."""
+    if threading.current_thread() is not threading.main_thread():
+        yield
         return
 
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
+    def handler(signum, frame) -> None:  # noqa: ARG001
+        if token.cancelled:
+            raise KeyboardInterrupt
+        console.print("\n[yellow]Cancelling… (press Ctrl-C again to quit)[/]")
+        token.cancel("interrupted")
 
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
 
-def _render_turn(turn, voice_enabled: bool) -> None:
+
+def _render_turn(turn) -> None:
     subtitles = []
+    if turn.fast_path:
+        subtitles.append("fast path")
     if turn.tool_used:
         subtitles.append(f"tool: {turn.tool_used}")
+    subtitles.extend(
+        f"{c.agent} {c.batch_seconds:.1f}s batch" + (f" + {c.tool_seconds:.1f}s tool" if c.tool_used else "")
+        for c in turn.contributions
+    )
+    if turn.truncated:
+        subtitles.append("truncated")
     subtitle = " • ".join(subtitles) if subtitles else None
     console.print(Panel(turn.text, title=f"{turn.agent} agent", subtitle=subtitle))
     if turn.tool_output:
-        console.print(Panel(turn.tool_output, title=f"Tool output ({turn.tool_used})", style="dim"))
-    if voice_enabled:
-        _speak_text(turn.text)
-
-
-def _run_chat(voice: bool, verbose: bool, agent: Optional[str], base_path: Path) -> None:
+        title = f"Tool output ({turn.tool_used})"
+        if turn.tool_handle:
+            title = f"Tool output ({turn.tool_used}, stored as {turn.tool_handle})"
+        console.print(Panel(turn.tool_output, title=title, style="dim"))
+
+
+def _run_chat(
+    voice: bool,
+    verbose: bool,
+    agent: Optional[str],
+    base_path: Path,
+    voice_input: Optional[Path] = None,
+    fan_out: Optional[str] = None,
+    turn_timeout: Optional[float] = None,
+    memory: bool = False,
+    trace: Optional[Path] = None,
+    fast_path_writes: bool = False,
+) -> None:
     settings = ModelSettings()
-    agent_core = _init_agent(agent, settings, base_path=base_path)
+    agent_core = _init_agent(
+        agent,
+        settings,
+        base_path=base_path,
+        fan_out=fan_out,
+        turn_timeout=turn_timeout,
+        memory=memory,
+        trace=trace,
+        fast_path_writes=fast_path_writes,
+    )
     state = AgentState()
 
+    pipeline: Optional[VoicePipeline] = None
+    utterances: Optional[Iterator[str]] = None
+    if voice or voice_input is not None:
+        pipeline = VoicePipeline(speak=voice)
+        utterances = _voice_inputs(pipeline, voice_input)
+
     console.print("[bold magenta]SmolMind[/] — lightweight local assistant. Type 'exit' to quit.")
 
-    while True:
-        try:
-            if voice:
-                try:
-                    user_text = _listen_for_audio()
-                except RuntimeError as exc:
-                    console.print(f"[red]{exc}[/]")
-                    console.print("[yellow]Voice mode disabled for this session. Re-run with --voice after installing dependencies.[/]")
-                    voice = False
-                    continue
-                if not user_text:
-                    console.print("[yellow]Heard silence. Say something or disable --voice.[/]")
-                    continue
-                console.print(f"[green]You[/]: {user_text}")
-            else:
-                user_text = Prompt.ask("[green]You")
-        except (EOFError, KeyboardInterrupt):
-            console.print("\n[red]Session ended.[/]")
-            break
-
-        if user_text.strip().lower() in {"exit", "quit"}:
-            console.print("[cyan]Goodbye![/]")
-            break
-
-        turn = agent_core.process_turn(user_text, state=state)
-        if verbose and turn.raw_tool_request:
-            console.print(f"[grey53]Tool request: {turn.raw_tool_request}[/]")
-        _render_turn(turn, voice_enabled=voice)
+    try:
+        while True:
+            try:
+                if utterances is not None:
+                    try:
+                        user_text = next(utterances)
+                    except StopIteration:
+                        console.print("[cyan]End of voice input.[/]")
+                        break
+                    except RuntimeError as exc:
+                        console.print(f"[red]{exc}[/]")
+                        console.print("[yellow]Voice mode disabled for this session. Re-run with --voice after installing dependencies.[/]")
+                        utterances = None
+                        continue
+                    if not user_text:
+                        console.print("[yellow]Heard silence. Say something or disable --voice.[/]")
+                        continue
+                    console.print(f"[green]You[/]: {user_text}")
+                else:
+                    user_text = Prompt.ask("[green]You")
+            except (EOFError, KeyboardInterrupt):
+                console.print("\n[red]Session ended.[/]")
+                break
+
+            if user_text.strip().lower() in {"exit", "quit"}:
+                console.print("[cyan]Goodbye![/]")
+                break
+
+            # Speak reply sentences while the rest of the reply is still generating.
+            streamer = pipeline.sentence_streamer() if pipeline else None
+            token = CancellationToken()
+            try:
+                with _cancel_on_interrupt(token):
+                    turn = agent_core.process_turn(user_text, state=state, on_token=streamer, cancel=token)
+            except KeyboardInterrupt:
+                console.print("\n[red]Session ended.[/]")
+                break
+            if streamer is not None:
+                streamer.flush()
+            if verbose and turn.raw_tool_request:
+                console.print(f"[grey53]Tool request: {turn.raw_tool_request}[/]")
+            if verbose and (stats := get_generation_stats(settings)) is not None:
+                mode = "compiled" if stats.compiled else "eager"
+                console.print(f"[grey53]{mode} generation: {stats.tokens_per_second:.1f} tokens/s[/]")
+            _render_turn(turn)
+    finally:
+        if agent_core.memory is not None:
+            agent_core.memory.close()
+        if pipeline is not None:
+            pipeline.wait_until_spoken()
+            pipeline.close()
 
 
 @app.command()
@@ -136,9 +219,38 @@ def chat(
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Show raw tool requests."),
     agent: Optional[str] = typer.Option(None, "--agent", help="Pin to a specific micro-agent."),
     base_path: Path = typer.Option(Path.cwd(), "--base-path", help="Working directory for tools."),
+    voice_input: Optional[Path] = typer.Option(
+        None, "--voice-input", help="Read spoken turns from a WAV file instead of the microphone."
+    ),
+    fan_out: Optional[str] = typer.Option(
+        None, "--fan-out", help="Comma-separated agents answering every turn together, e.g. Researcher,Planner."
+    ),
+    turn_timeout: Optional[float] = typer.Option(
+        None, "--turn-timeout", help="Wall-clock seconds per turn; longer replies are cut short and marked truncated."
+    ),
+    memory: bool = typer.Option(
+        False, "--memory/--no-memory", help="Recall relevant turns from earlier sessions (stored under .smolmind/memory)."
+    ),
+    trace: Optional[Path] = typer.Option(
+        None, "--trace", help="Append a JSONL trace of every turn (prompts, completions, tools, timings) to this file."
+    ),
+    fast_path_writes: bool = typer.Option(
+        False, "--fast-path-writes", help="Let the fast path run state-changing intents such as adding a todo."
+    ),
 ) -> None:
     """Launch a chat loop with the SmolMind assistant."""
-    _run_chat(voice=voice, verbose=verbose, agent=agent, base_path=base_path)
+    _run_chat(
+        voice=voice,
+        verbose=verbose,
+        agent=agent,
+        base_path=base_path,
+        voice_input=voice_input,
+        fan_out=fan_out,
+        turn_timeout=turn_timeout,
+        memory=memory,
+        trace=trace,
+        fast_path_writes=fast_path_writes,
+    )
 
 
 @app.command()
@@ -157,11 +269,7 @@ def call_tool(
 ):
     """Invoke a tool directly from the CLI."""
     registry = load_default_tools(base_path=base_path)
-    context = getattr(registry, "default_context", None)
-    if context is None:
-        from .tools import ToolContext
-
-        context = ToolContext.build(base_path=base_path)
+    context = registry.default_context
     try:
         payload = json.loads(args)
     except json.JSONDecodeError as exc:
@@ -176,6 +284,192 @@ def call_tool(
     console.print(result)
 
 
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+@app.command()
+def bench_model(
+    dtypes: str = typer.Option("float32,bfloat16", "--dtypes", help="Comma-separated torch dtypes to compare."),
+    threads: str = typer.Option("", "--threads", help="Comma-separated torch thread counts (default: 1, half, all cores)."),
+    batch_sizes: str = typer.Option("1,4", "--batch-sizes", help="Comma-separated batch sizes."),
+    prompt_lengths: str = typer.Option("128,512", "--prompt-lengths", help="Comma-separated prompt lengths in tokens."),
+    max_new_tokens: str = typer.Option("32,128", "--max-new-tokens", help="Comma-separated generation lengths."),
+    output: Path = typer.Option(Path("bench-model.json"), "--output", "-o", help="Report path (.json or .csv)."),
+    tiny: bool = typer.Option(False, "--tiny", help="Benchmark a tiny random model built locally (offline)."),
+) -> None:
+    """Sweep dtype, threads, batch size and prompt length for the configured model."""
+    from .bench import build_tiny_model, recommend, run_sweep, write_report
+
+    settings = ModelSettings()
+    cores = os.cpu_count() or 1
+    thread_counts = _int_list(threads) or sorted({1, max(1, cores // 2), cores})
+    with ExitStack() as stack:
+        if tiny:
+            import tempfile
+
+            # A private directory per run: a fixed /tmp path could be planted or stale.
+            tiny_dir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="smolmind-tiny-")))
+            settings = settings.model_copy(update={"model_id": str(build_tiny_model(tiny_dir)), "device_map": "cpu"})
+        console.print(f"[bold]Benchmarking[/] {settings.model_id}")
+        results = run_sweep(
+            settings,
+            dtypes=[name.strip() for name in dtypes.split(",") if name.strip()],
+            threads=thread_counts,
+            batch_sizes=_int_list(batch_sizes),
+            prompt_lengths=_int_list(prompt_lengths),
+            max_new_tokens=_int_list(max_new_tokens),
+        )
+
+    table = Table(
+        "dtype", "threads", "batch", "prompt", "new", "load s", "TTFT s", "decode tok/s", "peak MB", "+MB"
+    )
+    for row in results:
+        table.add_row(
+            row.dtype,
+            str(row.threads),
+            str(row.batch_size),
+            str(row.prompt_length),
+            str(row.max_new_tokens),
+            f"{row.load_seconds:.1f}",
+            f"{row.ttft_seconds:.3f}",
+            f"{row.decode_tokens_per_second:.1f}",
+            f"{row.peak_rss_mb:.0f}",
+            f"{row.rss_delta_mb:.0f}",
+        )
+    console.print(table)
+
+    recommendation = recommend(results)
+    write_report(results, recommendation, output)
+    if recommendation:
+        env = " ".join(f"{key}={value}" for key, value in recommendation["env"].items())
+        console.print(f"[green]Recommended:[/] {env} (batch {recommendation['throughput_batch_size']} for throughput)")
+    console.print(f"Report written to {output}")
+
+
+@app.command("replay")
+def replay_traces(
+    trace: Path = typer.Argument(..., help="Trace file recorded with `chat --trace`."),
+    mode: str = typer.Option("recorded", "--mode", help="recorded: reuse recorded completions; live: call the model."),
+    concurrency: int = typer.Option(4, "--concurrency", min=1, help="Sessions replayed in parallel."),
+    speedup: float = typer.Option(
+        0.0, "--speedup", min=0.0, help="Divide recorded arrival gaps by this factor; 0 replays back-to-back."
+    ),
+    output: Path = typer.Option(Path("replay-report.json"), "--output", "-o", help="Where to write the JSON report."),
+    baseline: Optional[Path] = typer.Option(None, "--baseline", help="Earlier report to compare percentiles with."),
+    base_path: Optional[Path] = typer.Option(
+        None, "--base-path", help="Working directory for replayed tools (default: a throwaway temp dir)."
+    ),
+    admission: bool = typer.Option(
+        False, "--admission", help="Put model calls behind the admission controller (SMOLMIND_ADMISSION_* limits)."
+    ),
+) -> None:
+    """Replay a recorded trace through AgentCore and report a latency histogram."""
+    import tempfile
+
+    from .admission import INTERACTIVE, AdmissionController
+    from .models import generate_batch, generate_completion
+    from .replay import REPLAY_MODES, RecordedModel, compare, core_from_config, replay
+    from .tracing import load_traces
+
+    if mode not in REPLAY_MODES:
+        console.print(f"[red]Unknown mode '{mode}'. Use one of {', '.join(REPLAY_MODES)}.[/]")
+        raise typer.Exit(code=1)
+    traces = load_traces(trace)
+    if not traces:
+        console.print(f"[yellow]No turns in {trace}.[/]")
+        raise typer.Exit(code=1)
+
+    # Replayed tools really run (e.g. todo adds), so keep them away from real data by default.
+    scratch = base_path or Path(tempfile.mkdtemp(prefix="smolmind-replay-"))
+    settings = ModelSettings()
+    recorded = RecordedModel() if mode == "recorded" else None
+    completion_fn = recorded.completion_fn if recorded else generate_completion
+    batch_fn = recorded.batch_fn if recorded else generate_batch
+    controller = AdmissionController.from_settings(settings) if admission else None
+    if controller is not None:
+        completion_fn = controller.wrap_completion(completion_fn)
+        batch_fn = controller.wrap_batch(batch_fn, priority=INTERACTIVE)
+    # Rebuild the core the trace was recorded with (fan-out, memory, fast path, ...).
+    config = traces[0].config
+    if any(item.config != config for item in traces):
+        console.print("[yellow]Trace mixes several core configurations; replaying all turns with the first.[/]")
+    registry = load_default_tools(base_path=scratch)
+    core = core_from_config(
+        config,
+        tool_registry=registry,
+        model_settings=settings,
+        base_path=scratch,
+        completion_fn=completion_fn,
+        batch_fn=batch_fn,
+        memory=_open_memory(registry, settings) if config.get("memory") else None,
+    )
+    sessions = len({item.session for item in traces})
+    console.print(f"Replaying {len(traces)} turns from {sessions} sessions ({mode}, concurrency {concurrency})")
+    try:
+        report = replay(core, traces, mode=mode, concurrency=concurrency, speedup=speedup, recorded=recorded)
+    finally:
+        if core.memory is not None:
+            core.memory.close()
+
+    console.print(report.render_histogram())
+    summary = report.summary()
+    console.print(
+        f"p50 {summary['p50']:.4f}s  p90 {summary['p90']:.4f}s  p99 {summary['p99']:.4f}s  max {summary['max']:.4f}s  "
+        f"({summary['throughput_tps']} turns/s, {report.errors} errors, {report.shed} shed, {report.diverged} diverged)"
+    )
+    if controller is not None:
+        stats = controller.stats()
+        console.print(
+            f"admission: peak queue {stats.peak_depth}, wait p50 {stats.wait_p50:.3f}s p99 {stats.wait_p99:.3f}s "
+            f"(SLO {stats.slo_seconds:.1f}s), "
+            f"shed {stats.shed['interactive']} interactive / {stats.shed['batch']} batch, "
+            f"{stats.degraded_tokens} shortened, {stats.degraded_model} on fallback model"
+        )
+    console.print(f"[grey53]recorded: p50 {summary['recorded_p50']:.4f}s  p99 {summary['recorded_p99']:.4f}s[/]")
+    if baseline is not None:
+        changes = compare(report, baseline)
+        console.print("vs baseline: " + "  ".join(f"{key} {change:+.1%}" for key, change in changes.items()))
+    report.write(output)
+    console.print(f"Report written to {output}")
+
+
+@app.command()
+def adapters(
+    swaps: int = typer.Option(5, "--swaps", help="Switch through every adapter this many times to time hot-swaps."),
+) -> None:
+    """Load the per-agent LoRA adapters and report their memory and switch latency."""
+    settings = ModelSettings()
+    if not settings.agent_adapters:
+        console.print('[yellow]No adapters configured. Set SMOLMIND_AGENT_ADAPTERS=\'{"Coder": "path/to/adapter"}\'.[/]')
+        raise typer.Exit(code=1)
+
+    manager = get_adapter_manager(settings)
+    base_bytes = sum(param.numel() * param.element_size() for param in manager.pipe.model.parameters())
+    for path in settings.agent_adapters.values():
+        manager.load(path)
+    paths = list(settings.agent_adapters.values()) + [None]
+    for _ in range(swaps):
+        for path in paths:
+            with manager.use(path):
+                pass
+
+    by_path = {stats.path: stats for stats in manager.report()}
+    table = Table("agent", "adapter", "params MB", "% of base", "load s", "switch ms")
+    for agent_name, path in settings.agent_adapters.items():
+        stats = by_path[path]
+        table.add_row(
+            agent_name,
+            path,
+            f"{stats.parameter_bytes / 2**20:.2f}",
+            f"{100 * stats.parameter_bytes / base_bytes:.2f}",
+            f"{stats.load_seconds:.2f}",
+            f"{stats.mean_switch_ms:.2f}",
+        )
+    console.print(table)
+    console.print(f"Base model: {base_bytes / 2**20:.0f} MB, loaded once and shared by every agent.")
+
+
 @app.callback(invoke_without_command=True)
 def _default(
     ctx: typer.Context,
@@ -183,10 +477,39 @@ def _default(
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Show raw tool requests."),
     agent: Optional[str] = typer.Option(None, "--agent", help="Pin to a specific micro-agent."),
     base_path: Path = typer.Option(Path.cwd(), "--base-path", help="Working directory for tools."),
+    voice_input: Optional[Path] = typer.Option(
+        None, "--voice-input", help="Read spoken turns from a WAV file instead of the microphone."
+    ),
+    fan_out: Optional[str] = typer.Option(
+        None, "--fan-out", help="Comma-separated agents answering every turn together, e.g. Researcher,Planner."
+    ),
+    turn_timeout: Optional[float] = typer.Option(
+        None, "--turn-timeout", help="Wall-clock seconds per turn; longer replies are cut short and marked truncated."
+    ),
+    memory: bool = typer.Option(
+        False, "--memory/--no-memory", help="Recall relevant turns from earlier sessions (stored under .smolmind/memory)."
+    ),
+    trace: Optional[Path] = typer.Option(
+        None, "--trace", help="Append a JSONL trace of every turn (prompts, completions, tools, timings) to this file."
+    ),
+    fast_path_writes: bool = typer.Option(
+        False, "--fast-path-writes", help="Let the fast path run state-changing intents such as adding a todo."
+    ),
 ) -> None:
     """Fallback to chat when no subcommand is provided."""
     if ctx.invoked_subcommand is None:
-        _run_chat(voice=voice, verbose=verbose, agent=agent, base_path=base_path)
+        _run_chat(
+            voice=voice,
+            verbose=verbose,
+            agent=agent,
+            base_path=base_path,
+            voice_input=voice_input,
+            fan_out=fan_out,
+            turn_timeout=turn_timeout,
+            memory=memory,
+            trace=trace,
+            fast_path_writes=fast_path_writes,
+        )
         raise typer.Exit()
 
 
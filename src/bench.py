@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .models import ModelSettings, get_chat_pipeline, warmup_prompt
+
+logger = logging.getLogger(__name__)
+
+TINY_MODEL_WORDS = (
+    "the a an and or of to in on for with is are was be it this that you we they local small fast model agent "
+    "tool plan code file note task list done time day week summary answer question help make run test"
+).split()
+
+
+@dataclass
+class BenchResult:
+    dtype: str
+    threads: int
+    batch_size: int
+    prompt_length: int
+    max_new_tokens: int
+    load_seconds: float
+    ttft_seconds: float
+    decode_tokens_per_second: float
+    total_tokens_per_second: float
+    # Highest RSS sampled while this combination ran, model weights included.
+    peak_rss_mb: float
+    # That peak minus the RSS just before the combination: its KV cache and activations.
+    rss_delta_mb: float = 0.0
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process."""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            with open("/proc/self/statm", encoding="ascii") as handle:
+                pages = int(handle.read().split()[1])
+        except (OSError, ValueError, IndexError):  # pragma: no cover - neither psutil nor procfs
+            return 0.0
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    return psutil.Process().memory_info().rss / 2**20
+
+
+class _RssSampler:
+    """Sample RSS in a background thread while the ``with`` block runs.
+
+    ``ru_maxrss`` only ever grows over the process lifetime, so it cannot
+    attribute memory to one combination of a sweep.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.baseline_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "_RssSampler":
+        self.baseline_mb = self.peak_mb = _rss_mb()
+        self._thread = threading.Thread(target=self._run, name="smolmind-rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _rss_mb())
+
+
+def _timing_streamer():
+    from transformers.generation.streamers import BaseStreamer
+
+    class _TimingStreamer(BaseStreamer):
+        """Record when each decode step emits tokens (the first ``put`` is the prompt)."""
+
+        def __init__(self) -> None:
+            self.start = time.perf_counter()
+            self.steps: List[float] = []
+            self._seen_prompt = False
+
+        def put(self, value) -> None:
+            if not self._seen_prompt:
+                self._seen_prompt = True
+                return
+            self.steps.append(time.perf_counter())
+
+        def end(self) -> None:
+            pass
+
+    return _TimingStreamer()
+
+
+def _measure(pipe, batch_size: int, prompt_length: int, max_new_tokens: int) -> Dict[str, float]:
+    import torch
+
+    tokenizer, model = pipe.tokenizer, pipe.model
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    prompts = [warmup_prompt(tokenizer, prompt_length)] * batch_size
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+
+    streamer = _timing_streamer()
+    with torch.inference_mode():
+        model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            min_new_tokens=max_new_tokens,
+            do_sample=False,
+            streamer=streamer,
+            pad_token_id=tokenizer.pad_token_id,
+        )
+    end = time.perf_counter()
+    steps = streamer.steps
+    if not steps:
+        raise RuntimeError("Model produced no tokens.")
+    ttft = steps[0] - streamer.start
+    decode_seconds = end - steps[0]
+    decode_tokens = (len(steps) - 1) * batch_size
+    return {
+        "ttft_seconds": ttft,
+        "decode_tokens_per_second": decode_tokens / decode_seconds if decode_seconds > 0 else 0.0,
+        "total_tokens_per_second": len(steps) * batch_size / (end - streamer.start),
+    }
+
+
+def _sweep_dtype(settings_data: Dict[str, Any], combos: List[Sequence[int]]) -> List[Dict[str, Any]]:
+    """Run in a fresh process so load time and memory belong to this dtype only."""
+    import torch
+
+    settings = ModelSettings(**settings_data)
+    start = time.perf_counter()
+    pipe = get_chat_pipeline(settings)
+    load_seconds = time.perf_counter() - start
+
+    rows = []
+    for threads, batch_size, prompt_length, max_new_tokens in combos:
+        torch.set_num_threads(threads)
+        _measure(pipe, batch_size, min(prompt_length, 16), 2)  # warm kernels for this thread count
+        with _RssSampler() as rss:
+            metrics = _measure(pipe, batch_size, prompt_length, max_new_tokens)
+        rows.append(
+            asdict(
+                BenchResult(
+                    dtype=settings.dtype or "default",
+                    threads=threads,
+                    batch_size=batch_size,
+                    prompt_length=prompt_length,
+                    max_new_tokens=max_new_tokens,
+                    load_seconds=load_seconds,
+                    peak_rss_mb=rss.peak_mb,
+                    rss_delta_mb=rss.peak_mb - rss.baseline_mb,
+                    **metrics,
+                )
+            )
+        )
+        logger.info("bench %s", rows[-1])
+    return rows
+
+
+def run_sweep(
+    settings: ModelSettings,
+    dtypes: Sequence[str],
+    threads: Sequence[int],
+    batch_sizes: Sequence[int],
+    prompt_lengths: Sequence[int],
+    max_new_tokens: Sequence[int],
+) -> List[BenchResult]:
+    """Sweep the parameter matrix; each dtype is measured in its own subprocess."""
+    combos = list(itertools.product(threads, batch_sizes, prompt_lengths, max_new_tokens))
+    results: List[BenchResult] = []
+    ctx = multiprocessing.get_context("spawn")
+    for dtype in dtypes:
+        settings_data = settings.model_copy(update={"dtype": dtype or None, "compile": False}).model_dump()
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            rows = executor.submit(_sweep_dtype, settings_data, combos).result()
+        results.extend(BenchResult(**row) for row in rows)
+    return results
+
+
+def recommend(results: Sequence[BenchResult]) -> Optional[Dict[str, Any]]:
+    """Pick the dtype/thread count with the best median single-request decode speed.
+
+    The batch size with the best aggregate throughput for that pair is reported
+    alongside it for batch workloads.
+    """
+    if not results:
+        return None
+    by_layout: Dict[tuple, List[BenchResult]] = {}
+    for result in results:
+        by_layout.setdefault((result.dtype, result.threads), []).append(result)
+
+    def interactive_score(rows: List[BenchResult]) -> float:
+        single = [row.decode_tokens_per_second for row in rows if row.batch_size == 1] or [
+            row.decode_tokens_per_second / row.batch_size for row in rows
+        ]
+        return statistics.median(single)
+
+    (dtype, threads), rows = max(by_layout.items(), key=lambda item: interactive_score(item[1]))
+    best_batch = max(rows, key=lambda row: row.total_tokens_per_second)
+    return {
+        "dtype": dtype,
+        "threads": threads,
+        "interactive_decode_tokens_per_second": interactive_score(rows),
+        "median_ttft_seconds": statistics.median(row.ttft_seconds for row in rows),
+        "throughput_batch_size": best_batch.batch_size,
+        "throughput_tokens_per_second": best_batch.total_tokens_per_second,
+        "env": {
+            "SMOLMIND_DTYPE": dtype,
+            "OMP_NUM_THREADS": str(threads),
+            "SMOLMIND_THREADS_PER_REPLICA": str(threads),
+        },
+    }
+
+
+def write_report(results: Sequence[BenchResult], recommendation: Optional[Dict[str, Any]], output: Path) -> None:
+    """Write ``output`` as JSON (results + recommendation) or CSV, chosen by suffix."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    rows = [asdict(result) for result in results]
+    if output.suffix.lower() == ".csv":
+        with output.open("w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(BenchResult.__dataclass_fields__))
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+    output.write_text(json.dumps({"results": rows, "recommended": recommendation}, indent=2), encoding="utf-8")
+
+
+def build_tiny_model(path: Path) -> Path:
+    """Save a randomly initialised two-layer Llama and word-level tokenizer to ``path``.
+
+    Needs no network access, so benchmarks and tests can run offline.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    path = Path(path)
+    if (path / "config.json").exists():
+        return path
+    specials = ["<unk>", "<s>", "</s>", "<pad>"]
+    symbols = list("<>|.,!?:;'\"-_/()[]{}#*=+0123456789")
+    vocab = {token: index for index, token in enumerate(specials + TINY_MODEL_WORDS + symbols)}
+    backend = Tokenizer(models.WordLevel(vocab=vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, unk_token="<unk>", bos_token="<s>", eos_token="</s>", pad_token="<pad>"
+    )
+    config = LlamaConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        intermediate_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=2048,
+        bos_token_id=vocab["<s>"],
+        eos_token_id=vocab["</s>"],
+        pad_token_id=vocab["<pad>"],
+    )
+    path.mkdir(parents=True, exist_ok=True)
+    LlamaForCausalLM(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+__all__ = ["BenchResult", "build_tiny_model", "recommend", "run_sweep", "write_report"]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class CancelledError(RuntimeError):
+    """Raised when work is abandoned because its cancellation token fired."""
+
+
+class CancellationToken:
+    """Cooperative cancellation flag with an optional wall-clock deadline.
+
+    Generation checks it between decode steps and tool execution between
+    polls, so cancelling frees the model within one step. A token created with
+    ``parent`` is cancelled whenever the parent is.
+    """
+
+    def __init__(self, timeout: float | None = None, parent: "CancellationToken | None" = None) -> None:
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.parent = parent
+        self._event = threading.Event()
+        self._reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        if parent is not None:
+            if parent.deadline is not None:
+                self.deadline = parent.deadline if self.deadline is None else min(self.deadline, parent.deadline)
+            parent.add_callback(lambda: self.cancel(parent.reason or "cancelled"))
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` on explicit cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            with self._lock:
+                if self._reason is None:
+                    self._reason = "deadline exceeded"
+            return True
+        return False
+
+    @property
+    def reason(self) -> Optional[str]:
+        # Checking ``cancelled`` records the reason for a deadline nobody has polled yet.
+        if self._reason is None and not self.cancelled:
+            return None
+        return self._reason
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None when there is no deadline)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise CancelledError(self.reason or "cancelled")
+
+
+__all__ = ["CancellationToken", "CancelledError"]
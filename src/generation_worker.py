@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional
+
+from .agent_core import AgentCore, AgentState, AgentTurn
+from .cancellation import CancellationToken, CancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the generation queue is at capacity."""
+
+
+@dataclass
+class GenerationJob:
+    """A queued ``process_turn`` call whose text streams in as it is generated."""
+
+    user_text: str
+    state: AgentState
+    turn: Optional[AgentTurn] = None
+    error: Optional[BaseException] = None
+    cancel_token: CancellationToken = field(default_factory=CancellationToken)
+    _chunks: List[str] = field(default_factory=list, repr=False)
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _started: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def started(self) -> bool:
+        return self._started.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def cancel(self) -> None:
+        """Stop generation at the next decode step (or skip the job if it is still queued)."""
+        self.cancel_token.cancel()
+
+
+class GenerationWorker:
+    """Background threads draining a bounded queue of generation jobs.
+
+    One worker shares a single ``AgentCore`` (and model) across many callers;
+    each job carries its caller's own ``AgentState``. Use ``concurrency > 1``
+    only when the core's completion function can serve requests in parallel
+    (e.g. a ``ReplicaPool``).
+    """
+
+    def __init__(self, agent_core: AgentCore, max_queue: int = 8, concurrency: int = 1) -> None:
+        self.agent_core = agent_core
+        self.max_queue = max_queue
+        self._pending: Deque[GenerationJob] = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"smolmind-generation-{index}", daemon=True)
+            for index in range(concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user_text: str, state: AgentState) -> GenerationJob:
+        job = GenerationJob(user_text=user_text, state=state)
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(f"Generation queue is full ({self.max_queue} waiting). Try again shortly.")
+            self._pending.append(job)
+            self._cond.notify()
+        return job
+
+    def position(self, job: GenerationJob) -> int:
+        """1-based position among waiting jobs, or 0 once the job has started."""
+        with self._cond:
+            try:
+                return self._pending.index(job) + 1
+            except ValueError:
+                return 0
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = self._pending.popleft()
+            job._started.set()
+            if job.cancel_token.cancelled:
+                job.error = CancelledError("Request was cancelled before it started.")
+                job._done.set()
+                continue
+            try:
+                job.turn = self.agent_core.process_turn(
+                    job.user_text, state=job.state, on_token=job._chunks.append, cancel=job.cancel_token
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Generation failed")
+                job.error = exc
+            finally:
+                job._done.set()
+
+
+__all__ = ["GenerationJob", "GenerationWorker", "QueueFullError"]
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import queue
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i in is it its me my of on or so that the this to "
+    "was we what when where which who why will with you your".split()
+)
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: hashed unigrams + bigrams with sublinear TF, L2-normalised."""
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [word for word in TOKEN_REGEX.findall(text.lower()) if word not in STOPWORDS]
+            features = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+            counts: dict[str, int] = {}
+            for feature in features:
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                index, sign = self._bucket(feature)
+                vectors[row, index] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-8)
+
+
+class SentenceTransformerEmbedder:
+    """Wraps ``sentence-transformers`` when installed (e.g. ``all-MiniLM-L6-v2``)."""
+
+    def __init__(self, model_name: str) -> None:
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise ImportError("Install `sentence-transformers` to use a neural embedding model.") from exc
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self._model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+
+@dataclass
+class MemoryRecord:
+    id: int
+    user: str
+    assistant: str
+    agent: Optional[str] = None
+    score: float = 0.0
+
+    def render(self) -> str:
+        return f"User: {self.user}\nAssistant: {self.assistant}"
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class ConversationMemory:
+    """Append-only store of finished turns with vector retrieval.
+
+    Layout under ``root``: ``vectors.f16`` holds one float16 row per turn and
+    ``turns.jsonl`` the matching text. Both files are only ever appended to,
+    under an exclusive ``flock`` on ``lock`` so several processes can share one
+    store; each append first reads rows other processes added. Search uses an
+    in-memory float32 copy, so recall over tens of thousands of turns takes a
+    few milliseconds. New turns are embedded on a background thread.
+    """
+
+    def __init__(self, root: Path, embedder: Embedder | None = None) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or HashingEmbedder()
+        self.vectors_path = self.root / "vectors.f16"
+        self.turns_path = self.root / "turns.jsonl"
+        self.meta_path = self.root / "meta.json"
+        self.lock_path = self.root / "lock"
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._load()
+        self._thread = threading.Thread(target=self._run, name="smolmind-memory", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Serialise file changes across processes sharing ``root``."""
+        if fcntl is None:
+            yield
+            return
+        with self.lock_path.open("a+b") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        dim = self.embedder.dim
+        if self.meta_path.exists():
+            stored_dim = json.loads(self.meta_path.read_text(encoding="utf-8")).get("dim")
+            if stored_dim != dim:
+                raise ValueError(f"Memory at '{self.root}' uses {stored_dim}-dim vectors; embedder produces {dim}.")
+        else:
+            self.meta_path.write_text(json.dumps({"dim": dim, "dtype": "float16"}), encoding="utf-8")
+
+        # Rows [0, _count) of _matrix are live; the rest is spare capacity that doubles as needed.
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._records: List[MemoryRecord] = []
+        self._count = 0
+        with self._file_lock():
+            records, _ = _read_records(self.turns_path, 0)
+            size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+            count = min(size // self._row_bytes, len(records))
+            if count:
+                matrix = np.fromfile(self.vectors_path, dtype=np.float16, count=count * dim).reshape(count, dim)
+                self._add_rows(matrix, records[:count])
+            if size != count * self._row_bytes or len(records) != count:
+                self._truncate(count)
+            self._turns_offset = self.turns_path.stat().st_size if self.turns_path.exists() else 0
+
+    @property
+    def _row_bytes(self) -> int:
+        return 2 * self.embedder.dim
+
+    def _truncate(self, count: int) -> None:
+        """Drop a half-written trailing turn so vectors and texts stay aligned."""
+        with self.vectors_path.open("a+b") as handle:
+            handle.truncate(count * self._row_bytes)
+        with self.turns_path.open("w", encoding="utf-8") as handle:
+            for record in self._records:
+                handle.write(json.dumps(_record_payload(record)) + "\n")
+
+    def _add_rows(self, vectors: np.ndarray, records: List[MemoryRecord]) -> None:
+        needed = self._count + len(records)
+        if needed > len(self._matrix):
+            # Amortised doubling; recall() keeps reading the old buffer it sliced.
+            grown = np.zeros((max(needed, 2 * len(self._matrix), 64), self.embedder.dim), dtype=np.float32)
+            grown[: self._count] = self._matrix[: self._count]
+            self._matrix = grown
+        self._matrix[self._count : needed] = vectors
+        self._records.extend(records)
+        self._count = needed
+
+    def _catch_up(self) -> None:
+        """Load turns other processes appended since this store last read the files."""
+        rows = self.vectors_path.stat().st_size // self._row_bytes if self.vectors_path.exists() else 0
+        if rows <= self._count:
+            return
+        records, self._turns_offset = _read_records(self.turns_path, self._turns_offset)
+        vectors = np.fromfile(
+            self.vectors_path,
+            dtype=np.float16,
+            count=(rows - self._count) * self.embedder.dim,
+            offset=self._count * self._row_bytes,
+        ).reshape(-1, self.embedder.dim)
+        count = min(len(vectors), len(records))
+        self._add_rows(vectors[:count], records[:count])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def remember(self, user: str, assistant: str, agent: Optional[str] = None) -> None:
+        """Queue a finished turn for background embedding and storage."""
+        self._queue.put((user, assistant, agent))
+
+    def flush(self) -> None:
+        """Block until every queued turn has been stored."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._append(*item)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to store conversation memory")
+            finally:
+                self._queue.task_done()
+
+    def _append(self, user: str, assistant: str, agent: Optional[str]) -> None:
+        vector = self.embedder.embed([f"{user}\n{assistant}"])[0].astype(np.float32)
+        with self._lock, self._file_lock():
+            self._catch_up()
+            record = MemoryRecord(id=self._count, user=user, assistant=assistant, agent=agent)
+            line = (json.dumps(_record_payload(record)) + "\n").encode("utf-8")
+            with self.vectors_path.open("ab") as handle:
+                handle.write(vector.astype(np.float16).tobytes())
+            with self.turns_path.open("ab") as handle:
+                handle.write(line)
+            self._turns_offset += len(line)
+            self._add_rows(vector[None, :], [record])
+
+    def recall(
+        self,
+        query: str,
+        k: int = 3,
+        token_budget: int = 256,
+        exclude_recent: int = 0,
+        min_score: float = 0.15,
+    ) -> List[MemoryRecord]:
+        """Top-``k`` past turns relevant to ``query`` that fit in ``token_budget``.
+
+        ``exclude_recent`` skips the newest turns (already in the prompt window).
+        """
+        with self._lock:
+            # Rows below _count are never rewritten, so the slice stays valid after the lock is released.
+            count = self._count
+            matrix, records = self._matrix[:count], self._records
+        searchable = count - exclude_recent
+        if searchable <= 0 or k <= 0:
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        scores = matrix[:searchable] @ query_vector
+        k = min(k, searchable)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        selected: List[MemoryRecord] = []
+        used = 0
+        for index in top:
+            score = float(scores[index])
+            if score < min_score:
+                break
+            record = records[int(index)]
+            cost = estimate_tokens(record.render())
+            if used + cost > token_budget:
+                continue
+            used += cost
+            selected.append(MemoryRecord(record.id, record.user, record.assistant, record.agent, score))
+        return selected
+
+
+def _read_records(path: Path, offset: int) -> Tuple[List[MemoryRecord], int]:
+    """Records in ``path`` from byte ``offset`` on, and the offset just past the last complete one."""
+    records: List[MemoryRecord] = []
+    if not path.exists():
+        return records, offset
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break  # torn final line after a crash
+            try:
+                records.append(MemoryRecord(**json.loads(line)))
+            except (json.JSONDecodeError, TypeError):
+                break
+            offset += len(line)
+    return records, offset
+
+
+def _record_payload(record: MemoryRecord) -> dict:
+    return {"id": record.id, "user": record.user, "assistant": record.assistant, "agent": record.agent}
+
+
+__all__ = [
+    "ConversationMemory",
+    "HashingEmbedder",
+    "MemoryRecord",
+    "SentenceTransformerEmbedder",
+]
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from pydantic import Field
+from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .adapters import AdapterManager
+from .cancellation import CancellationToken
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,47 +23,113 @@ class ModelSettings(BaseSettings):
     model_id: str = Field(
         "TinyLlama/TinyLlama-1.1B-Chat-v1.0",
         description="Default HF model to use for chat completions.",
-        env="SMOLMIND_MODEL_ID",
+        validation_alias=AliasChoices("SMOLMIND_MODEL_ID", "model_id"),
     )
     device_map: str = Field(
         "auto",
         description="Device placement strategy passed to transformers.pipeline.",
-        env="SMOLMIND_DEVICE",
+        validation_alias=AliasChoices("SMOLMIND_DEVICE", "device_map"),
     )
     dtype: Optional[str] = Field(
         None,
         description="Optional torch dtype (e.g. float16, bfloat16).",
-        env="SMOLMIND_DTYPE",
+        validation_alias=AliasChoices("SMOLMIND_DTYPE", "dtype"),
     )
     max_new_tokens: int = Field(
         512,
         ge=32,
         le=1024,
         description="Maximum tokens generated per assistant turn.",
-        env="SMOLMIND_MAX_NEW_TOKENS",
+        validation_alias=AliasChoices("SMOLMIND_MAX_NEW_TOKENS", "max_new_tokens"),
     )
     temperature: float = Field(
         0.3,
         ge=0.0,
         le=1.5,
         description="Sampling temperature applied during generation.",
-        env="SMOLMIND_TEMPERATURE",
+        validation_alias=AliasChoices("SMOLMIND_TEMPERATURE", "temperature"),
     )
     top_p: float = Field(
         0.9,
         ge=0.1,
         le=1.0,
         description="Top-p nucleus sampling parameter.",
-        env="SMOLMIND_TOP_P",
+        validation_alias=AliasChoices("SMOLMIND_TOP_P", "top_p"),
+    )
+    compile: bool = Field(
+        False,
+        description="Use a static KV cache and torch.compile, warmed up at load time.",
+        validation_alias=AliasChoices("SMOLMIND_COMPILE", "compile"),
+    )
+    warmup_prompt_lengths: List[int] = Field(
+        [32, 128, 512],
+        description="Prompt lengths (in tokens) generated once at load time when compile is enabled.",
+        validation_alias=AliasChoices("SMOLMIND_WARMUP_PROMPT_LENGTHS", "warmup_prompt_lengths"),
+    )
+    replicas: int = Field(
+        1,
+        ge=1,
+        le=64,
+        description="Model worker processes used by multi-user front-ends such as the Streamlit UI.",
+        validation_alias=AliasChoices("SMOLMIND_REPLICAS", "replicas"),
+    )
+    threads_per_replica: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Torch threads (and pinned CPUs) per replica; defaults to an even split of the host.",
+        validation_alias=AliasChoices("SMOLMIND_THREADS_PER_REPLICA", "threads_per_replica"),
+    )
+    agent_adapters: Dict[str, str] = Field(
+        default_factory=dict,
+        description="LoRA adapter path per agent name (JSON), applied on top of the shared base model.",
+        validation_alias=AliasChoices("SMOLMIND_AGENT_ADAPTERS", "agent_adapters"),
+    )
+    embedding_model: Optional[str] = Field(
+        None,
+        description="sentence-transformers model for long-term memory; a built-in hashing embedder is used when unset.",
+        validation_alias=AliasChoices("SMOLMIND_EMBEDDING_MODEL", "embedding_model"),
+    )
+    admission_concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Model calls allowed in flight by the admission controller; defaults to the replica count.",
+        validation_alias=AliasChoices("SMOLMIND_ADMISSION_CONCURRENCY", "admission_concurrency"),
+    )
+    admission_max_queue: int = Field(
+        16,
+        ge=0,
+        description="Model calls allowed to wait for a slot before new ones are shed.",
+        validation_alias=AliasChoices("SMOLMIND_ADMISSION_MAX_QUEUE", "admission_max_queue"),
+    )
+    queue_slo_seconds: float = Field(
+        2.0,
+        gt=0,
+        description="Target queue wait; above it replies are shortened, then routed to the fallback model or shed.",
+        validation_alias=AliasChoices("SMOLMIND_QUEUE_SLO_SECONDS", "queue_slo_seconds"),
+    )
+    degraded_max_new_tokens: int = Field(
+        128,
+        ge=16,
+        le=1024,
+        description="max_new_tokens cap applied while queue wait is over the SLO.",
+        validation_alias=AliasChoices("SMOLMIND_DEGRADED_MAX_NEW_TOKENS", "degraded_max_new_tokens"),
+    )
+    fallback_model_id: Optional[str] = Field(
+        None,
+        description="Smaller HF model used while queue wait is over twice the SLO (in-process generation only).",
+        validation_alias=AliasChoices("SMOLMIND_FALLBACK_MODEL_ID", "fallback_model_id"),
     )
     hf_token: Optional[str] = Field(
-        None, description="Optional Hugging Face access token for gated models.", env="HUGGING_FACE_HUB_TOKEN"
+        None,
+        description="Optional Hugging Face access token for gated models.",
+        validation_alias=AliasChoices("HUGGING_FACE_HUB_TOKEN", "hf_token"),
     )
 
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         extra="ignore",
+        populate_by_name=True,
     )
 
 
@@ -87,8 +160,129 @@ def _default_dtype_for_device(device_map: str | None) -> Optional[str]:
     return None
 
 
+@dataclass
+class GenerationStats:
+    """Load-time and running throughput figures for one loaded pipeline."""
+
+    compiled: bool = False
+    warmup_seconds: float = 0.0
+    fallback_reason: Optional[str] = None
+    tokens_generated: int = 0
+    generation_seconds: float = 0.0
+    # Eager-mode forward and cache setting, kept so a failure after warm-up can restore them.
+    _eager_forward: Optional[Callable[..., Any]] = field(default=None, repr=False, compare=False)
+    _eager_cache: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.generation_seconds <= 0:
+            return 0.0
+        return self.tokens_generated / self.generation_seconds
+
+    def record(self, tokens: int, seconds: float) -> None:
+        with _STATS_LOCK:
+            self.tokens_generated += tokens
+            self.generation_seconds += seconds
+
+    def fall_back_to_eager(self, pipe, exc: Exception) -> None:
+        """Restore eager generation on ``pipe`` after the compiled path failed with ``exc``."""
+        with _STATS_LOCK:
+            if not self.compiled:
+                return
+            pipe.model.forward = self._eager_forward
+            pipe.model.generation_config.cache_implementation = self._eager_cache
+            self.compiled = False
+            self.fallback_reason = f"{type(exc).__name__}: {exc}"
+        logger.warning("Compiled generation failed, falling back to eager mode: %s", exc)
+
+
+_STATS_LOCK = threading.Lock()
+_GENERATION_STATS: Dict[Tuple[Any, ...], GenerationStats] = {}
+
+
+def warmup_prompt(tokenizer, length: int) -> str:
+    """A filler prompt of exactly ``length`` tokens, for warm-up passes and benchmarks."""
+    ids = tokenizer("hello", add_special_tokens=False)["input_ids"] or [tokenizer.eos_token_id]
+    return tokenizer.decode((ids * length)[:length])
+
+
+def _enable_compiled_generation(pipe, warmup_lengths: Tuple[int, ...]) -> GenerationStats:
+    """Switch ``pipe`` to a static KV cache + ``torch.compile`` and warm it up.
+
+    Any failure restores eager mode; the reason is kept on the returned stats.
+    """
+    stats = GenerationStats()
+    model = pipe.model
+    original_forward = model.forward
+    original_cache = getattr(model.generation_config, "cache_implementation", None)
+    try:
+        import torch
+
+        model.generation_config.cache_implementation = "static"
+        model.forward = torch.compile(original_forward, dynamic=None)
+
+        start = time.perf_counter()
+        for length in warmup_lengths:
+            pipe(warmup_prompt(pipe.tokenizer, length), max_new_tokens=8, do_sample=False, return_full_text=False)
+        stats.warmup_seconds = time.perf_counter() - start
+        stats.compiled = True
+        stats._eager_forward, stats._eager_cache = original_forward, original_cache
+
+        # One post-warm-up pass seeds the steady-state tokens/s figure.
+        start = time.perf_counter()
+        output = pipe(
+            warmup_prompt(pipe.tokenizer, warmup_lengths[0]), max_new_tokens=32, do_sample=False, return_full_text=False
+        )
+        stats.record(_count_tokens(pipe.tokenizer, output[0]["generated_text"]), time.perf_counter() - start)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("Compiled generation unavailable, falling back to eager mode: %s", exc)
+        model.forward = original_forward
+        model.generation_config.cache_implementation = original_cache
+        stats = GenerationStats(fallback_reason=f"{type(exc).__name__}: {exc}")
+    else:
+        logger.info(
+            "Compiled generation ready: warm-up %.1fs, %.1f tokens/s", stats.warmup_seconds, stats.tokens_per_second
+        )
+    return stats
+
+
+def _with_eager_fallback(
+    settings: ModelSettings,
+    pipe,
+    run: Callable[[], Any],
+    can_retry: Callable[[], bool] = lambda: True,
+) -> Any:
+    """Run one generation; if the compiled pipeline fails, drop to eager mode and retry.
+
+    Warm-up cannot cover every prompt: a later one may hit the recompile limit
+    or overflow the static cache. The call is retried only if ``can_retry()``
+    still holds, e.g. nothing has been streamed to the user yet.
+    """
+    stats = get_generation_stats(settings)
+    compiled = stats is not None and stats.compiled
+    try:
+        return run()
+    except Exception as exc:  # pylint: disable=broad-except
+        if not compiled:
+            raise
+        stats.fall_back_to_eager(pipe, exc)
+        if not can_retry():
+            raise
+    return run()
+
+
+def _count_tokens(tokenizer, text: str) -> int:
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
 @lru_cache(maxsize=2)
-def _load_pipeline(model_id: str, device_map: str, dtype_name: Optional[str]):
+def _load_pipeline(
+    model_id: str,
+    device_map: str,
+    dtype_name: Optional[str],
+    compiled: bool = False,
+    warmup_lengths: Tuple[int, ...] = (),
+):
     """Internal cache to avoid re-loading models repeatedly."""
     try:
         from transformers import pipeline
@@ -106,44 +300,258 @@ def _load_pipeline(model_id: str, device_map: str, dtype_name: Optional[str]):
 
     logger.info("Loading transformers pipeline for %s", model_id)
     try:
-        return pipeline(**pipeline_kwargs)
+        pipe = pipeline(**pipeline_kwargs)
     except OSError as exc:
         raise RuntimeError(
             f"Unable to load model '{model_id}'. "
             "Ensure the identifier is public or provide a Hugging Face token via SMOLMIND_MODEL_ID / HUGGING_FACE_HUB_TOKEN."
         ) from exc
 
+    key = (model_id, device_map, dtype_name, compiled, warmup_lengths)
+    if compiled:
+        _GENERATION_STATS[key] = _enable_compiled_generation(pipe, warmup_lengths or (32,))
+    else:
+        _GENERATION_STATS[key] = GenerationStats()
+    return pipe
+
+
+def _pipeline_key(settings: ModelSettings) -> Tuple[Any, ...]:
+    dtype_name = settings.dtype or _default_dtype_for_device(settings.device_map)
+    warmup_lengths = tuple(settings.warmup_prompt_lengths) if settings.compile else ()
+    return settings.model_id, settings.device_map, dtype_name, settings.compile, warmup_lengths
+
 
 def get_chat_pipeline(settings: ModelSettings | None = None):
     """Load and cache the transformers pipeline backing the assistant."""
     settings = settings or ModelSettings()
-    dtype_name = settings.dtype or _default_dtype_for_device(settings.device_map)
-    return _load_pipeline(settings.model_id, settings.device_map, dtype_name)
+    return _load_pipeline(*_pipeline_key(settings))
+
+
+@lru_cache(maxsize=2)
+def _load_tokenizer(model_id: str):
+    try:
+        from transformers import AutoTokenizer
+    except ImportError as exc:  # pragma: no cover - import guard
+        raise ImportError("transformers is required. Install via `pip install transformers`.") from exc
+    return AutoTokenizer.from_pretrained(model_id)
+
+
+def get_tokenizer(settings: ModelSettings | None = None):
+    """The tokenizer of ``settings.model_id`` alone, for counting tokens without loading the model."""
+    settings = settings or ModelSettings()
+    return _load_tokenizer(settings.model_id)
 
 
-def generate_completion(messages: List[Dict[str, str]], settings: ModelSettings | None = None) -> str:
-    """Proxy that converts a chat history into a prompt and calls the pipeline."""
+def get_generation_stats(settings: ModelSettings | None = None) -> Optional[GenerationStats]:
+    """Warm-up time and steady-state tokens/s for the pipeline ``settings`` selects (None if not loaded)."""
+    settings = settings or ModelSettings()
+    return _GENERATION_STATS.get(_pipeline_key(settings))
+
+
+_ADAPTER_MANAGERS: Dict[Tuple[Any, ...], AdapterManager] = {}
+_ADAPTER_LOCK = threading.Lock()
+
+
+def get_adapter_manager(settings: ModelSettings | None = None) -> AdapterManager:
+    """Adapter manager for the pipeline ``settings`` selects; the base model is loaded once."""
+    settings = settings or ModelSettings()
+    key = _pipeline_key(settings)
+    with _ADAPTER_LOCK:
+        manager = _ADAPTER_MANAGERS.get(key)
+        if manager is None:
+            manager = _ADAPTER_MANAGERS[key] = AdapterManager(get_chat_pipeline(settings))
+    return manager
+
+
+def _adapter_scope(settings: ModelSettings, adapter: Optional[str]):
+    """Activate ``adapter``; once any adapter is loaded, plain requests run on the bare base model."""
+    manager = _ADAPTER_MANAGERS.get(_pipeline_key(settings))
+    if adapter is None and (manager is None or not manager.loaded):
+        return nullcontext()
+    return get_adapter_manager(settings).use(adapter)
+
+
+TokenCallback = Callable[[str], None]
+
+
+def _make_streamer(tokenizer, on_token: TokenCallback):
+    from transformers import TextStreamer
+
+    class _CallbackStreamer(TextStreamer):
+        """Forward decoded text chunks to ``on_token`` instead of stdout."""
+
+        def on_finalized_text(self, text: str, stream_end: bool = False) -> None:
+            if text:
+                on_token(text)
+
+    return _CallbackStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+
+def _cancel_stopping_criteria(cancel: CancellationToken):
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class _CancelCriteria(StoppingCriteria):
+        """Stop decoding at the next step once ``cancel`` fires."""
+
+        def __call__(self, input_ids, scores, **kwargs):
+            import torch
+
+            return torch.full((input_ids.shape[0],), cancel.cancelled, dtype=torch.bool, device=input_ids.device)
+
+    return StoppingCriteriaList([_CancelCriteria()])
+
+
+def generate_completion(
+    messages: List[Dict[str, str]],
+    settings: ModelSettings | None = None,
+    on_token: TokenCallback | None = None,
+    cancel: CancellationToken | None = None,
+    adapter: Optional[str] = None,
+) -> str:
+    """Proxy that converts a chat history into a prompt and calls the pipeline.
+
+    When ``on_token`` is given, decoded text is passed to it as it is generated.
+    When ``cancel`` fires, decoding stops and the partial reply is returned.
+    ``adapter`` names a LoRA adapter applied to the shared base model for this call.
+    """
+    if cancel is not None and cancel.cancelled:
+        return ""
     settings = settings or ModelSettings()
     pipe = get_chat_pipeline(settings)
 
     formatted = _format_chat_messages(messages)
-    generation_args: Dict[str, Any] = {
-        "max_new_tokens": settings.max_new_tokens,
-        "do_sample": True,
-        "temperature": settings.temperature,
-        "top_p": settings.top_p,
-        "return_full_text": False,
-    }
-    outputs = pipe(formatted, **generation_args)
+    generation_args = _generation_args(settings)
+    if cancel is not None:
+        generation_args["stopping_criteria"] = _cancel_stopping_criteria(cancel)
+    streamed: List[str] = []
+
+    def forward(text: str) -> None:
+        streamed.append(text)
+        on_token(text)
+
+    def run():
+        if on_token is None:
+            return pipe(formatted, **generation_args)
+        # A fresh streamer per attempt, so a retry does not echo the prompt.
+        return pipe(formatted, streamer=_make_streamer(pipe.tokenizer, forward), **generation_args)
+
+    with _adapter_scope(settings, adapter):
+        start = time.perf_counter()
+        outputs = _with_eager_fallback(settings, pipe, run, can_retry=lambda: not streamed)
+        elapsed = time.perf_counter() - start
     if not outputs:
         raise RuntimeError("Pipeline returned no output.")
 
     reply = outputs[0].get("generated_text", "").strip()
-    if not reply:
+    if not reply and not (cancel is not None and cancel.cancelled):
         raise RuntimeError("Model returned an empty response.")
+    stats = get_generation_stats(settings)
+    if stats is not None:
+        stats.record(_count_tokens(pipe.tokenizer, reply), elapsed)
     return reply
 
 
+def generate_batch(
+    conversations: List[List[Dict[str, str]]],
+    settings: ModelSettings | None = None,
+    cancel: CancellationToken | None = None,
+    adapters: List[Optional[str]] | None = None,
+) -> List[str]:
+    """Generate replies for several chat histories in one batched forward pass.
+
+    ``adapters`` gives a LoRA adapter (or None) per conversation. Mixed adapters
+    share one batch when the backend supports it, otherwise run one batch each.
+    """
+    if not conversations:
+        return []
+    if cancel is not None and cancel.cancelled:
+        return ["" for _ in conversations]
+    settings = settings or ModelSettings()
+    pipe = get_chat_pipeline(settings)
+    distinct = set(adapters or [None])
+    if len(distinct) == 1:
+        with _adapter_scope(settings, distinct.pop()):
+            return _batch_replies(pipe, conversations, settings, cancel)
+
+    manager = get_adapter_manager(settings)
+    for adapter in distinct:
+        if adapter is not None:
+            manager.load(adapter)
+    if manager.supports_mixed_batch:
+        with manager.use_mixed(list(adapters)) as adapter_kwargs:
+            return _batch_replies(pipe, conversations, settings, cancel, **adapter_kwargs)
+
+    replies: List[str] = [""] * len(conversations)
+    for adapter in distinct:
+        rows = [index for index, name in enumerate(adapters) if name == adapter]
+        with manager.use(adapter):
+            group = _batch_replies(pipe, [conversations[index] for index in rows], settings, cancel)
+        for index, reply in zip(rows, group):
+            replies[index] = reply
+    return replies
+
+
+_PADDING_LOCK = threading.Lock()
+
+
+@contextmanager
+def _left_padding(tokenizer):
+    """Left-pad batched prompts for one call, then restore the shared tokenizer.
+
+    Decoder-only models must be left-padded so every row generates from its own
+    last token. The pipeline reads ``padding_side`` when it builds its collate
+    function, so the lock covers the whole batch; single-prompt calls never pad.
+    """
+    with _PADDING_LOCK:
+        padding_side, pad_token = tokenizer.padding_side, tokenizer.pad_token
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = "left"
+        try:
+            yield
+        finally:
+            tokenizer.padding_side = padding_side
+            tokenizer.pad_token = pad_token
+
+
+def _batch_replies(
+    pipe,
+    conversations: List[List[Dict[str, str]]],
+    settings: ModelSettings,
+    cancel: CancellationToken | None,
+    **extra_generation_args: Any,
+) -> List[str]:
+    prompts = [_format_chat_messages(messages) for messages in conversations]
+    generation_args = {**_generation_args(settings), **extra_generation_args}
+    if cancel is not None:
+        generation_args["stopping_criteria"] = _cancel_stopping_criteria(cancel)
+    with _left_padding(pipe.tokenizer):
+        outputs = _with_eager_fallback(
+            settings, pipe, lambda: pipe(prompts, batch_size=len(prompts), **generation_args)
+        )
+    if len(outputs) != len(prompts):
+        raise RuntimeError("Pipeline returned an unexpected number of outputs.")
+
+    replies = []
+    for output in outputs:
+        first = output[0] if isinstance(output, list) else output
+        reply = first.get("generated_text", "").strip()
+        if not reply and not (cancel is not None and cancel.cancelled):
+            raise RuntimeError("Model returned an empty response.")
+        replies.append(reply)
+    return replies
+
+
+def _generation_args(settings: ModelSettings) -> Dict[str, Any]:
+    return {
+        "max_new_tokens": settings.max_new_tokens,
+        "do_sample": True,
+        "temperature": settings.temperature,
+        "top_p": settings.top_p,
+        "return_full_text": False,
+    }
+
+
 CHAT_TEMPLATE_HEADER = (
     "You are SmolMind, a local-first assistant composed of specialised micro-agents."
     " Always provide helpful, concise answers.\n"
@@ -174,8 +582,15 @@ def get_hf_action_agent(settings: ModelSettings | None = None):
 
 
 __all__ = [
+    "GenerationStats",
     "ModelSettings",
+    "TokenCallback",
+    "generate_batch",
     "generate_completion",
+    "get_adapter_manager",
     "get_chat_pipeline",
+    "get_generation_stats",
     "get_hf_action_agent",
+    "get_tokenizer",
+    "warmup_prompt",
 ]
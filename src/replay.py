@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .admission import OverloadedError
+from .tracing import TurnTrace
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODES = ("recorded", "live")
+# Histogram bucket upper bounds in seconds, roughly log-spaced.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, math.inf)
+
+
+class RecordedModel:
+    """Serves each replayed turn the completions recorded for it, in order.
+
+    ``completion_fn`` and ``batch_fn`` plug into ``AgentCore`` so the
+    orchestrator runs for real while the model costs nothing. A turn that asks
+    for more completions than were recorded is counted as diverged.
+    """
+
+    PLACEHOLDER = "(no recorded completion)"
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def begin(self, trace: TurnTrace) -> None:
+        self._local.calls = list(trace.calls)
+        self._local.diverged = False
+
+    @property
+    def diverged(self) -> bool:
+        return getattr(self._local, "diverged", False)
+
+    def _next(self, kind: str, count: int) -> List[str]:
+        calls = getattr(self._local, "calls", [])
+        if calls and calls[0].kind == kind and len(calls[0].outputs) == count:
+            return calls.pop(0).outputs
+        self._local.diverged = True
+        return [self.PLACEHOLDER] * count
+
+    def completion_fn(self, messages, settings=None, on_token=None, cancel=None, **kwargs) -> str:
+        reply = self._next("completion", 1)[0]
+        if on_token is not None:
+            on_token(reply)
+        return reply
+
+    def batch_fn(self, conversations, settings=None, cancel=None, **kwargs) -> List[str]:
+        return self._next("batch", len(conversations))
+
+
+@dataclass
+class ReplayReport:
+    mode: str
+    turns: int = 0
+    errors: int = 0
+    # Turns rejected by admission control; they are not counted in the latencies.
+    shed: int = 0
+    diverged: int = 0
+    wall_seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    # Latency of the same turns as recorded, for comparison with the replay.
+    recorded_latencies: List[float] = field(default_factory=list)
+
+    def percentile(self, q: float, values: Optional[List[float]] = None) -> float:
+        values = sorted(self.latencies if values is None else values)
+        if not values:
+            return 0.0
+        rank = max(0, math.ceil(q / 100 * len(values)) - 1)
+        return values[rank]
+
+    def histogram(self) -> List[Dict[str, Any]]:
+        counts = [0] * len(BUCKETS)
+        for latency in self.latencies:
+            counts[next(index for index, bound in enumerate(BUCKETS) if latency <= bound)] += 1
+        return [{"le": bound, "count": count} for bound, count in zip(BUCKETS, counts)]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "turns": self.turns,
+            "errors": self.errors,
+            "shed": self.shed,
+            "diverged": self.diverged,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "throughput_tps": round(self.turns / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            **{f"p{q}": round(self.percentile(q), 4) for q in (50, 90, 99)},
+            "max": round(max(self.latencies, default=0.0), 4),
+            "recorded_p50": round(self.percentile(50, self.recorded_latencies), 4),
+            "recorded_p99": round(self.percentile(99, self.recorded_latencies), 4),
+        }
+
+    def render_histogram(self, width: int = 40) -> str:
+        rows = self.histogram()
+        peak = max((row["count"] for row in rows), default=0) or 1
+        lines = []
+        for row in rows:
+            if not row["count"]:
+                continue
+            label = "   +inf" if math.isinf(row["le"]) else f"{row['le']:>7g}"
+            lines.append(f"<= {label}s {'#' * max(1, round(width * row['count'] / peak)):<{width}} {row['count']}")
+        return "\n".join(lines)
+
+    def write(self, path: Path) -> None:
+        histogram = [
+            {"le": "inf" if math.isinf(row["le"]) else row["le"], "count": row["count"]} for row in self.histogram()
+        ]
+        payload = {**self.summary(), "histogram": histogram, "latencies": [round(value, 6) for value in self.latencies]}
+        Path(path).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+def compare(report: ReplayReport, baseline_path: Path) -> Dict[str, float]:
+    """Relative change of p50/p90/p99 versus a report written by :meth:`ReplayReport.write`."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    current = report.summary()
+    return {
+        key: (current[key] - baseline[key]) / baseline[key]
+        for key in ("p50", "p90", "p99")
+        if baseline.get(key)
+    }
+
+
+def core_from_config(config: Dict[str, Any], **kwargs):
+    """Build an ``AgentCore`` configured like the one that recorded ``config``.
+
+    ``config`` is a trace header (see :meth:`AgentCore.core_config`); missing
+    keys keep the ``AgentCore`` defaults. ``kwargs`` supply what a trace cannot
+    hold: the registry, model functions and, when ``config["memory"]`` is set,
+    the ``memory`` store.
+    """
+    from .agent_core import AgentCore
+
+    if config.get("memory") and kwargs.get("memory") is None:
+        logger.warning("Trace was recorded with long-term memory but none was supplied; replaying without it.")
+    options = {
+        key: config[key]
+        for key in ("fast_path", "fast_path_side_effects", "turn_timeout", "recall_k", "recall_token_budget",
+                    "result_preview_tokens")
+        if key in config
+    }
+    core = AgentCore(fan_out_agents=config.get("fan_out_agents") or None, **options, **kwargs)
+    if config.get("default_agent"):
+        core.set_default_agent(config["default_agent"])
+    return core
+
+
+def replay(
+    core,
+    traces: List[TurnTrace],
+    mode: str = "recorded",
+    concurrency: int = 4,
+    speedup: float = 0.0,
+    recorded: Optional[RecordedModel] = None,
+) -> ReplayReport:
+    """Push ``traces`` back through ``core`` and measure per-turn latency.
+
+    Sessions replay concurrently on up to ``concurrency`` threads; turns within
+    a session keep their order and share one ``AgentState``. With ``speedup``
+    > 0 each turn waits for its recorded arrival time divided by ``speedup``;
+    0 replays as fast as possible. In ``recorded`` mode ``core`` must have been
+    built with the ``recorded`` model's ``completion_fn`` and ``batch_fn``.
+    """
+    from .agent_core import AgentState
+
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"Unsupported replay mode '{mode}'. Use one of {REPLAY_MODES}.")
+    if mode == "recorded" and recorded is None:
+        raise ValueError("Recorded replay needs the RecordedModel wired into the AgentCore.")
+    sessions: Dict[str, List[TurnTrace]] = defaultdict(list)
+    for trace in sorted(traces, key=lambda item: item.started):
+        sessions[trace.session].append(trace)
+    origin = min((trace.started for trace in traces), default=0.0)
+
+    report = ReplayReport(mode=mode)
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def run_session(turns: List[TurnTrace]) -> None:
+        state = AgentState()
+        for trace in turns:
+            if speedup > 0:
+                delay = (trace.started - origin) / speedup - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            if recorded is not None:
+                recorded.begin(trace)
+            turn_start = time.perf_counter()
+            failed = False
+            try:
+                core.process_turn(trace.user, state=state)
+            except OverloadedError:
+                with lock:
+                    report.turns += 1
+                    report.shed += 1
+                continue
+            except Exception as exc:  # pylint: disable=broad-except
+                failed = True
+                logger.warning("Replayed turn %s/%d failed: %s", trace.session, trace.index, exc)
+            latency = time.perf_counter() - turn_start
+            with lock:
+                report.turns += 1
+                report.errors += failed
+                report.diverged += bool(recorded is not None and recorded.diverged)
+                report.latencies.append(latency)
+                report.recorded_latencies.append(trace.seconds)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="smolmind-replay") as pool:
+        for future in [pool.submit(run_session, turns) for turns in sessions.values()]:
+            future.result()
+    report.wall_seconds = time.perf_counter() - start
+    return report
+
+
+__all__ = ["RecordedModel", "ReplayReport", "compare", "core_from_config", "replay", "REPLAY_MODES"]
@@ -0,0 +1,547 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from glob import glob
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .cancellation import CancellationToken
+from .models import ModelSettings, TokenCallback, generate_batch, generate_completion, get_chat_pipeline
+
+logger = logging.getLogger(__name__)
+
+CompletionFn = Callable[..., str]
+
+# Only sampling knobs may vary per request; the model itself is fixed per pool.
+REQUEST_OVERRIDES = ("max_new_tokens", "temperature", "top_p")
+
+
+# --------------------------------------------------------------------------- CPU layout
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """Parse a Linux cpulist such as ``0-3,8,10-11``."""
+    cpus: List[int] = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            low, high = part.split("-", 1)
+            cpus.extend(range(int(low), int(high) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes(cpus: Sequence[int] | None = None) -> List[List[int]]:
+    """CPUs grouped by NUMA node (a single group when topology is unavailable)."""
+    cpus = list(cpus if cpus is not None else available_cpus())
+    allowed = set(cpus)
+    nodes = []
+    for path in sorted(glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        try:
+            with open(path, encoding="ascii") as handle:
+                node_cpus = [cpu for cpu in parse_cpulist(handle.read()) if cpu in allowed]
+        except OSError:
+            continue
+        if node_cpus:
+            nodes.append(node_cpus)
+    return nodes or [cpus]
+
+
+def plan_layout(
+    replicas: int,
+    threads_per_replica: Optional[int] = None,
+    nodes: Sequence[Sequence[int]] | None = None,
+) -> List[List[int]]:
+    """Assign each replica a CPU set, spreading replicas round-robin across NUMA nodes.
+
+    Replicas on the same node get disjoint CPUs while the node has enough of
+    them; otherwise CPUs are shared.
+    """
+    if replicas < 1:
+        raise ValueError("At least one replica is required.")
+    nodes = [list(node) for node in (nodes or numa_nodes())]
+    total = sum(len(node) for node in nodes)
+    threads = threads_per_replica or max(1, total // replicas)
+
+    cursors = [0] * len(nodes)
+    layout = []
+    for index in range(replicas):
+        node_index = index % len(nodes)
+        node = nodes[node_index]
+        start = cursors[node_index]
+        layout.append([node[(start + offset) % len(node)] for offset in range(min(threads, len(node)))])
+        cursors[node_index] = start + threads
+    return layout
+
+
+# --------------------------------------------------------------------------- worker process
+
+
+def _count_tokens(settings: ModelSettings, text: str, completion_fn: Optional[CompletionFn]) -> int:
+    if completion_fn is None:
+        tokenizer = get_chat_pipeline(settings).tokenizer
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+    return len(text.split())
+
+
+def _replica_main(
+    conn: Connection,
+    index: int,
+    cpus: List[int],
+    settings_data: Dict[str, Any],
+    completion_fn: Optional[CompletionFn],
+) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    threads = max(1, len(cpus))
+    # Only effective when torch has not been imported yet (spawn start method).
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    settings = ModelSettings(**settings_data)
+    complete = completion_fn or generate_completion
+    try:
+        if completion_fn is None:
+            get_chat_pipeline(settings)  # already loaded when forked from the zygote
+    except Exception as exc:  # pylint: disable=broad-except
+        conn.send(("failed", None, f"{type(exc).__name__}: {exc}"))
+        return
+    conn.send(("ready", os.getpid(), None))
+
+    # A receiver thread keeps reading while a request generates, so cancel
+    # messages reach the running request's token immediately.
+    inbox: "queue.Queue[Optional[tuple]]" = queue.Queue()
+    tokens: Dict[int, CancellationToken] = {}
+
+    def receive() -> None:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            if message is None:
+                inbox.put(None)
+                return
+            if message[0] == "cancel":
+                token = tokens.get(message[1])
+                if token is not None:
+                    token.cancel()
+                continue
+            _, request_id, _, _, _, timeout, _ = message
+            tokens[request_id] = CancellationToken(timeout=timeout)
+            inbox.put(message)
+
+    threading.Thread(target=receive, name="smolmind-replica-inbox", daemon=True).start()
+
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        kind, request_id, messages, overrides, stream, _, adapter = message
+        request_settings = settings.model_copy(update=overrides) if overrides else settings
+        cancel = tokens[request_id]
+
+        def on_token(text: str, request_id: int = request_id) -> None:
+            conn.send(("token", request_id, text))
+
+        start = time.perf_counter()
+        try:
+            if kind == "batch":
+                # ``messages`` holds the conversations and ``adapter`` the per-conversation adapters.
+                text = _complete_batch(messages, request_settings, cancel, adapter, completion_fn)
+                tokens_used = sum(_count_tokens(request_settings, reply, completion_fn) for reply in text if reply)
+            else:
+                text = complete(
+                    messages,
+                    settings=request_settings,
+                    on_token=on_token if stream else None,
+                    cancel=cancel,
+                    **({"adapter": adapter} if adapter else {}),
+                )
+                tokens_used = _count_tokens(request_settings, text, completion_fn) if text else 0
+            conn.send(("ok", request_id, (text, tokens_used, time.perf_counter() - start, cancel.cancelled)))
+        except Exception as exc:  # pylint: disable=broad-except
+            conn.send(("error", request_id, f"{type(exc).__name__}: {exc}"))
+        finally:
+            tokens.pop(request_id, None)
+    conn.close()
+
+
+def _complete_batch(
+    conversations: List[List[Dict[str, str]]],
+    settings: ModelSettings,
+    cancel: CancellationToken,
+    adapters: Optional[List[Optional[str]]],
+    completion_fn: Optional[CompletionFn],
+) -> List[str]:
+    if completion_fn is None:
+        return generate_batch(conversations, settings=settings, cancel=cancel, adapters=adapters)
+    adapters = adapters or [None] * len(conversations)
+    return [
+        completion_fn(messages, settings=settings, cancel=cancel, **({"adapter": adapter} if adapter else {}))
+        for messages, adapter in zip(conversations, adapters)
+    ]
+
+
+def _replica_zygote_main(
+    conns: List[Connection],
+    layout: List[List[int]],
+    settings_data: Dict[str, Any],
+    completion_fn: Optional[CompletionFn],
+) -> None:
+    """Load the model once, then fork one replica per CPU set and wait for them to exit.
+
+    This runs in a fresh interpreter with no other threads, so unlike the
+    serving process it is safe to fork, and the replicas still share the
+    weights copy-on-write.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        # Imported once here rather than in every replica.
+        import torch  # noqa: F401
+    except ImportError:
+        pass
+    try:
+        if completion_fn is None:
+            get_chat_pipeline(ModelSettings(**settings_data))
+    except Exception as exc:  # pylint: disable=broad-except
+        for conn in conns:
+            conn.send(("failed", None, f"{type(exc).__name__}: {exc}"))
+        return
+    pids = []
+    for index, (conn, cpus) in enumerate(zip(conns, layout)):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                for other in conns:
+                    if other is not conn:
+                        other.close()
+                _replica_main(conn, index, cpus, settings_data, completion_fn)
+            except BaseException:  # pylint: disable=broad-except
+                code = 1
+            finally:
+                os._exit(code)  # pylint: disable=protected-access
+        pids.append(pid)
+    for conn in conns:
+        conn.close()
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+# --------------------------------------------------------------------------- parent side
+
+
+@dataclass
+class ReplicaResult:
+    text: str
+    tokens: int
+    seconds: float
+    replica: int
+    truncated: bool = False
+    # Per-conversation replies of a batch request (``text`` is empty then).
+    replies: Optional[List[str]] = None
+
+
+@dataclass
+class _Replica:
+    index: int
+    cpus: List[int]
+    conn: Connection
+    # Set by the replica's ready message.
+    pid: Optional[int] = None
+    send_lock: threading.Lock = field(default_factory=threading.Lock)
+    pending: Dict[int, Tuple[Future, Optional[TokenCallback]]] = field(default_factory=dict)
+    reader: Optional[threading.Thread] = None
+    # Cleared (under the pool's route lock) once the pipe breaks; dead replicas get no more requests.
+    alive: bool = True
+
+    @property
+    def load(self) -> int:
+        return len(self.pending)
+
+
+class ReplicaPool:
+    """N model worker processes, each pinned to its own CPUs, behind a least-loaded router.
+
+    The serving process is never forked: it may be running threads (UI, tool
+    executor, torch) whose locks a child would inherit mid-use. Where ``fork``
+    exists, a zygote started with ``start_method`` (a fresh interpreter) loads
+    the model once and forks the replicas, which share the weights
+    copy-on-write. Elsewhere each replica is started directly and loads its
+    own copy; safetensors weights are memory-mapped, so the page cache is shared.
+    A replica that exits is taken out of routing and its pending requests fail;
+    once none are left, calls raise ``RuntimeError``.
+    """
+
+    def __init__(
+        self,
+        settings: ModelSettings | None = None,
+        replicas: int = 2,
+        threads_per_replica: Optional[int] = None,
+        start_method: Optional[str] = None,
+        completion_fn: Optional[CompletionFn] = None,
+        startup_timeout: float = 600.0,
+    ) -> None:
+        self.settings = settings or ModelSettings()
+        self.layout = plan_layout(replicas, threads_per_replica)
+        methods = multiprocessing.get_all_start_methods()
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in methods else "spawn"
+        if start_method == "fork":
+            raise ValueError("Replicas must not be forked from the serving process; use 'forkserver' or 'spawn'.")
+        self.start_method = start_method
+        self.completion_fn = completion_fn
+        self.startup_timeout = startup_timeout
+        self._replicas: List[_Replica] = []
+        self._processes: List[multiprocessing.process.BaseProcess] = []
+        self._ids = itertools.count()
+        self._route_lock = threading.Lock()
+
+    def start(self) -> "ReplicaPool":
+        if self._replicas:
+            return self
+        ctx = multiprocessing.get_context(self.start_method)
+        settings_data = self.settings.model_dump()
+        pipes = [ctx.Pipe() for _ in self.layout]
+        if hasattr(os, "fork"):
+            self._processes.append(
+                ctx.Process(
+                    target=_replica_zygote_main,
+                    args=([child for _, child in pipes], self.layout, settings_data, self.completion_fn),
+                    name="smolmind-replica-zygote",
+                    daemon=True,
+                )
+            )
+        else:
+            for index, (cpus, (_, child_conn)) in enumerate(zip(self.layout, pipes)):
+                self._processes.append(
+                    ctx.Process(
+                        target=_replica_main,
+                        args=(child_conn, index, cpus, settings_data, self.completion_fn),
+                        name=f"smolmind-replica-{index}",
+                        daemon=True,
+                    )
+                )
+        for process in self._processes:
+            process.start()
+        for index, (cpus, (parent_conn, child_conn)) in enumerate(zip(self.layout, pipes)):
+            child_conn.close()
+            self._replicas.append(_Replica(index=index, cpus=cpus, conn=parent_conn))
+
+        for replica in self._replicas:
+            if not replica.conn.poll(self.startup_timeout):
+                self.shutdown()
+                raise TimeoutError(f"Replica {replica.index} did not start within {self.startup_timeout}s.")
+            try:
+                status, replica.pid, detail = replica.conn.recv()
+            except EOFError:
+                status, detail = "exited", "process exited during start-up"
+            if status != "ready":
+                self.shutdown()
+                raise RuntimeError(f"Replica {replica.index} failed to load the model: {detail}")
+            replica.reader = threading.Thread(target=self._read_replies, args=(replica,), daemon=True)
+            replica.reader.start()
+        logger.info("Started %d replicas with CPU layout %s", len(self._replicas), self.layout)
+        return self
+
+    def loads(self) -> List[int]:
+        return [replica.load for replica in self._replicas]
+
+    def live_replicas(self) -> List[int]:
+        return [replica.index for replica in self._replicas if replica.alive]
+
+    def submit(
+        self,
+        messages: List[Dict[str, str]],
+        settings: ModelSettings | None = None,
+        on_token: TokenCallback | None = None,
+        cancel: CancellationToken | None = None,
+        adapter: Optional[str] = None,
+    ) -> "Future[ReplicaResult]":
+        return self._submit("request", messages, settings, on_token, cancel, adapter)
+
+    def submit_batch(
+        self,
+        conversations: List[List[Dict[str, str]]],
+        settings: ModelSettings | None = None,
+        cancel: CancellationToken | None = None,
+        adapters: List[Optional[str]] | None = None,
+    ) -> "Future[ReplicaResult]":
+        """Run ``conversations`` as one batched generation on the least-loaded replica."""
+        return self._submit("batch", conversations, settings, None, cancel, adapters)
+
+    def _submit(
+        self,
+        kind: str,
+        payload: Any,
+        settings: ModelSettings | None,
+        on_token: TokenCallback | None,
+        cancel: CancellationToken | None,
+        adapter: Any,
+    ) -> "Future[ReplicaResult]":
+        self.start()
+        overrides = None
+        if settings is not None:
+            overrides = {name: getattr(settings, name) for name in REQUEST_OVERRIDES}
+        future: "Future[ReplicaResult]" = Future()
+        request_id = next(self._ids)
+        while True:
+            with self._route_lock:
+                live = [candidate for candidate in self._replicas if candidate.alive]
+                if not live:
+                    raise RuntimeError("No live model replicas remain; restart the replica pool.")
+                replica = min(live, key=lambda candidate: candidate.load)
+                replica.pending[request_id] = (future, on_token)
+            timeout = cancel.remaining() if cancel is not None else None
+            try:
+                with replica.send_lock:
+                    replica.conn.send((kind, request_id, payload, overrides, on_token is not None, timeout, adapter))
+                break
+            except (OSError, BrokenPipeError):
+                with self._route_lock:
+                    claimed = replica.pending.pop(request_id, None) is not None
+                self._mark_dead(replica)
+                if not claimed:
+                    # The reader saw the exit first and has already failed this future.
+                    return future
+        if cancel is not None:
+            cancel.add_callback(lambda: self._send_cancel(replica, request_id))
+        return future
+
+    def _mark_dead(self, replica: _Replica) -> None:
+        """Stop routing to ``replica`` and fail whatever it still owed."""
+        with self._route_lock:
+            was_alive, replica.alive = replica.alive, False
+            pending, replica.pending = replica.pending, {}
+        if was_alive:
+            logger.warning("Replica %d (pid %s) exited; routing to the others.", replica.index, replica.pid)
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(f"Replica {replica.index} exited unexpectedly."))
+
+    def _send_cancel(self, replica: _Replica, request_id: int) -> None:
+        if request_id not in replica.pending:
+            return
+        try:
+            with replica.send_lock:
+                replica.conn.send(("cancel", request_id))
+        except (OSError, BrokenPipeError):
+            pass
+
+    def generate_completion(
+        self,
+        messages: List[Dict[str, str]],
+        settings: ModelSettings | None = None,
+        on_token: TokenCallback | None = None,
+        cancel: CancellationToken | None = None,
+        adapter: Optional[str] = None,
+    ) -> str:
+        """Drop-in replacement for ``models.generate_completion`` routed to the least-loaded replica."""
+        result = self.submit(messages, settings=settings, on_token=on_token, cancel=cancel, adapter=adapter).result()
+        if result.truncated and cancel is not None:
+            # The replica's copy of the deadline fired; make the caller's token agree.
+            cancel.cancel("deadline exceeded")
+        return result.text
+
+    def generate_batch(
+        self,
+        conversations: List[List[Dict[str, str]]],
+        settings: ModelSettings | None = None,
+        cancel: CancellationToken | None = None,
+        adapters: List[Optional[str]] | None = None,
+    ) -> List[str]:
+        """Drop-in replacement for ``models.generate_batch``; the batch stays together on one replica."""
+        if not conversations:
+            return []
+        result = self.submit_batch(conversations, settings=settings, cancel=cancel, adapters=adapters).result()
+        if result.truncated and cancel is not None:
+            cancel.cancel("deadline exceeded")
+        return result.replies
+
+    def _read_replies(self, replica: _Replica) -> None:
+        while True:
+            try:
+                status, request_id, payload = replica.conn.recv()
+            except (EOFError, OSError):
+                break
+            if status == "token":
+                callback = replica.pending.get(request_id, (None, None))[1]
+                if callback is not None:
+                    callback(payload)
+                continue
+            with self._route_lock:
+                entry = replica.pending.pop(request_id, None)
+            if entry is None:
+                continue
+            future = entry[0]
+            if status == "ok":
+                text, tokens, seconds, truncated = payload
+                replies = text if isinstance(text, list) else None
+                future.set_result(
+                    ReplicaResult(
+                        text="" if replies is not None else text,
+                        tokens=tokens,
+                        seconds=seconds,
+                        replica=replica.index,
+                        truncated=truncated,
+                        replies=replies,
+                    )
+                )
+            else:
+                future.set_exception(RuntimeError(payload))
+        self._mark_dead(replica)
+
+    def shutdown(self) -> None:
+        with self._route_lock:
+            replicas, self._replicas = self._replicas, []
+            for replica in replicas:
+                replica.alive = False  # an expected exit, not a crash
+        processes, self._processes = self._processes, []
+        for replica in replicas:
+            try:
+                with replica.send_lock:
+                    replica.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        for process in processes:
+            # The zygote exits once every replica it forked has exited.
+            process.join(timeout=5)
+            if process.is_alive():
+                for replica in replicas:
+                    if replica.pid is not None and replica.pid != process.pid:
+                        try:
+                            os.kill(replica.pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        for replica in replicas:
+            replica.conn.close()
+
+
+__all__ = ["ReplicaPool", "ReplicaResult", "available_cpus", "numa_nodes", "parse_cpulist", "plan_layout"]
@@ -4,18 +4,115 @@ from pathlib import Path
 
 import streamlit as st
 
+from .admission import INTERACTIVE, AdmissionController, OverloadedError, install_admission_controller
 from .agent_core import AgentCore, AgentState
-from .models import ModelSettings
+from .generation_worker import GenerationJob, GenerationWorker, QueueFullError
+from .models import ModelSettings, generate_batch, generate_completion, get_chat_pipeline
+from .replicas import ReplicaPool
+from .summarize import install_batch_fn
 from .tools import load_default_tools
 
+POLL_INTERVAL = 0.05
+
+
+@st.cache_resource(show_spinner=False)
+def _replica_pool() -> ReplicaPool | None:
+    settings = ModelSettings()
+    if settings.replicas <= 1:
+        return None
+    return ReplicaPool(settings, replicas=settings.replicas, threads_per_replica=settings.threads_per_replica).start()
+
 
 @st.cache_resource(show_spinner=False)
-def _bootstrap_agent(base_path: Path) -> tuple[AgentCore, AgentState]:
+def _admission_controller() -> AdmissionController:
+    settings = ModelSettings()
+    # Replicas only take per-request sampling overrides, so the fallback model needs in-process generation.
+    in_process = _replica_pool() is None
+    controller = AdmissionController.from_settings(settings, allow_fallback=in_process)
+    install_admission_controller(controller)
+    return controller
+
+
+@st.cache_resource(show_spinner=False)
+def _bootstrap_agent(base_path: Path) -> AgentCore:
     settings = ModelSettings()
     registry = load_default_tools(base_path=base_path)
-    core = AgentCore(tool_registry=registry, model_settings=settings, base_path=base_path)
-    state = AgentState()
-    return core, state
+    pool = _replica_pool()
+    admission = _admission_controller()
+    if pool is not None:
+        # Abstractive summaries run on the replicas too, not on a second model in this process.
+        install_batch_fn(pool.generate_batch)
+    agent_core = AgentCore(
+        tool_registry=registry,
+        model_settings=settings,
+        base_path=base_path,
+        completion_fn=admission.wrap_completion(pool.generate_completion if pool else generate_completion),
+        batch_fn=admission.wrap_batch(pool.generate_batch if pool else generate_batch, priority=INTERACTIVE),
+    )
+    if admission.fallback_model_id:
+        # Load it now rather than in the middle of a burst, but only after AgentCore has
+        # forked the tool worker zygote, which must not inherit a loaded model.
+        get_chat_pipeline(settings.model_copy(update={"model_id": admission.fallback_model_id}))
+    return agent_core
+
+
+@st.cache_resource(show_spinner=False)
+def _generation_worker(base_path: Path) -> GenerationWorker:
+    admission = _admission_controller()
+    # One thread per admission slot: further turns wait in the worker's queue, so the UI can show
+    # their position. Running turns still go through admission, ahead of background summaries.
+    return GenerationWorker(_bootstrap_agent(base_path), concurrency=admission.concurrency)
+
+
+def _render_admission_stats(controller: AdmissionController) -> None:
+    stats = controller.stats()
+    with st.sidebar:
+        st.subheader("Load")
+        st.metric("Queue depth", stats.queue_depth, help=f"Peak {stats.peak_depth}; {stats.in_flight} generating")
+        st.metric("Queue wait p99", f"{stats.wait_p99:.2f}s", help=f"SLO {stats.slo_seconds:.1f}s")
+        st.caption(
+            f"Shed: {stats.shed['interactive']} interactive, {stats.shed['batch']} batch · "
+            f"degraded: {stats.degraded_tokens} shortened, {stats.degraded_model} fallback model"
+        )
+
+
+def _follow_job(worker: GenerationWorker, job: GenerationJob) -> None:
+    """Stream ``job`` into an assistant message and add the finished turn to the history.
+
+    Only the Stop button cancels the job. Any other rerun aborts this loop
+    while the job keeps running; it stays in session state and the next run
+    picks it up again.
+    """
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        st.button("Stop", key=f"stop_generation_{id(job)}", on_click=job.cancel)
+        while not job.wait(POLL_INTERVAL):
+            position = worker.position(job)
+            if position:
+                placeholder.markdown(f"⏳ Waiting in queue (position {position})…")
+            else:
+                placeholder.markdown(job.text + "▌")
+        st.session_state.pop("pending_job", None)
+
+        if isinstance(job.error, OverloadedError):
+            placeholder.warning(str(job.error))
+            return
+        if job.error is not None:
+            placeholder.error(f"Generation failed: {job.error}")
+            return
+        turn = job.turn
+        placeholder.markdown(turn.text)
+        if turn.truncated:
+            st.caption("Reply truncated.")
+        if turn.tool_output:
+            st.info(turn.tool_output)
+        st.session_state.history.append(
+            {
+                "role": "assistant",
+                "content": turn.text,
+                "tool_output": turn.tool_output,
+            }
+        )
 
 
 def main() -> None:
@@ -24,10 +121,13 @@ def main() -> None:
     st.caption("Powered by small open-source Hugging Face models.")
 
     base_path = Path.cwd()
-    agent_core, state = _bootstrap_agent(base_path)
+    worker = _generation_worker(base_path)
+    _render_admission_stats(_admission_controller())
 
     if "history" not in st.session_state:
         st.session_state.history = []
+    if "agent_state" not in st.session_state:
+        st.session_state.agent_state = AgentState()
 
     for entry in st.session_state.history:
         with st.chat_message(entry["role"]):
@@ -36,24 +136,21 @@ def main() -> None:
                 st.info(tool)
 
     prompt = st.chat_input("Ask SmolMind...")
+    if (pending := st.session_state.get("pending_job")) is not None:
+        # Interrupted by a rerun other than Stop (e.g. a widget change); the turn kept running.
+        _follow_job(worker, pending)
     if prompt:
         st.session_state.history.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
             st.markdown(prompt)
-
-        with st.chat_message("assistant"):
-            placeholder = st.empty()
-            turn = agent_core.process_turn(prompt, state=state)
-            placeholder.markdown(turn.text)
-            if turn.tool_output:
-                st.info(turn.tool_output)
-            st.session_state.history.append(
-                {
-                    "role": "assistant",
-                    "content": turn.text,
-                    "tool_output": turn.tool_output,
-                }
-            )
+        try:
+            job = worker.submit(prompt, st.session_state.agent_state)
+        except QueueFullError as exc:
+            with st.chat_message("assistant"):
+                st.warning(str(exc))
+            return
+        st.session_state.pending_job = job
+        _follow_job(worker, job)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .admission import BATCH, get_admission_controller
+from .models import ModelSettings, generate_batch, get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[str, int, int], None]
+BatchGenerateFn = Callable[..., List[str]]
+
+# Bump when the prompts change so cached summaries are not reused across versions.
+PROMPT_VERSION = "1"
+MAP_PROMPT = (
+    "Summarise the following part of a longer document in 2-4 sentences. "
+    "Keep names, numbers and decisions; do not add anything that is not in the text."
+)
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive parts of one document. "
+    "Combine them into a single coherent summary of 3-6 sentences without repeating points."
+)
+PARAGRAPH_REGEX = re.compile(r"\n\s*\n")
+SENTENCE_REGEX = re.compile(r"(?<=[.!?])\s+")
+LINE_REGEX = re.compile(r"\n")
+# Ever finer boundaries for text over the budget: sentences, then lines (logs, CSV, code).
+# Whatever is still too long after that is cut into fixed token windows.
+SPLITTERS = ((SENTENCE_REGEX, " "), (LINE_REGEX, "\n"))
+
+
+def _pack(pieces: List[str], count_tokens: Callable[[str], int], budget: int, separator: str) -> List[str]:
+    """Greedily join ``pieces`` into strings of at most ``budget`` tokens (oversized pieces stand alone)."""
+    packed: List[str] = []
+    current: List[str] = []
+    used = 0
+    gap = count_tokens(separator)
+    for piece in pieces:
+        cost = count_tokens(piece)
+        if current and used + gap + cost > budget:
+            packed.append(separator.join(current))
+            current, used = [], 0
+        used += cost + (gap if current else 0)
+        current.append(piece)
+    if current:
+        packed.append(separator.join(current))
+    return packed
+
+
+def _windows(text: str, count_tokens: Callable[[str], int], budget: int) -> List[str]:
+    """Cut unbroken ``text`` into consecutive windows of at most ``budget`` tokens."""
+    windows: List[str] = []
+    # Start each window at the text's average characters per token and shrink it until it fits.
+    step = max(1, len(text) * budget // max(1, count_tokens(text)))
+    while text:
+        size = step
+        while size > 1 and count_tokens(text[:size]) > budget:
+            size = max(1, size * 9 // 10)
+        windows.append(text[:size])
+        text = text[size:]
+    return windows
+
+
+def _split(text: str, count_tokens: Callable[[str], int], budget: int, level: int = 0) -> List[str]:
+    """Pieces of ``text`` of at most ``budget`` tokens, using the coarsest boundary that fits."""
+    if count_tokens(text) <= budget:
+        return [text]
+    if level == len(SPLITTERS):
+        return _windows(text, count_tokens, budget)
+    regex, separator = SPLITTERS[level]
+    pieces = [
+        piece
+        for part in regex.split(text)
+        if part.strip()
+        for piece in _split(part.strip(), count_tokens, budget, level + 1)
+    ]
+    return _pack(pieces, count_tokens, budget, separator)
+
+
+def chunk_text(text: str, count_tokens: Callable[[str], int], chunk_tokens: int) -> List[str]:
+    """Split ``text`` into chunks of at most ``chunk_tokens`` tokens.
+
+    Paragraph boundaries are preferred, then sentences, then lines; text with
+    none of those (a minified file, one huge CSV row) is cut into token windows.
+    """
+    pieces: List[str] = []
+    for paragraph in PARAGRAPH_REGEX.split(text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            pieces.extend(_split(paragraph, count_tokens, chunk_tokens))
+    return _pack(pieces, count_tokens, chunk_tokens, "\n\n")
+
+
+_BATCH_FN: Optional[BatchGenerateFn] = None
+
+
+def install_batch_fn(fn: Optional[BatchGenerateFn]) -> None:
+    """Generate summaries with ``fn`` (e.g. ``ReplicaPool.generate_batch``) instead of a model in this process."""
+    global _BATCH_FN
+    _BATCH_FN = fn
+
+
+def _default_generate_fn() -> BatchGenerateFn:
+    batch_fn = _BATCH_FN or generate_batch
+    # Summaries are background work: behind interactive chat when an admission controller is installed.
+    controller = get_admission_controller()
+    return controller.wrap_batch(batch_fn, priority=BATCH) if controller is not None else batch_fn
+
+
+class ChunkSummaryCache:
+    """Content-addressed summaries: one small file per hash under ``root``."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def key(self, kind: str, text: str, settings: ModelSettings) -> str:
+        material = "\0".join([PROMPT_VERSION, kind, settings.model_id, str(settings.max_new_tokens), text])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return self._path(key).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, summary: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(summary, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+@dataclass
+class SummaryReport:
+    summary: str
+    chunks: int
+    cached: int
+    generated: int
+    reduce_rounds: int
+    seconds: float
+
+
+class MapReduceSummarizer:
+    """Abstractive summaries of documents larger than the model's context.
+
+    Map: chunks are summarised ``batch_size`` at a time with one batched
+    generation per group. Reduce: chunk summaries are packed into groups that
+    fit ``chunk_tokens`` and summarised again until one summary remains.
+    Every step is cached by content hash, so after an edit only the changed
+    chunks and the reduce steps above them are regenerated.
+    """
+
+    def __init__(
+        self,
+        cache: ChunkSummaryCache,
+        settings: ModelSettings | None = None,
+        chunk_tokens: int = 384,
+        batch_size: int = 4,
+        summary_tokens: int = 96,
+        count_tokens: Callable[[str], int] | None = None,
+        generate_fn: BatchGenerateFn | None = None,
+    ) -> None:
+        base = settings or ModelSettings()
+        # Low temperature: summaries should be stable so cached and fresh ones agree.
+        self.settings = base.model_copy(update={"max_new_tokens": summary_tokens, "temperature": 0.1})
+        self.cache = cache
+        self.chunk_tokens = chunk_tokens
+        self.batch_size = batch_size
+        self.count_tokens = count_tokens or self._model_token_counter()
+        self.generate_fn = generate_fn or _default_generate_fn()
+
+    def _model_token_counter(self) -> Callable[[str], int]:
+        tokenizer = get_tokenizer(self.settings)
+        return lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def _summarise_all(
+        self, kind: str, texts: List[str], counts: Dict[str, int], progress: Optional[ProgressCallback]
+    ) -> List[str]:
+        prompt = MAP_PROMPT if kind == "map" else REDUCE_PROMPT
+        keys = [self.cache.key(kind, text, self.settings) for text in texts]
+        results: List[Optional[str]] = [self.cache.get(key) for key in keys]
+        counts["cached"] += sum(result is not None for result in results)
+        pending = [index for index, result in enumerate(results) if result is None]
+        done = len(texts) - len(pending)
+        if progress is not None:
+            progress(kind, done, len(texts))
+        for start in range(0, len(pending), self.batch_size):
+            group = pending[start : start + self.batch_size]
+            conversations = [
+                [{"role": "system", "content": prompt}, {"role": "user", "content": texts[index]}] for index in group
+            ]
+            for index, summary in zip(group, self.generate_fn(conversations, settings=self.settings)):
+                results[index] = summary
+                self.cache.put(keys[index], summary)
+            counts["generated"] += len(group)
+            done += len(group)
+            if progress is not None:
+                progress(kind, done, len(texts))
+        return [result or "" for result in results]
+
+    def summarise(self, text: str, progress: Optional[ProgressCallback] = None) -> SummaryReport:
+        start = time.perf_counter()
+        counts = {"cached": 0, "generated": 0}
+        chunks = chunk_text(text, self.count_tokens, self.chunk_tokens)
+        if not chunks:
+            return SummaryReport("", 0, 0, 0, 0, 0.0)
+        summaries = self._summarise_all("map", chunks, counts, progress)
+
+        rounds = 0
+        while len(summaries) > 1:
+            groups = _pack(summaries, self.count_tokens, self.chunk_tokens, "\n\n")
+            if len(groups) == len(summaries):
+                # Each summary fills the budget alone; pair them up so the reduce still converges.
+                groups = ["\n\n".join(summaries[index : index + 2]) for index in range(0, len(summaries), 2)]
+            rounds += 1
+            summaries = self._summarise_all("reduce", groups, counts, progress)
+
+        report = SummaryReport(
+            summary=summaries[0].strip(),
+            chunks=len(chunks),
+            cached=counts["cached"],
+            generated=counts["generated"],
+            reduce_rounds=rounds,
+            seconds=time.perf_counter() - start,
+        )
+        logger.info(
+            "Summarised %d chunks (%d cached, %d generated, %d reduce rounds) in %.1fs",
+            report.chunks,
+            report.cached,
+            report.generated,
+            report.reduce_rounds,
+            report.seconds,
+        )
+        return report
+
+
+__all__ = ["ChunkSummaryCache", "MapReduceSummarizer", "SummaryReport", "chunk_text", "install_batch_fn"]
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Mapping
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping, Optional, Union
 
 from pydantic import BaseModel, ConfigDict, ValidationError
 
+from ..cancellation import CancellationToken
+from .intents import IntentPattern
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .plugins import LazyToolSpec
+    from .workers import ToolExecutor
+
 
 class ToolContext(BaseModel):
     """Shared context passed to every tool invocation."""
@@ -34,6 +41,8 @@ class ToolSpec:
     description: str
     input_model: type[BaseModel]
     handler: HandlerType
+    # Phrasings answered without the model (see tools.intents); keep them unambiguous.
+    intents: List[IntentPattern] = field(default_factory=list)
 
     def run(self, raw_args: Mapping[str, Any] | BaseModel, context: ToolContext) -> str:
         """Validate input payload and invoke the handler."""
@@ -46,26 +55,44 @@ class ToolSpec:
                 raise ValueError(f"Invalid payload for tool '{self.name}': {exc}") from exc
         return self.handler(payload, context)
 
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        return self.input_model.model_json_schema()
 
-class ToolRegistry:
-    """Registry that keeps track of tools exposed to the agent."""
 
-    def __init__(self, tools: Iterable[ToolSpec] | None = None) -> None:
-        self._tools: Dict[str, ToolSpec] = {}
+class ToolRegistry:
+    """Registry that keeps track of tools exposed to the agent.
+
+    Entries may be eager ``ToolSpec`` objects or ``LazyToolSpec`` metadata
+    whose handler module is imported on the first call. When an ``executor``
+    is attached, calls run in its worker pools instead of the current process.
+    """
+
+    def __init__(
+        self,
+        tools: Iterable[Union[ToolSpec, "LazyToolSpec"]] | None = None,
+        default_context: Optional[ToolContext] = None,
+    ) -> None:
+        self._tools: Dict[str, Union[ToolSpec, "LazyToolSpec"]] = {}
+        self.default_context = default_context
+        self.executor: Optional["ToolExecutor"] = None
         if tools:
             for tool in tools:
                 self.register(tool)
 
-    def register(self, tool: ToolSpec) -> None:
+    def register(self, tool: Union[ToolSpec, "LazyToolSpec"]) -> None:
         if tool.name in self._tools:
             raise ValueError(f"Tool '{tool.name}' already registered.")
         self._tools[tool.name] = tool
 
     def get(self, name: str) -> ToolSpec:
         try:
-            return self._tools[name]
+            tool = self._tools[name]
         except KeyError as exc:
             raise KeyError(f"Unknown tool '{name}'.") from exc
+        if isinstance(tool, ToolSpec):
+            return tool
+        return tool.load()
 
     def names(self) -> List[str]:
         return sorted(self._tools.keys())
@@ -73,47 +100,51 @@ class ToolRegistry:
     def describe(self) -> Dict[str, str]:
         return {name: spec.description for name, spec in self._tools.items()}
 
-    def call(self, name: str, args: Mapping[str, Any] | BaseModel, context: ToolContext) -> str:
+    def schemas(self) -> Dict[str, Dict[str, Any]]:
+        return {name: spec.parameters for name, spec in self._tools.items()}
+
+    def intents(self) -> Dict[str, List[IntentPattern]]:
+        return {name: spec.intents for name, spec in self._tools.items() if spec.intents}
+
+    def call(
+        self,
+        name: str,
+        args: Mapping[str, Any] | BaseModel,
+        context: ToolContext,
+        cancel: CancellationToken | None = None,
+    ) -> str:
+        if self.executor is not None:
+            return self.executor.call(name, args, context, cancel=cancel)
+        if cancel is not None:
+            cancel.raise_if_cancelled()
         spec = self.get(name)
         return spec.run(args, context)
 
 
 def load_default_tools(base_path: Path | None = None) -> ToolRegistry:
-    """Helper to initialise the default tool suite."""
+    """Helper to initialise the default tool suite plus any discovered plugins.
+
+    Tools are registered from cached metadata; handler modules are only
+    imported when a tool is first called. On POSIX hosts calls are executed in
+    warm worker processes unless ``tools.json`` sets ``workers.enabled`` to false;
+    call this before loading the model so the worker pools fork a small process.
+    """
     context = ToolContext.build(base_path=base_path)
 
-    from .files import SummarizeFileInput, summarize_file
-    from .shell import SafeShellInput, safe_shell
-    from .todo import TodoInput, todo_manager
-
-    registry = ToolRegistry(
-        tools=[
-            ToolSpec(
-                name="summarize_file",
-                description="Summarise a local text/markdown file into a concise overview.",
-                input_model=SummarizeFileInput,
-                handler=summarize_file,
-            ),
-            ToolSpec(
-                name="todo",
-                description="Manage the local SmolMind todo list. Supports add/list/complete operations.",
-                input_model=TodoInput,
-                handler=todo_manager,
-            ),
-            ToolSpec(
-                name="safe_shell",
-                description="Execute a whitelisted shell command for quick system checks.",
-                input_model=SafeShellInput,
-                handler=safe_shell,
-            ),
-        ]
-    )
-    # Store a reference to the default context for callers who only need the registry
-    registry.default_context = context  # type: ignore[attr-defined]
+    from .plugins import discover_tools, load_tool_config
+    from .workers import WORKERS_SUPPORTED, ToolExecutor
+
+    registry = ToolRegistry(tools=discover_tools(context), default_context=context)
+    worker_config = load_tool_config(context).get("workers") or {}
+    if WORKERS_SUPPORTED and worker_config.get("enabled", True):
+        registry.executor = ToolExecutor.from_config(registry, worker_config)
+        # Fork the worker zygotes now, while this process is small and single-threaded.
+        registry.executor.start()
     return registry
 
 
 __all__ = [
+    "IntentPattern",
     "ToolContext",
     "ToolRegistry",
     "ToolSpec",
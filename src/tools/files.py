@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import logging
 import re
 from pathlib import Path
 from typing import List
 
 from pydantic import BaseModel, Field, field_validator
 
-from . import ToolContext
+from . import IntentPattern, ToolContext, ToolSpec
+
+logger = logging.getLogger(__name__)
 
 
 class SummarizeFileInput(BaseModel):
@@ -14,6 +17,11 @@ class SummarizeFileInput(BaseModel):
     max_sentences: int = Field(
         5, ge=1, le=12, description="Maximum number of sentences to include in the summary."
     )
+    mode: str = Field(
+        "extractive",
+        description="extractive (first sentences, instant) or abstractive (LLM map-reduce over the whole file).",
+    )
+    chunk_tokens: int = Field(384, ge=64, le=2048, description="Chunk size for abstractive mode, in tokens.")
 
     @field_validator("path")
     @classmethod
@@ -22,11 +30,21 @@ class SummarizeFileInput(BaseModel):
             raise ValueError("Path cannot be empty.")
         return value
 
+    @field_validator("mode")
+    @classmethod
+    def validate_mode(cls, value: str) -> str:
+        value = value.lower().strip()
+        if value not in SUMMARY_MODES:
+            raise ValueError(f"Unsupported mode '{value}'. Use one of {SUMMARY_MODES}.")
+        return value
 
+
+SUMMARY_MODES = ("extractive", "abstractive")
 SENTENCE_REGEX = re.compile(r"(?<=[.!?])\s+")
 
 
-def _load_text(path: Path) -> str:
+def load_text(path: Path) -> str:
+    """Read ``path`` as UTF-8 (with or without BOM), falling back to latin-1."""
     for encoding in ("utf-8", "utf-8-sig", "latin-1"):
         try:
             return path.read_text(encoding=encoding)
@@ -40,6 +58,17 @@ def _sentences_from_text(text: str) -> List[str]:
     return candidates or [text.strip()]
 
 
+def summarize_text(text: str, max_sentences: int) -> str:
+    """Bullet list of the first ``max_sentences`` sentences of ``text``."""
+    # Remove markdown code blocks to avoid noisy summaries.
+    cleaned = re.sub(r"```.*?```", "", text, flags=re.DOTALL)
+    sentences = _sentences_from_text(cleaned)
+    summary_sentences = sentences[:max_sentences]
+
+    bullet_points = "\n".join(f"- {sentence}" for sentence in summary_sentences if sentence)
+    return bullet_points or "- (file was empty)"
+
+
 def summarize_file(params: SummarizeFileInput, context: ToolContext) -> str:
     """Summarise a text or markdown file using a deterministic heuristic."""
     file_path = Path(params.path)
@@ -50,21 +79,48 @@ def summarize_file(params: SummarizeFileInput, context: ToolContext) -> str:
     if not file_path.is_file():
         raise IsADirectoryError(f"Expected a file but received '{file_path}'.")
 
-    text = _load_text(file_path)
-
-    # Remove markdown code blocks to avoid noisy summaries.
-    cleaned = re.sub(r"```.*?```", "", text, flags=re.DOTALL)
-    sentences = _sentences_from_text(cleaned)
-    summary_sentences = sentences[: params.max_sentences]
-
-    bullet_points = "\n".join(f"- {sentence}" for sentence in summary_sentences if sentence)
-    if not bullet_points:
-        bullet_points = "- (file was empty)"
+    if params.mode == "abstractive":
+        return _abstractive_summary(file_path, params, context)
 
+    bullet_points = summarize_text(load_text(file_path), params.max_sentences)
     return (
         f"Summary of '{file_path.name}':\n{bullet_points}\n\n"
         "Tip: Use `max_sentences` to control summarisation length."
     )
 
 
-__all__ = ["SummarizeFileInput", "summarize_file"]
+def _abstractive_summary(file_path: Path, params: SummarizeFileInput, context: ToolContext) -> str:
+    # Imported lazily: the extractive path must not pull in the model stack.
+    from ..summarize import ChunkSummaryCache, MapReduceSummarizer
+
+    summarizer = MapReduceSummarizer(
+        ChunkSummaryCache(context.data_dir / "chunk_summaries"), chunk_tokens=params.chunk_tokens
+    )
+    report = summarizer.summarise(
+        load_text(file_path),
+        progress=lambda stage, done, total: logger.info("%s: %s %d/%d", file_path.name, stage, done, total),
+    )
+    if not report.chunks:
+        return f"Summary of '{file_path.name}':\n- (file was empty)"
+    return (
+        f"Summary of '{file_path.name}':\n{report.summary}\n\n"
+        f"({report.chunks} chunks, {report.cached} cached, {report.generated} generated, "
+        f"{report.reduce_rounds} reduce rounds, {report.seconds:.1f}s)"
+    )
+
+
+SUMMARIZE_FILE_TOOL = ToolSpec(
+    name="summarize_file",
+    description="Summarise a local text/markdown file (mode=abstractive for an LLM summary of long files).",
+    input_model=SummarizeFileInput,
+    handler=summarize_file,
+    intents=[
+        IntentPattern(
+            r"(?:summari[sz]e|tl;?dr)\s+(?:the\s+)?(?:file\s+)?(?P<path>[\w./~-]+\.(?:md|txt|rst))",
+            template="{result}",
+        )
+    ],
+)
+
+
+__all__ = ["SummarizeFileInput", "load_text", "summarize_file", "summarize_text", "SUMMARIZE_FILE_TOOL"]
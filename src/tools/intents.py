@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from . import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+# Politeness around an otherwise exact command does not make it ambiguous.
+_PREFIX = r"(?:(?:please|can you|could you|would you)\s+)?"
+_SUFFIX = r"(?:[\s,]+please)?[\s.!?]*"
+
+
+@dataclass(frozen=True)
+class IntentPattern:
+    """A phrasing that maps straight to a tool call, skipping the model.
+
+    ``pattern`` must match the whole user message (case-insensitive). Its named
+    groups become tool arguments (validated by the tool's input model) on top
+    of the constant ``args``. ``template`` renders the reply; it can use
+    ``{result}`` and any argument name. Intents that change state set
+    ``side_effects`` and only fire when the router is told to allow them.
+    """
+
+    pattern: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    template: str = "{result}"
+    side_effects: bool = False
+
+    def compiled(self) -> "re.Pattern[str]":
+        return _compile(self.pattern)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pattern": self.pattern,
+            "args": dict(self.args),
+            "template": self.template,
+            "side_effects": self.side_effects,
+        }
+
+
+_COMPILED: Dict[str, "re.Pattern[str]"] = {}
+
+
+def _compile(pattern: str) -> "re.Pattern[str]":
+    compiled = _COMPILED.get(pattern)
+    if compiled is None:
+        compiled = _COMPILED[pattern] = re.compile(rf"^{_PREFIX}(?:{pattern}){_SUFFIX}$", re.IGNORECASE)
+    return compiled
+
+
+@dataclass
+class IntentMatch:
+    tool: str
+    args: Dict[str, Any]
+    intent: IntentPattern
+
+    def render(self, result: str) -> str:
+        try:
+            return self.intent.template.format(result=result, **self.args)
+        except (KeyError, IndexError, ValueError):
+            return result
+
+
+@dataclass
+class DispatchStats:
+    """Fast-path hit rate and an estimate of the model time it saved."""
+
+    attempts: int = 0
+    hits: int = 0
+    ambiguous: int = 0
+    fast_seconds: float = 0.0
+    llm_tool_turns: int = 0
+    llm_tool_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    @property
+    def saved_seconds(self) -> Optional[float]:
+        """Hits times the mean cost of an LLM-routed tool turn, minus fast-path time (None until observed)."""
+        if not self.llm_tool_turns:
+            return None
+        return self.hits * (self.llm_tool_seconds / self.llm_tool_turns) - self.fast_seconds
+
+
+class IntentRouter:
+    """Matches user messages against every tool's declared intents.
+
+    Side-effecting intents are skipped unless ``allow_side_effects`` is set: a
+    misread read-only request costs a wrong answer, a misread write changes data.
+    """
+
+    def __init__(self, registry: "ToolRegistry", allow_side_effects: bool = False) -> None:
+        self.registry = registry
+        self.allow_side_effects = allow_side_effects
+        self.stats = DispatchStats()
+        self._lock = threading.Lock()
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """Return the single matching intent, or None when nothing (or more than one tool) matches."""
+        text = " ".join(text.split())
+        matches: List[Tuple[str, IntentPattern, Dict[str, Any]]] = []
+        for tool_name, intents in self.registry.intents().items():
+            for intent in intents:
+                if intent.side_effects and not self.allow_side_effects:
+                    continue
+                found = intent.compiled().match(text)
+                if found:
+                    slots = {key: value.strip() for key, value in found.groupdict().items() if value is not None}
+                    matches.append((tool_name, intent, {**intent.args, **slots}))
+                    break
+        with self._lock:
+            self.stats.attempts += 1
+            if len(matches) > 1:
+                self.stats.ambiguous += 1
+                logger.debug("Ambiguous fast-path match for %r: %s", text, [name for name, _, _ in matches])
+                return None
+        if not matches:
+            return None
+        tool_name, intent, args = matches[0]
+        return IntentMatch(tool=tool_name, args=args, intent=intent)
+
+    def record_hit(self, seconds: float) -> None:
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.fast_seconds += seconds
+            saved = self.stats.saved_seconds
+        logger.info(
+            "Fast path hit in %.3fs; hit rate %.0f%% (%d/%d), %s saved so far",
+            seconds,
+            100 * self.stats.hit_rate,
+            self.stats.hits,
+            self.stats.attempts,
+            "unknown" if saved is None else f"~{saved:.1f}s",
+        )
+
+    def record_llm_tool_turn(self, seconds: float) -> None:
+        with self._lock:
+            self.stats.llm_tool_turns += 1
+            self.stats.llm_tool_seconds += seconds
+
+
+__all__ = ["DispatchStats", "IntentMatch", "IntentPattern", "IntentRouter"]
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from pydantic import BaseModel
+
+from . import IntentPattern, ToolContext, ToolSpec
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "smolmind.tools"
+CONFIG_FILENAME = "tools.json"
+CACHE_FILENAME = "tool_metadata.json"
+
+BUILTIN_TOOLS: Dict[str, str] = {
+    "summarize_file": f"{__package__}.files:SUMMARIZE_FILE_TOOL",
+    "summarize_tree": f"{__package__}.tree:SUMMARIZE_TREE_TOOL",
+    "todo": f"{__package__}.todo:TODO_TOOL",
+    "safe_shell": f"{__package__}.shell:SAFE_SHELL_TOOL",
+    "read_result": f"{__package__}.results:READ_RESULT_TOOL",
+}
+
+
+def resolve_target(target: str) -> ToolSpec:
+    """Import ``module:attribute`` and return the ToolSpec it names (or builds)."""
+    module_name, _, attribute = target.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Tool target '{target}' must look like 'package.module:attribute'.")
+    obj: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    if not isinstance(obj, ToolSpec) and callable(obj):
+        obj = obj()
+    if not isinstance(obj, ToolSpec):
+        raise TypeError(f"Tool target '{target}' did not resolve to a ToolSpec.")
+    return obj
+
+
+@dataclass
+class LazyToolSpec:
+    """Tool metadata kept in memory; the handler module is imported on first use."""
+
+    name: str
+    description: str
+    parameters: Dict[str, Any]
+    target: str
+    intents: List[IntentPattern] = field(default_factory=list)
+    _spec: Optional[ToolSpec] = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self._spec is not None
+
+    @classmethod
+    def from_metadata(
+        cls, name: str, target: str, entry: Mapping[str, Any], spec: Optional[ToolSpec] = None
+    ) -> "LazyToolSpec":
+        """Build from a metadata-cache entry; pass ``spec`` when the module was just imported anyway."""
+        lazy = cls(
+            name=name,
+            description=entry["description"],
+            parameters=entry["parameters"],
+            target=target,
+            intents=[IntentPattern(**intent) for intent in entry.get("intents", [])],
+        )
+        lazy._spec = spec
+        return lazy
+
+    def load(self) -> ToolSpec:
+        if self._spec is None:
+            with self._lock:
+                if self._spec is None:
+                    logger.debug("Importing tool '%s' from %s", self.name, self.target)
+                    self._spec = resolve_target(self.target)
+        return self._spec
+
+    def run(self, raw_args: Mapping[str, Any] | BaseModel, context: ToolContext) -> str:
+        return self.load().run(raw_args, context)
+
+
+@dataclass(frozen=True)
+class PluginSource:
+    name: str
+    target: str
+    fingerprint: str
+
+
+def _module_path(module_name: str) -> Optional[Path]:
+    """Locate a module's source file on ``sys.path`` without importing it or its parent packages.
+
+    ``importlib.util.find_spec`` would import every parent package (running
+    plugin ``__init__`` code) just to answer the question.
+    """
+    *packages, leaf = module_name.split(".")
+    for entry in sys.path:
+        base = Path(entry or os.curdir).joinpath(*packages)
+        for candidate in (base / f"{leaf}.py", base / leaf / "__init__.py"):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def _module_fingerprint(target: str) -> str:
+    """mtime and size of the target's module file; empty (never cached) when it cannot be located."""
+    path = _module_path(target.partition(":")[0])
+    if path is None:
+        return ""
+    stat = path.stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _entry_point_sources() -> List[PluginSource]:
+    sources = []
+    for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        # The module file's stat, not just the dist version: editable installs change without a version bump.
+        fingerprint = _module_fingerprint(entry_point.value)
+        dist = getattr(entry_point, "dist", None)
+        if fingerprint and dist is not None:
+            fingerprint = f"{dist.name}=={dist.version}:{fingerprint}"
+        sources.append(PluginSource(entry_point.name, entry_point.value, fingerprint))
+    return sources
+
+
+def load_tool_config(context: ToolContext) -> Dict[str, Any]:
+    """Read ``<data_dir>/tools.json`` (empty when missing)."""
+    config_path = context.data_dir / CONFIG_FILENAME
+    if not config_path.exists():
+        return {}
+    try:
+        data = json.loads(config_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid tool config '{config_path}': {exc}") from exc
+    if not isinstance(data, dict):
+        raise ValueError(f"Tool config '{config_path}' must contain a JSON object.")
+    return data
+
+
+class ToolMetadataCache:
+    """On-disk cache of tool name/description/schema keyed by target and fingerprint."""
+
+    def __init__(self, cache_path: Path) -> None:
+        self.cache_path = cache_path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        if cache_path.exists():
+            try:
+                self._entries = json.loads(cache_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                self._entries = {}
+
+    def lookup(self, source: PluginSource) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(source.target)
+        if entry and entry.get("fingerprint") == source.fingerprint and source.fingerprint:
+            return entry
+        return None
+
+    def store(self, source: PluginSource, spec: ToolSpec) -> Dict[str, Any]:
+        entry = {
+            "fingerprint": source.fingerprint,
+            "name": spec.name,
+            "description": spec.description,
+            "parameters": spec.input_model.model_json_schema(),
+            "intents": [intent.to_dict() for intent in spec.intents],
+        }
+        self._entries[source.target] = entry
+        self._dirty = True
+        return entry
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._entries, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+def discover_tools(context: ToolContext, include_builtins: bool = True) -> List[LazyToolSpec]:
+    """Collect tools from the built-in table, entry points and ``<data_dir>/tools.json``.
+
+    The config file may contain ``{"plugins": {"name": "module:attr"}, "disabled": ["name"]}``.
+    Metadata is served from ``<data_dir>/tool_metadata.json`` when the module is unchanged,
+    so listing tools never imports their handler modules.
+    """
+    sources: Dict[str, PluginSource] = {}
+    if include_builtins:
+        for name, target in BUILTIN_TOOLS.items():
+            sources[name] = PluginSource(name, target, _module_fingerprint(target))
+    for source in _entry_point_sources():
+        sources[source.name] = source
+
+    config = load_tool_config(context)
+    for name, target in (config.get("plugins") or {}).items():
+        sources[name] = PluginSource(name, target, _module_fingerprint(target))
+    for name in config.get("disabled") or []:
+        sources.pop(name, None)
+
+    cache = ToolMetadataCache(context.data_dir / CACHE_FILENAME)
+    tools: List[LazyToolSpec] = []
+    for source in sources.values():
+        entry = cache.lookup(source)
+        spec: Optional[ToolSpec] = None
+        if entry is None:
+            try:
+                spec = resolve_target(source.target)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Skipping tool '%s' (%s): %s", source.name, source.target, exc)
+                continue
+            entry = cache.store(source, spec)
+        tools.append(LazyToolSpec.from_metadata(source.name, source.target, entry, spec=spec))
+    try:
+        cache.save()
+    except OSError as exc:
+        logger.debug("Could not write tool metadata cache: %s", exc)
+    return tools
+
+
+__all__ = [
+    "BUILTIN_TOOLS",
+    "ENTRY_POINT_GROUP",
+    "LazyToolSpec",
+    "ToolMetadataCache",
+    "discover_tools",
+    "load_tool_config",
+    "resolve_target",
+]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from . import ToolContext, ToolSpec
+
+RESULTS_SUBDIR = "results"
+HANDLE_PREFIX = "res-"
+HANDLE_REGEX = re.compile(rf"^{HANDLE_PREFIX}[0-9a-f]{{16}}$")
+MAX_READ_CHARS = 8000
+# Stored outputs beyond this total are evicted, least recently used first.
+MAX_STORE_BYTES = 100 * 2**20
+# Lines the preview suggests reading next.
+PREVIEW_READ_LINES = 40
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class ResultStore:
+    """Content-addressed store for large tool outputs (identical outputs share one file).
+
+    Reads and repeated writes refresh a file's mtime; once the store exceeds
+    ``max_bytes`` the files with the oldest mtime are deleted.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = MAX_STORE_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def for_context(cls, context: ToolContext) -> "ResultStore":
+        return cls(context.data_dir / RESULTS_SUBDIR)
+
+    def _path(self, handle: str) -> Path:
+        if not HANDLE_REGEX.match(handle):
+            raise ValueError(f"'{handle}' is not a result handle (expected {HANDLE_PREFIX}<16 hex digits>).")
+        digest = handle[len(HANDLE_PREFIX) :]
+        return self.root / digest[:2] / f"{digest}.txt"
+
+    def put(self, text: str) -> str:
+        handle = HANDLE_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        path = self._path(handle)
+        if path.exists():
+            _touch(path)
+            return handle
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return handle
+
+    def get(self, handle: str) -> str:
+        path = self._path(handle)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError as exc:
+            raise FileNotFoundError(f"No stored result for handle '{handle}' (it may have been evicted).") from exc
+        _touch(path)
+        return text
+
+    def _evict(self, keep: Path) -> None:
+        entries = []
+        for path in self.root.glob("*/*.txt"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # removed by another process
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def preview(text: str, handle: str, max_tokens: int) -> str:
+    """First lines of ``text`` within ``max_tokens`` plus instructions for reading the rest."""
+    lines = text.splitlines()
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            if not kept:
+                kept.append(line[: max_tokens * 4])
+            break
+        kept.append(line)
+        used += cost
+    if kept and len(kept[0]) < len(lines[0]):
+        # Only part of an overlong first line fits: continue by character offset.
+        shown = f"the first {len(kept[0])} chars"
+        follow_up = {"handle": handle, "offset": len(kept[0]), "length": 2000}
+    else:
+        shown = f"{len(kept)} of {len(lines)} lines"
+        start = len(kept) + 1
+        follow_up = {"handle": handle, "start_line": start, "end_line": min(start + PREVIEW_READ_LINES - 1, len(lines))}
+    return (
+        "\n".join(kept)
+        + f"\n[Showing {shown} ({len(text)} chars). Full output stored as {handle}; "
+        + f"call read_result with {json.dumps(follow_up)} for more.]"
+    )
+
+
+class ReadResultInput(BaseModel):
+    handle: str = Field(..., description=f"Handle of a stored tool output ({HANDLE_PREFIX}...).")
+    start_line: Optional[int] = Field(None, ge=1, description="First line to return (1-based).")
+    end_line: Optional[int] = Field(None, ge=1, description="Last line to return (inclusive).")
+    offset: int = Field(0, ge=0, description="Character offset, used when no line range is given.")
+    length: int = Field(2000, ge=1, le=MAX_READ_CHARS, description="Maximum number of characters returned.")
+
+    @field_validator("handle")
+    @classmethod
+    def validate_handle(cls, value: str) -> str:
+        return value.strip()
+
+
+def read_result(params: ReadResultInput, context: ToolContext) -> str:
+    """Return a line range or character slice of a stored tool output."""
+    text = ResultStore.for_context(context).get(params.handle)
+    if params.start_line is None and params.end_line is None:
+        chunk = text[params.offset : params.offset + params.length]
+        end = params.offset + len(chunk)
+        return f"{chunk}\n[chars {params.offset}-{end} of {len(text)}]"
+
+    lines = text.splitlines()
+    start = params.start_line or 1
+    end = min(params.end_line or len(lines), len(lines))
+    if start > len(lines):
+        return f"[{params.handle} has only {len(lines)} lines]"
+    chunk = "\n".join(lines[start - 1 : end])
+    if len(chunk) > params.length:
+        chunk = chunk[: params.length]
+        end = start + chunk.count("\n")
+    return f"{chunk}\n[lines {start}-{end} of {len(lines)}]"
+
+
+READ_RESULT_TOOL = ToolSpec(
+    name="read_result",
+    description="Read lines or a character slice of a large earlier tool output by its handle.",
+    input_model=ReadResultInput,
+    handler=read_result,
+)
+
+
+__all__ = ["ReadResultInput", "ResultStore", "preview", "read_result", "READ_RESULT_TOOL"]
@@ -6,7 +6,7 @@ from typing import List, Sequence
 
 from pydantic import BaseModel, Field
 
-from . import ToolContext
+from . import ToolContext, ToolSpec
 
 
 SAFE_COMMAND_WHITELIST = {
@@ -65,4 +65,12 @@ def safe_shell(params: SafeShellInput, context: ToolContext) -> str:  # noqa: AR
     return stdout or "(no output)"
 
 
-__all__ = ["safe_shell", "SafeShellInput", "SAFE_COMMAND_WHITELIST"]
+SAFE_SHELL_TOOL = ToolSpec(
+    name="safe_shell",
+    description="Execute a whitelisted shell command for quick system checks.",
+    input_model=SafeShellInput,
+    handler=safe_shell,
+)
+
+
+__all__ = ["safe_shell", "SafeShellInput", "SAFE_COMMAND_WHITELIST", "SAFE_SHELL_TOOL"]
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
-from . import ToolContext
+from . import IntentPattern, ToolContext, ToolSpec
 
 
 class TodoEntry(BaseModel):
@@ -22,72 +26,210 @@ class TodoInput(BaseModel):
     operation: str = Field(..., description="Operation: add, list, or complete.")
     title: Optional[str] = Field(None, description="Item text when adding a todo.")
     todo_id: Optional[int] = Field(None, description="Numeric identifier when completing.")
+    status: Optional[str] = Field(None, description="Filter for list: open, done, or all.")
+    limit: int = Field(50, ge=1, le=500, description="Maximum number of items returned by list.")
+    offset: int = Field(0, ge=0, description="Number of items to skip when listing.")
 
     def normalised_operation(self) -> str:
         return self.operation.lower().strip()
 
 
+TODO_STATUS_FILTERS = {"all": None, "open": False, "pending": False, "done": True, "completed": True}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_todos_completed ON todos (completed, id);
+CREATE INDEX IF NOT EXISTS idx_todos_created_at ON todos (created_at);
+"""
+
+
 class TodoStore:
-    def __init__(self, store_path: Path) -> None:
+    """SQLite-backed todo storage (WAL mode, safe for concurrent writers).
+
+    Legacy ``todo.json`` files next to the database are imported on first use
+    and renamed to ``todo.json.migrated``.
+    """
+
+    def __init__(self, store_path: Path, legacy_path: Path | None = None, busy_timeout: float = 10.0) -> None:
+        if store_path.suffix == ".json":
+            store_path = store_path.with_suffix(".db")
         self.store_path = store_path
+        self.legacy_path = legacy_path or store_path.with_suffix(".json")
+        self.busy_timeout = busy_timeout
         self.store_path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.store_path.exists():
-            self._write([])
+        self._local = threading.local()
+        self._initialise()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.store_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction holding the database write lock from the start."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _initialise(self) -> None:
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        if self.legacy_path.exists():
+            self._migrate_legacy_json()
 
-    def _read(self) -> List[TodoEntry]:
+    def _migrate_legacy_json(self) -> None:
         try:
-            data = json.loads(self.store_path.read_text(encoding="utf-8"))
+            data = json.loads(self.legacy_path.read_text(encoding="utf-8"))
         except json.JSONDecodeError:
             data = []
-        return [TodoEntry(**item) for item in data]
+        entries = [TodoEntry(**item) for item in data]
+        with self._transaction() as conn:
+            # Another process may have won the race and already migrated the file.
+            if not self.legacy_path.exists():
+                return
+            conn.executemany(
+                "INSERT OR IGNORE INTO todos (id, title, completed, created_at, completed_at) VALUES (?, ?, ?, ?, ?)",
+                [_entry_to_row(entry) for entry in entries],
+            )
+            self.legacy_path.rename(self.legacy_path.with_name(self.legacy_path.name + ".migrated"))
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def list(self, completed: Optional[bool] = None, limit: Optional[int] = None, offset: int = 0) -> List[TodoEntry]:
+        query = "SELECT id, title, completed, created_at, completed_at FROM todos"
+        params: List[object] = []
+        if completed is not None:
+            query += " WHERE completed = ?"
+            params.append(int(completed))
+        query += " ORDER BY id LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
+        rows = self._connect().execute(query, params).fetchall()
+        return [_row_to_entry(row) for row in rows]
 
-    def _write(self, items: List[TodoEntry]) -> None:
-        serialisable = [item.model_dump() for item in items]
-        self.store_path.write_text(json.dumps(serialisable, default=str, indent=2), encoding="utf-8")
+    def count(self, completed: Optional[bool] = None) -> int:
+        if completed is None:
+            row = self._connect().execute("SELECT COUNT(*) FROM todos").fetchone()
+        else:
+            row = self._connect().execute("SELECT COUNT(*) FROM todos WHERE completed = ?", (int(completed),)).fetchone()
+        return int(row[0])
 
-    def list(self) -> List[TodoEntry]:
-        return self._read()
+    def get(self, todo_id: int) -> TodoEntry:
+        row = self._connect().execute(
+            "SELECT id, title, completed, created_at, completed_at FROM todos WHERE id = ?", (todo_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Todo with id {todo_id} not found.")
+        return _row_to_entry(row)
 
     def add(self, title: str) -> TodoEntry:
         if not title.strip():
             raise ValueError("Cannot add an empty todo item.")
-        items = self._read()
-        next_id = 1 + max([item.id for item in items], default=0)
-        entry = TodoEntry(id=next_id, title=title.strip())
-        items.append(entry)
-        self._write(items)
+        entry = TodoEntry(id=0, title=title.strip())
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO todos (title, completed, created_at) VALUES (?, 0, ?)",
+                (entry.title, entry.created_at.isoformat()),
+            )
+        entry.id = int(cursor.lastrowid)
         return entry
 
     def complete(self, todo_id: int) -> TodoEntry:
-        items = self._read()
-        for item in items:
-            if item.id == todo_id:
-                if item.completed:
-                    return item
-                item.completed = True
-                item.completed_at = datetime.utcnow()
-                self._write(items)
-                return item
-        raise ValueError(f"Todo with id {todo_id} not found.")
-
-
-def _format_todos(entries: List[TodoEntry]) -> str:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE todos SET completed = 1, completed_at = ? WHERE id = ? AND completed = 0",
+                (datetime.utcnow().isoformat(), todo_id),
+            )
+        return self.get(todo_id)
+
+
+def _entry_to_row(entry: TodoEntry) -> Tuple[int, str, int, str, Optional[str]]:
+    completed_at = entry.completed_at.isoformat() if entry.completed_at else None
+    return entry.id, entry.title, int(entry.completed), entry.created_at.isoformat(), completed_at
+
+
+def _row_to_entry(row: Tuple) -> TodoEntry:
+    todo_id, title, completed, created_at, completed_at = row
+    return TodoEntry(
+        id=todo_id,
+        title=title,
+        completed=bool(completed),
+        created_at=datetime.fromisoformat(created_at),
+        completed_at=datetime.fromisoformat(completed_at) if completed_at else None,
+    )
+
+
+_STORES: Dict[Path, TodoStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+
+def _reset_stores_after_fork() -> None:
+    # SQLite connections must not cross a fork (e.g. into tool worker processes).
+    global _STORES_LOCK
+    _STORES.clear()
+    _STORES_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_stores_after_fork)
+
+
+def get_todo_store(context: ToolContext) -> TodoStore:
+    """Return the shared store for ``context`` so repeated tool calls reuse connections."""
+    store_path = context.data_dir / "todo.db"
+    with _STORES_LOCK:
+        store = _STORES.get(store_path)
+        if store is None:
+            store = _STORES[store_path] = TodoStore(store_path)
+    return store
+
+
+def _format_todos(entries: List[TodoEntry], total: Optional[int] = None, offset: int = 0) -> str:
     if not entries:
+        if total:
+            return f"No todos at offset {offset} (total {total})."
         return "Todo list is empty. Use operation=add to insert new items."
 
     lines = []
     for entry in entries:
         status = "✅" if entry.completed else "⬜️"
         lines.append(f"{status} #{entry.id} {entry.title}")
+    if total is not None and total > offset + len(entries):
+        lines.append(f"… showing {offset + 1}-{offset + len(entries)} of {total}. Use `offset` for more.")
     return "\n".join(lines)
 
 
 def todo_manager(params: TodoInput, context: ToolContext) -> str:
-    store = TodoStore(context.data_dir / "todo.json")
+    store = get_todo_store(context)
     operation = params.normalised_operation()
 
     if operation == "list":
-        return _format_todos(store.list())
+        status = (params.status or "all").lower().strip()
+        if status not in TODO_STATUS_FILTERS:
+            raise ValueError(f"Unsupported todo status '{params.status}'. Use one of {sorted(TODO_STATUS_FILTERS)}.")
+        completed = TODO_STATUS_FILTERS[status]
+        entries = store.list(completed=completed, limit=params.limit, offset=params.offset)
+        return _format_todos(entries, total=store.count(completed=completed), offset=params.offset)
 
     if operation == "add":
         if not params.title:
@@ -104,4 +246,42 @@ def todo_manager(params: TodoInput, context: ToolContext) -> str:
     raise ValueError(f"Unsupported todo operation '{params.operation}'.")
 
 
-__all__ = ["TodoInput", "todo_manager", "TodoStore", "TodoEntry"]
+TODO_TOOL = ToolSpec(
+    name="todo",
+    description="Manage the local SmolMind todo list. Supports add/list/complete operations.",
+    input_model=TodoInput,
+    handler=todo_manager,
+    intents=[
+        IntentPattern(
+            r"(?:show|list|display|what are|what's on|whats on)\s+(?:me\s+)?(?:all\s+)?(?:of\s+)?(?:my\s+)?"
+            r"(?:(?P<status>open|pending|done|completed)\s+)?(?:todo list|to-do list|todos?|to-dos?|tasks)",
+            args={"operation": "list"},
+            template="Here is your todo list:\n{result}",
+        ),
+        # Adds need an explicit delimiter ("add todo: X", "add X to my todo list"), so requests
+        # such as "create a task scheduler" or "add a task queue to my app" reach the model.
+        IntentPattern(
+            r"add\s+(?:a\s+)?(?:new\s+)?(?:todo|to-do|task)\s*:\s*(?P<title>.+?)",
+            args={"operation": "add"},
+            side_effects=True,
+        ),
+        IntentPattern(
+            r"add\s+(?P<title>.+?)\s+to\s+(?:my\s+)?(?:todo|to-do|task)\s*list",
+            args={"operation": "add"},
+            side_effects=True,
+        ),
+        IntentPattern(
+            r"(?:mark|set)\s+(?:todo|to-do|task|item)?\s*#?(?P<todo_id>\d+)\s+(?:as\s+)?(?:done|complete|completed|finished)",
+            args={"operation": "complete"},
+            side_effects=True,
+        ),
+        IntentPattern(
+            r"(?:complete|finish|check off|tick off)\s+(?:todo|to-do|task|item)\s*#?(?P<todo_id>\d+)",
+            args={"operation": "complete"},
+            side_effects=True,
+        ),
+    ],
+)
+
+
+__all__ = ["TodoInput", "todo_manager", "TodoStore", "TodoEntry", "get_todo_store", "TODO_TOOL"]
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, field_validator
+
+from . import ToolContext, ToolSpec
+from .files import load_text, summarize_text
+
+CACHE_FILENAME = "tree_summaries.json"
+# Below this many uncached files starting a pool costs more than it saves.
+MIN_PARALLEL_FILES = 8
+# Oldest-used entries beyond this are dropped so the cache file stays small.
+MAX_CACHE_ENTRIES = 5000
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    # This runs in the chat process, which has the model loaded and several threads:
+    # pool workers come from a clean forkserver (or spawn) rather than a fork of it.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class SummarizeTreeInput(BaseModel):
+    path: str = Field(".", description="Directory to summarise, relative to the working directory.")
+    include: List[str] = Field(
+        default_factory=lambda: ["**/*.md", "**/*.txt"], description="Glob patterns selecting files."
+    )
+    exclude: List[str] = Field(default_factory=list, description="Glob patterns of files to skip.")
+    max_sentences: int = Field(2, ge=1, le=12, description="Sentences per file summary.")
+    max_files: int = Field(200, ge=1, le=2000, description="Maximum number of files summarised.")
+    max_output_chars: int = Field(20_000, ge=500, le=200_000, description="Maximum length of the combined output.")
+    workers: Optional[int] = Field(None, ge=1, le=64, description="Process pool size; defaults to the CPU count.")
+
+    @field_validator("include")
+    @classmethod
+    def validate_include(cls, value: List[str]) -> List[str]:
+        if not value:
+            raise ValueError("At least one include pattern is required.")
+        return value
+
+
+def _matching_files(root: Path, include: List[str], exclude: List[str]) -> List[Path]:
+    """Sorted files under ``root`` matching ``include`` but not ``exclude`` (hidden paths skipped)."""
+    matches = set()
+    for pattern in include:
+        for path in root.glob(pattern):
+            relative = path.relative_to(root)
+            if any(part.startswith(".") for part in relative.parts) or not path.is_file():
+                continue
+            if any(fnmatch.fnmatch(relative.as_posix(), skip) for skip in exclude):
+                continue
+            matches.add(path)
+    return sorted(matches, key=lambda path: path.relative_to(root).as_posix())
+
+
+def _summarize_one(job: Tuple[str, int]) -> str:
+    path, max_sentences = job
+    try:
+        return summarize_text(load_text(Path(path)), max_sentences)
+    except (OSError, UnicodeDecodeError) as exc:
+        return f"- (could not read file: {exc})"
+
+
+class SummaryCache:
+    """Per-file summaries keyed by path and invalidated by mtime/size.
+
+    Holds at most ``max_entries`` files, dropping the least recently used.
+    """
+
+    def __init__(self, path: Path, max_entries: int = MAX_CACHE_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        try:
+            self._entries: Dict[str, Dict] = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+        self._dirty = False
+
+    @staticmethod
+    def _fingerprint(file_path: Path, max_sentences: int) -> str:
+        stat = file_path.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}:{max_sentences}"
+
+    def get(self, file_path: Path, max_sentences: int) -> Optional[str]:
+        key = str(file_path)
+        entry = self._entries.get(key)
+        if entry and entry["fingerprint"] == self._fingerprint(file_path, max_sentences):
+            # Dicts keep insertion order: move the hit to the most recently used end.
+            self._entries[key] = self._entries.pop(key)
+            return entry["summary"]
+        return None
+
+    def put(self, file_path: Path, max_sentences: int, summary: str) -> None:
+        key = str(file_path)
+        self._entries.pop(key, None)
+        self._entries[key] = {
+            "fingerprint": self._fingerprint(file_path, max_sentences),
+            "summary": summary,
+        }
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._entries), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def iter_tree_summaries(
+    files: List[Path], max_sentences: int, cache: SummaryCache, workers: Optional[int] = None
+) -> Iterator[Tuple[Path, str]]:
+    """Yield ``(path, summary)`` in the order of ``files`` while misses are summarised in parallel."""
+    cached = {path: cache.get(path, max_sentences) for path in files}
+    missing = [path for path in files if cached[path] is None]
+    jobs = [(str(path), max_sentences) for path in missing]
+    pool: Optional[ProcessPoolExecutor] = None
+    computed: Iterator[str]
+    if len(missing) >= MIN_PARALLEL_FILES:
+        size = min(workers or os.cpu_count() or 1, len(missing))
+        pool = ProcessPoolExecutor(max_workers=size, mp_context=_pool_context())
+        # map() yields in submission order, so output is deterministic however workers finish.
+        computed = pool.map(_summarize_one, jobs, chunksize=max(1, len(jobs) // (size * 4)))
+    else:
+        computed = map(_summarize_one, jobs)
+    try:
+        for path in files:
+            summary = cached[path]
+            if summary is None:
+                summary = next(computed)
+                cache.put(path, max_sentences, summary)
+            yield path, summary
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        cache.save()
+
+
+def summarize_tree(params: SummarizeTreeInput, context: ToolContext) -> str:
+    """Summarise every matching file below a directory in one call."""
+    root = Path(params.path)
+    if not root.is_absolute():
+        root = context.base_path / root
+    if not root.exists():
+        raise FileNotFoundError(f"Directory '{root}' does not exist.")
+    if not root.is_dir():
+        raise NotADirectoryError(f"Expected a directory but received '{root}'.")
+
+    files = _matching_files(root, params.include, params.exclude)
+    if not files:
+        return f"No files under '{root.name or root}' match {params.include}."
+    selected = files[: params.max_files]
+
+    cache = SummaryCache(context.data_dir / CACHE_FILENAME)
+    sections: List[str] = []
+    used = 0
+    truncated = False
+    with closing(iter_tree_summaries(selected, params.max_sentences, cache, params.workers)) as summaries:
+        for path, summary in summaries:
+            section = f"## {path.relative_to(root).as_posix()}\n{summary}"
+            if used + len(section) > params.max_output_chars:
+                truncated = True
+                break
+            sections.append(section)
+            used += len(section) + 2
+
+    notes = []
+    if len(files) > len(selected):
+        notes.append(f"{len(files) - len(selected)} more files skipped (max_files={params.max_files}).")
+    if truncated:
+        notes.append(
+            f"Output stopped after {len(sections)} of {len(selected)} files (max_output_chars={params.max_output_chars})."
+        )
+    return "\n\n".join(sections + notes)
+
+
+SUMMARIZE_TREE_TOOL = ToolSpec(
+    name="summarize_tree",
+    description="Summarise all text/markdown files in a directory (glob filters, parallel, cached).",
+    input_model=SummarizeTreeInput,
+    handler=summarize_tree,
+)
+
+
+__all__ = ["SummarizeTreeInput", "SummaryCache", "iter_tree_summaries", "summarize_tree", "SUMMARIZE_TREE_TOOL"]
@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import recv_handle, send_handle
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..cancellation import CancellationToken
+from . import ToolContext
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from . import ToolRegistry
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows has no rlimits
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+WORKERS_SUPPORTED = resource is not None and "fork" in multiprocessing.get_all_start_methods()
+
+# How often a waiting call re-checks its cancellation token.
+CANCEL_POLL_INTERVAL = 0.1
+# How long a graceful stop waits for a worker to exit before killing it.
+STOP_GRACE_SECONDS = 1.0
+
+
+class WorkerLimits(BaseModel):
+    """Execution limits for one tool (or the shared default pool)."""
+
+    pool_size: int = Field(1, ge=1, le=32, description="Number of warm worker processes.")
+    timeout: float = Field(30.0, gt=0, description="Wall-clock limit per call in seconds.")
+    cpu_seconds: Optional[int] = Field(None, ge=1, description="CPU-time limit per call (RLIMIT_CPU).")
+    memory_mb: Optional[int] = Field(
+        None, ge=16, description="Extra address space a worker may allocate beyond its start-up size (RLIMIT_AS)."
+    )
+    max_calls: int = Field(100, ge=1, description="Recycle a worker after this many calls.")
+    inline: bool = Field(False, description="Run in the calling process instead of a worker.")
+
+
+def _address_space_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            pages = int(handle.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def _apply_memory_limit(memory_mb: Optional[int]) -> None:
+    if memory_mb is None:
+        return
+    baseline = _address_space_bytes() or 0
+    limit = baseline + memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _apply_cpu_limit(cpu_seconds: Optional[int]) -> None:
+    if cpu_seconds is None:
+        return
+    # RLIMIT_CPU counts process lifetime, so move the soft limit forward for each call.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = math.ceil(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = used + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+
+def _portable_exception(exc: BaseException) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:  # pylint: disable=broad-except
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+
+
+def _worker_main(conn: Connection, registry: "ToolRegistry", limits: WorkerLimits) -> None:
+    # Ctrl-C is handled by the parent; workers only stop when told to or killed.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _apply_memory_limit(limits.memory_mb)
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        name, args, context = message
+        _apply_cpu_limit(limits.cpu_seconds)
+        try:
+            reply: Tuple[str, Any] = ("ok", registry.get(name).run(args, context))
+        except MemoryError:
+            reply = ("error", MemoryError(f"Tool '{name}' exceeded its memory limit of {limits.memory_mb} MB."))
+        except BaseException as exc:  # pylint: disable=broad-except
+            reply = ("error", _portable_exception(exc))
+        conn.send(reply)
+    conn.close()
+
+
+def _reap(pid: int, timeout: Optional[float]) -> Optional[int]:
+    """Wait up to ``timeout`` seconds (forever when None) for child ``pid``; its exit code or None."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            done, status = os.waitpid(pid, 0 if deadline is None else os.WNOHANG)
+        except ChildProcessError:
+            return 0
+        if done:
+            return os.waitstatus_to_exitcode(status)
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.01)
+
+
+def _zygote_main(control: Connection, registry: "ToolRegistry", limits: WorkerLimits) -> None:
+    """Fork tool workers on request from a process that never loads the model or starts threads.
+
+    Forking a multi-threaded parent (torch thread pools, reader threads) can
+    deadlock the child, so only this process, itself forked before the model
+    loads, ever forks workers.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            message = control.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        if message[0] == "spawn":
+            parent_end, child_end = multiprocessing.Pipe()
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    control.close()
+                    parent_end.close()
+                    _worker_main(child_end, registry, limits)
+                except BaseException:  # pylint: disable=broad-except
+                    code = 1
+                finally:
+                    os._exit(code)
+            child_end.close()
+            send_handle(control, parent_end.fileno(), os.getppid())
+            control.send(pid)
+            parent_end.close()
+        elif message[0] == "reap":
+            _, pid, timeout = message
+            control.send(_reap(pid, timeout))
+    control.close()
+
+
+class _Zygote:
+    """Parent-side handle on a pool's zygote process."""
+
+    def __init__(self, ctx, registry: "ToolRegistry", limits: WorkerLimits, name: str) -> None:
+        self._conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_zygote_main, args=(child_conn, registry, limits), name=f"smolmind-tool-{name}-zygote", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._lock = threading.Lock()
+
+    def spawn(self) -> Tuple[int, Connection]:
+        with self._lock:
+            self._conn.send(("spawn",))
+            fd = recv_handle(self._conn)
+            pid = self._conn.recv()
+        return pid, Connection(fd)
+
+    def reap(self, pid: int, timeout: Optional[float]) -> Optional[int]:
+        with self._lock:
+            self._conn.send(("reap", pid, timeout))
+            return self._conn.recv()
+
+    def stop(self) -> None:
+        try:
+            with self._lock:
+                self._conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=STOP_GRACE_SECONDS)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self._conn.close()
+
+
+@dataclass
+class _Worker:
+    pid: int
+    conn: Connection
+    zygote: _Zygote
+    calls: int = 0
+
+    def stop(self, graceful: bool = True) -> Optional[int]:
+        """Stop the worker and return its exit code (negative for signals)."""
+        code = None
+        try:
+            if graceful:
+                try:
+                    self.conn.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+                code = self.zygote.reap(self.pid, STOP_GRACE_SECONDS)
+            else:
+                # A worker that already died keeps its exit status until reaped.
+                code = self.zygote.reap(self.pid, 0)
+            if code is None:
+                try:
+                    os.kill(self.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                code = self.zygote.reap(self.pid, None)
+        except (EOFError, OSError):
+            pass  # zygote gone (interpreter shutdown); the worker exits on EOF
+        finally:
+            self.conn.close()
+        return code
+
+
+class ToolWorkerPool:
+    """Fixed-size pool of worker processes running tool handlers.
+
+    ``start`` forks one zygote per pool; every worker, including replacements
+    after a timeout, crash or recycle, is forked from that zygote rather than
+    from the (by then multi-threaded, model-holding) calling process.
+    """
+
+    def __init__(self, registry: "ToolRegistry", limits: WorkerLimits, name: str = "default") -> None:
+        if not WORKERS_SUPPORTED:
+            raise RuntimeError("Tool worker pools require a POSIX platform with fork and rlimits.")
+        self.registry = registry
+        self.limits = limits
+        self.name = name
+        self._ctx = multiprocessing.get_context("fork")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._zygote: Optional[_Zygote] = None
+
+    def _spawn(self) -> _Worker:
+        pid, conn = self._zygote.spawn()
+        worker = _Worker(pid=pid, conn=conn, zygote=self._zygote)
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, graceful: bool) -> Optional[int]:
+        code = worker.stop(graceful=graceful)
+        with self._lock:
+            self._workers.remove(worker)
+            if self._zygote is not None:
+                self._idle.put(self._spawn())
+        return code
+
+    def start(self) -> None:
+        with self._lock:
+            if self._zygote is not None:
+                return
+            self._zygote = _Zygote(self._ctx, self.registry, self.limits, self.name)
+            for _ in range(self.limits.pool_size):
+                self._idle.put(self._spawn())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            zygote, self._zygote = self._zygote, None
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+        if zygote is not None:
+            zygote.stop()
+        self._idle = queue.Queue()
+
+    def _wait_for_reply(self, worker: _Worker, cancel: CancellationToken | None) -> bool:
+        deadline = time.monotonic() + self.limits.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if cancel is None:
+                return worker.conn.poll(remaining)
+            if worker.conn.poll(min(remaining, CANCEL_POLL_INTERVAL)):
+                return True
+            cancel.raise_if_cancelled()
+
+    def call(
+        self,
+        name: str,
+        args: Mapping[str, Any] | BaseModel,
+        context: ToolContext,
+        cancel: CancellationToken | None = None,
+    ) -> str:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        self.start()
+        try:
+            worker = self._idle.get(timeout=self.limits.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No '{self.name}' tool worker became free within {self.limits.timeout} seconds."
+            ) from None
+        try:
+            worker.conn.send((name, args, context))
+            # Raises CancelledError mid-call; the worker is then killed below.
+            ready = self._wait_for_reply(worker, cancel)
+            if not ready:
+                self._retire(worker, graceful=False)
+                raise TimeoutError(f"Tool '{name}' timed out after {self.limits.timeout} seconds.")
+            try:
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                code = self._retire(worker, graceful=False)
+                if code == -signal.SIGXCPU or code == -signal.SIGKILL:
+                    raise TimeoutError(f"Tool '{name}' exceeded its CPU limit of {self.limits.cpu_seconds} seconds.")
+                raise RuntimeError(f"Tool worker for '{name}' exited unexpectedly (code {code}).")
+        except BaseException:
+            # A worker interrupted mid-call may still send a reply; never reuse it.
+            if worker in self._workers:
+                self._retire(worker, graceful=False)
+            raise
+
+        worker.calls += 1
+        if worker.calls >= self.limits.max_calls:
+            self._retire(worker, graceful=True)
+        else:
+            self._idle.put(worker)
+
+        if status == "error":
+            raise payload
+        return payload
+
+
+# summarize_tree manages its own process pool (daemonic workers cannot have children), started
+# from a forkserver so the chat process is never forked; summarize_file's abstractive mode
+# must reuse the model already loaded in this process.
+BUILTIN_TOOL_LIMITS: Dict[str, Dict[str, Any]] = {"summarize_tree": {"inline": True}, "summarize_file": {"inline": True}}
+
+
+_LIVE_EXECUTORS: "weakref.WeakSet[ToolExecutor]" = weakref.WeakSet()
+
+
+@atexit.register
+def _shutdown_executors() -> None:
+    for executor in list(_LIVE_EXECUTORS):
+        executor.shutdown()
+
+
+class ToolExecutor:
+    """Routes tool calls to per-tool worker pools according to ``WorkerLimits``."""
+
+    def __init__(
+        self,
+        registry: "ToolRegistry",
+        default_limits: WorkerLimits | None = None,
+        tool_limits: Dict[str, WorkerLimits] | None = None,
+    ) -> None:
+        self.registry = registry
+        self.default_limits = default_limits or WorkerLimits()
+        self.tool_limits = dict(tool_limits or {})
+        self._pools: Dict[str, ToolWorkerPool] = {}
+        self._lock = threading.Lock()
+        _LIVE_EXECUTORS.add(self)
+
+    @classmethod
+    def from_config(cls, registry: "ToolRegistry", config: Mapping[str, Any]) -> "ToolExecutor":
+        """Build from the ``workers`` section of ``tools.json``."""
+        return cls(
+            registry,
+            default_limits=WorkerLimits(**(config.get("default") or {})),
+            tool_limits={
+                name: WorkerLimits(**limits)
+                for name, limits in {**BUILTIN_TOOL_LIMITS, **(config.get("tools") or {})}.items()
+            },
+        )
+
+    def limits_for(self, name: str) -> WorkerLimits:
+        return self.tool_limits.get(name, self.default_limits)
+
+    def _pool_for(self, name: str) -> ToolWorkerPool:
+        key = name if name in self.tool_limits else "default"
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = ToolWorkerPool(self.registry, self.limits_for(name), name=key)
+        return pool
+
+    def start(self) -> None:
+        """Fork every configured pool's zygote and workers (call before loading the model)."""
+        self._pool_for("default").start()
+        for name, limits in self.tool_limits.items():
+            if not limits.inline:
+                self._pool_for(name).start()
+
+    def call(
+        self,
+        name: str,
+        args: Mapping[str, Any] | BaseModel,
+        context: ToolContext,
+        cancel: CancellationToken | None = None,
+    ) -> str:
+        if name not in self.registry.names():
+            raise KeyError(f"Unknown tool '{name}'.")
+        if self.limits_for(name).inline:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            return self.registry.get(name).run(args, context)
+        return self._pool_for(name).call(name, args, context, cancel=cancel)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown()
+
+
+__all__ = ["ToolExecutor", "ToolWorkerPool", "WorkerLimits", "WORKERS_SUPPORTED"]
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACE_VERSION = 1
+# Message bodies at least this long are written once and referenced by hash afterwards;
+# system prompts and history repeat on every call, so this keeps traces compact.
+REF_MIN_CHARS = 200
+
+
+@dataclass
+class CallTrace:
+    """One model call: a single completion or a batched generation."""
+
+    kind: str  # "completion" or "batch"
+    prompts: List[List[Dict[str, Any]]]
+    outputs: List[str]
+    seconds: float
+    adapters: Optional[List[Optional[str]]] = None
+
+
+@dataclass
+class ToolTrace:
+    name: str
+    args: Dict[str, Any]
+    seconds: float
+    output_chars: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class TurnTrace:
+    session: str
+    index: int
+    started: float
+    user: str
+    agent: Optional[str] = None
+    seconds: float = 0.0
+    fast_path: bool = False
+    truncated: bool = False
+    error: Optional[str] = None
+    calls: List[CallTrace] = field(default_factory=list)
+    tools: List[ToolTrace] = field(default_factory=list)
+    # AgentCore configuration (fan-out, memory, fast path, ...) the turn ran under. Written
+    # as a "header" record whenever it changes rather than on every turn.
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "TurnTrace":
+        payload = dict(payload)
+        payload["calls"] = [CallTrace(**call) for call in payload.get("calls", [])]
+        payload["tools"] = [ToolTrace(**tool) for tool in payload.get("tools", [])]
+        return cls(**payload)
+
+
+def _blob_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class TraceRecorder:
+    """Appends one compact JSON line per turn to ``path`` (thread-safe).
+
+    Long message bodies are emitted once as ``{"type": "blob"}`` lines and
+    referenced from prompts as ``{"role": ..., "ref": id}``. A ``{"type": "header"}``
+    line carrying the core configuration precedes the first turn and every
+    turn whose configuration differs from the previous one.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._written: set[str] = set()
+        self._config: Optional[Dict[str, Any]] = None
+        if self.path.exists():
+            for record in _read_lines(self.path):
+                if record.get("type") == "blob":
+                    self._written.add(record["id"])
+                elif record.get("type") == "header":
+                    self._config = record.get("config", {})
+
+    def start_turn(self, session: str, index: int, user_text: str) -> TurnTrace:
+        return TurnTrace(session=session, index=index, started=time.time(), user=user_text)
+
+    def _compact(self, messages: List[Dict[str, Any]], blobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        compact = []
+        for message in messages:
+            content = message.get("content", "")
+            if len(content) < REF_MIN_CHARS:
+                compact.append(message)
+                continue
+            blob_id = _blob_id(content)
+            if blob_id not in self._written:
+                self._written.add(blob_id)
+                blobs.append({"type": "blob", "id": blob_id, "content": content})
+            compact.append({**{k: v for k, v in message.items() if k != "content"}, "ref": blob_id})
+        return compact
+
+    def write(self, trace: TurnTrace) -> None:
+        payload = asdict(trace)
+        config = payload.pop("config")
+        with self._lock:
+            lines: List[Dict[str, Any]] = []
+            if config != self._config:
+                self._config = config
+                lines.append({"type": "header", "v": TRACE_VERSION, "config": config})
+            for call in payload["calls"]:
+                call["prompts"] = [self._compact(prompt, lines) for prompt in call["prompts"]]
+            lines.append({"type": "turn", "v": TRACE_VERSION, **payload})
+            with self.path.open("a", encoding="utf-8") as handle:
+                for line in lines:
+                    handle.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def _read_lines(path: Path) -> Iterator[Dict[str, Any]]:
+    with Path(path).open(encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_traces(path: Path) -> List[TurnTrace]:
+    """Read a trace file, expanding blob references back into message content.
+
+    Each turn's ``config`` is taken from the header record before it; traces
+    written before headers existed load with an empty config.
+    """
+    blobs: Dict[str, str] = {}
+    config: Dict[str, Any] = {}
+    turns: List[TurnTrace] = []
+    for record in _read_lines(path):
+        kind = record.pop("type", None)
+        if kind == "blob":
+            blobs[record["id"]] = record["content"]
+        elif kind == "header":
+            config = record.get("config", {})
+        elif kind == "turn":
+            record.pop("v", None)
+            for call in record.get("calls", []):
+                call["prompts"] = [
+                    [
+                        {**{k: v for k, v in message.items() if k != "ref"}, "content": blobs[message["ref"]]}
+                        if "ref" in message
+                        else message
+                        for message in prompt
+                    ]
+                    for prompt in call["prompts"]
+                ]
+            turns.append(TurnTrace.from_dict({**record, "config": dict(config)}))
+    return turns
+
+
+__all__ = ["CallTrace", "ToolTrace", "TraceRecorder", "TurnTrace", "load_traces"]
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import logging
+import math
+import queue
+import re
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16_000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH
+
+
+# --------------------------------------------------------------------------- audio sources
+
+
+class WavFileSource:
+    """Yield 30 ms mono 16 kHz PCM frames from a WAV file (for tests and benchmarks)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    def frames(self) -> Iterator[bytes]:
+        with wave.open(str(self.path), "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"'{self.path}' must be 16-bit PCM (got {8 * wav.getsampwidth()}-bit).")
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            samples = array("h", wav.readframes(wav.getnframes()))
+        if channels > 1:
+            samples = array("h", (int(sum(samples[i : i + channels]) / channels) for i in range(0, len(samples), channels)))
+        if rate != SAMPLE_RATE:
+            samples = _resample(samples, rate, SAMPLE_RATE)
+        data = samples.tobytes()
+        for offset in range(0, len(data) - FRAME_BYTES + 1, FRAME_BYTES):
+            yield data[offset : offset + FRAME_BYTES]
+
+
+class MicrophoneSource:
+    """Yield 30 ms frames from the default microphone via ``speech_recognition``."""
+
+    def __init__(self) -> None:
+        try:
+            import speech_recognition as sr
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("Speech recognition not available. Install `speechrecognition`.") from exc
+        try:
+            self._microphone = sr.Microphone(sample_rate=SAMPLE_RATE, chunk_size=FRAME_SAMPLES)
+        except AttributeError as exc:
+            raise RuntimeError("PyAudio is required for microphone input. Install it or run without --voice.") from exc
+
+    def frames(self) -> Iterator[bytes]:
+        try:
+            with self._microphone as source:
+                while True:
+                    yield source.stream.read(FRAME_SAMPLES)
+        except OSError as exc:  # e.g. no default input device
+            raise RuntimeError("No microphone input device detected. Connect a mic or run without --voice.") from exc
+
+
+def _resample(samples: array, source_rate: int, target_rate: int) -> array:
+    ratio = source_rate / target_rate
+    length = int(len(samples) / ratio)
+    return array("h", (samples[min(int(i * ratio), len(samples) - 1)] for i in range(length)))
+
+
+# --------------------------------------------------------------------------- voice activity detection
+
+
+def frame_rms(frame: bytes) -> float:
+    samples = array("h", frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+@dataclass
+class VADConfig:
+    min_energy: float = 300.0
+    noise_multiplier: float = 3.0
+    calibration_ms: int = 300
+    silence_ms: int = 600
+    padding_ms: int = 150
+    min_speech_ms: int = 200
+    max_utterance_s: float = 15.0
+
+
+class EnergyVAD:
+    """Energy-based voice activity detector that splits a frame stream into utterances.
+
+    The noise floor is calibrated from the first ``calibration_ms`` of audio.
+    ``webrtcvad`` is used for the speech decision when it is installed.
+    """
+
+    def __init__(self, config: VADConfig | None = None) -> None:
+        self.config = config or VADConfig()
+        try:
+            import webrtcvad  # type: ignore
+
+            self._webrtc = webrtcvad.Vad(2)
+        except ImportError:
+            self._webrtc = None
+
+    def segments(self, frames: Iterator[bytes], start_timeout_s: float | None = None) -> Iterator[bytes]:
+        """Yield one PCM blob per utterance.
+
+        With ``start_timeout_s`` the generator stops when no speech starts within
+        that many seconds of listening.
+        """
+        cfg = self.config
+        start_timeout_frames = None if start_timeout_s is None else int(start_timeout_s * 1000 / FRAME_MS)
+        idle_frames = 0
+        calibration_frames = max(1, cfg.calibration_ms // FRAME_MS)
+        silence_frames = max(1, cfg.silence_ms // FRAME_MS)
+        min_speech_frames = max(1, cfg.min_speech_ms // FRAME_MS)
+        max_frames = int(cfg.max_utterance_s * 1000 / FRAME_MS)
+
+        noise: List[float] = []
+        threshold = cfg.min_energy
+        padding: Deque[bytes] = deque(maxlen=max(1, cfg.padding_ms // FRAME_MS))
+        utterance: List[bytes] = []
+        speech_count = 0
+        trailing_silence = 0
+
+        for frame in frames:
+            energy = frame_rms(frame)
+            if len(noise) < calibration_frames:
+                noise.append(energy)
+                threshold = max(cfg.min_energy, cfg.noise_multiplier * sum(noise) / len(noise))
+            is_speech = self._is_speech(frame, energy, threshold)
+
+            if not utterance:
+                if is_speech:
+                    utterance = list(padding) + [frame]
+                    speech_count, trailing_silence = 1, 0
+                else:
+                    padding.append(frame)
+                    idle_frames += 1
+                    if start_timeout_frames is not None and idle_frames >= start_timeout_frames:
+                        return
+                continue
+
+            utterance.append(frame)
+            if is_speech:
+                speech_count += 1
+                trailing_silence = 0
+            else:
+                trailing_silence += 1
+            if trailing_silence >= silence_frames or len(utterance) >= max_frames:
+                if speech_count >= min_speech_frames:
+                    yield b"".join(utterance)
+                utterance, speech_count, trailing_silence, idle_frames = [], 0, 0, 0
+                padding.clear()
+
+        if utterance and speech_count >= min_speech_frames:
+            yield b"".join(utterance)
+
+    def _is_speech(self, frame: bytes, energy: float, threshold: float) -> bool:
+        if energy < threshold:
+            return False
+        if self._webrtc is not None:
+            return self._webrtc.is_speech(frame, SAMPLE_RATE)
+        return True
+
+
+# --------------------------------------------------------------------------- speech to text
+
+
+class Transcriber:
+    """Keeps the Whisper model resident; falls back to the Google recogniser."""
+
+    def __init__(self, model_name: str = "base") -> None:
+        self.model_name = model_name
+        self._model = None
+        self._recogniser = None
+        self._lock = threading.Lock()
+        self.load_seconds = 0.0
+
+    def load(self) -> None:
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            try:
+                import whisper  # type: ignore
+            except ImportError:
+                logger.info("openai-whisper not installed; using the Google recognizer.")
+                self._model = False
+                return
+            start = time.perf_counter()
+            self._model = whisper.load_model(self.model_name)
+            self.load_seconds = time.perf_counter() - start
+            logger.info("Loaded Whisper '%s' in %.2fs", self.model_name, self.load_seconds)
+
+    def transcribe(self, pcm: bytes) -> str:
+        self.load()
+        if self._model:
+            import numpy as np
+
+            audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+            result = self._model.transcribe(audio, fp16=False)
+            return result.get("text", "").strip()
+        return self._transcribe_google(pcm)
+
+    def _transcribe_google(self, pcm: bytes) -> str:
+        try:
+            import speech_recognition as sr
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("Speech recognition not available. Install `speechrecognition` or `openai-whisper`.") from exc
+        if self._recogniser is None:
+            self._recogniser = sr.Recognizer()
+        try:
+            return self._recogniser.recognize_google(sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH))
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as exc:
+            raise RuntimeError(
+                "Google Speech API is unavailable. Install `openai-whisper` or configure another recognizer."
+            ) from exc
+
+
+# --------------------------------------------------------------------------- text to speech
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class Speaker:
+    """Speaks queued sentences on a background thread with one resident TTS engine."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="smolmind-tts", daemon=True)
+        self._thread.start()
+
+    def say(self, text: str) -> None:
+        if text.strip():
+            self._queue.put(text.strip())
+
+    def wait(self) -> None:
+        """Block until everything queued so far has been spoken."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        try:
+            import pyttsx3
+
+            # pyttsx3 engines must be driven from the thread that created them.
+            engine = pyttsx3.init()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("TTS unavailable (%s); voice responses are disabled.", exc)
+            engine = None
+        while True:
+            text = self._queue.get()
+            try:
+                if text is None:
+                    return
+                if engine is not None:
+                    engine.say(text)
+                    engine.runAndWait()
+            finally:
+                self._queue.task_done()
+
+
+class SentenceStreamer:
+    """Token callback that forwards each completed sentence to ``emit``."""
+
+    def __init__(self, emit: Callable[[str], None]) -> None:
+        self.emit = emit
+        self._buffer = ""
+
+    def __call__(self, token: str) -> None:
+        self._buffer += token
+        parts = SENTENCE_END.split(self._buffer)
+        for sentence in parts[:-1]:
+            self.emit(sentence)
+        self._buffer = parts[-1]
+
+    def flush(self) -> None:
+        if self._buffer.strip():
+            self.emit(self._buffer)
+        self._buffer = ""
+
+
+# --------------------------------------------------------------------------- pipeline
+
+
+class VoicePipeline:
+    """Resident recogniser + VAD + TTS shared across a whole chat session."""
+
+    def __init__(
+        self,
+        whisper_model: str = "base",
+        vad_config: VADConfig | None = None,
+        speak: bool = True,
+        preload: bool = True,
+    ) -> None:
+        self.transcriber = Transcriber(whisper_model)
+        self.vad = EnergyVAD(vad_config)
+        self.speaker = Speaker() if speak else None
+        if preload:
+            # Load the speech model while the chat model is still warming up.
+            threading.Thread(target=self.transcriber.load, name="smolmind-stt-load", daemon=True).start()
+
+    def utterances(self, source) -> Iterator[str]:
+        """Yield transcripts for each speech segment in ``source``; empty ones are skipped."""
+        for segment in self.vad.segments(source.frames()):
+            text = self.transcriber.transcribe(segment)
+            if text:
+                yield text
+
+    def listen(self, source, timeout: float = 5.0) -> str:
+        """Transcribe the next utterance from ``source``; empty string on silence."""
+        segments = self.vad.segments(source.frames(), start_timeout_s=timeout)
+        try:
+            for segment in segments:
+                return self.transcriber.transcribe(segment)
+        finally:
+            segments.close()
+        return ""
+
+    def sentence_streamer(self) -> Optional[SentenceStreamer]:
+        if self.speaker is None:
+            return None
+        return SentenceStreamer(self.speaker.say)
+
+    def wait_until_spoken(self) -> None:
+        if self.speaker is not None:
+            self.speaker.wait()
+
+    def close(self) -> None:
+        if self.speaker is not None:
+            self.speaker.close()
+
+
+__all__ = [
+    "EnergyVAD",
+    "MicrophoneSource",
+    "SentenceStreamer",
+    "Speaker",
+    "Transcriber",
+    "VADConfig",
+    "VoicePipeline",
+    "WavFileSource",
+]
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.adapters import AdapterManager, AdapterStats
+from src.agent_core import AgentCore, AgentState
+from src.models import ModelSettings
+from src.tools import ToolContext, ToolRegistry
+
+
+def _greedy(monkeypatch: pytest.MonkeyPatch) -> None:
+    from src import models
+
+    original = models._generation_args
+    monkeypatch.setattr(models, "_generation_args", lambda settings: {**original(settings), "do_sample": False})
+
+
+def _build_adapter(base: Path, path: Path, seed: int) -> str:
+    import torch
+    from peft import LoraConfig, get_peft_model
+    from transformers import AutoModelForCausalLM
+
+    torch.manual_seed(seed)
+    model = get_peft_model(
+        AutoModelForCausalLM.from_pretrained(base),
+        LoraConfig(r=4, target_modules=["q_proj", "v_proj"], init_lora_weights=False),
+    )
+    for name, param in model.named_parameters():
+        if "lora_" in name:
+            param.data.mul_(50)  # make the adapter change greedy output on a random model
+    model.save_pretrained(path)
+    return str(path)
+
+
+def test_adapters_share_one_base_model(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("peft")
+    import torch
+
+    from src.bench import build_tiny_model
+    from src.models import generate_batch, generate_completion, get_adapter_manager, get_chat_pipeline
+
+    # Seeded so the random base model does not depend on which tests ran first.
+    torch.manual_seed(0)
+    base = build_tiny_model(tmp_path / "tiny")
+    coder = _build_adapter(base, tmp_path / "coder", seed=1)
+    planner = _build_adapter(base, tmp_path / "planner", seed=2)
+    settings = ModelSettings(model_id=str(base), device_map="cpu", max_new_tokens=32)
+    _greedy(monkeypatch)
+    messages = [{"role": "user", "content": "hello there"}]
+    pipe = get_chat_pipeline(settings)
+    base_params = {id(param) for param in pipe.model.parameters()}
+
+    plain = generate_completion(messages, settings=settings)
+    with_coder = generate_completion(messages, settings=settings, adapter=coder)
+    with_planner = generate_completion(messages, settings=settings, adapter=planner)
+
+    assert with_coder != plain and with_planner != with_coder
+    assert generate_completion(messages, settings=settings) == plain
+    assert get_chat_pipeline(settings) is pipe
+    assert base_params <= {id(param) for param in pipe.model.parameters()}
+
+    mixed = generate_batch([messages] * 3, settings=settings, adapters=[None, coder, planner])
+    assert mixed == [plain, with_coder, with_planner]
+
+    report = {stats.path: stats for stats in get_adapter_manager(settings).report()}
+    assert report[coder].parameter_bytes > 0 and report[coder].switches >= 1
+    assert report[coder].load_seconds > 0
+
+
+def test_agent_adapters_come_from_settings(tmp_path: Path) -> None:
+    calls = []
+
+    def completion(messages, settings=None, on_token=None, cancel=None, **kwargs):
+        calls.append(kwargs)
+        return "ok"
+
+    settings = ModelSettings(agent_adapters={"Coder": "adapters/coder"})
+    registry = ToolRegistry(default_context=ToolContext.build(base_path=tmp_path))
+    core = AgentCore(tool_registry=registry, model_settings=settings, base_path=tmp_path, completion_fn=completion)
+
+    core.process_turn("please debug this python code", state=AgentState())
+    core.process_turn("what is the capital of France", state=AgentState())
+
+    assert core.agent_lookup["Coder"].adapter == "adapters/coder"
+    assert calls == [{"adapter": "adapters/coder"}, {}]
+
+
+class _FakePeftModel:
+    def __init__(self) -> None:
+        self.base_model = self
+        self.active = None
+
+    def enable_adapter_layers(self) -> None:
+        pass
+
+    def disable_adapter_layers(self) -> None:
+        self.active = None
+
+    def set_adapter(self, name: str) -> None:
+        self.active = name
+
+
+def _fake_manager(*names: str) -> AdapterManager:
+    manager = AdapterManager(SimpleNamespace(model=_FakePeftModel()))
+    for name in names:
+        manager._names[name] = name
+        manager._stats[name] = AdapterStats(name=name, path=name)
+    return manager
+
+
+def test_requests_on_the_same_adapter_overlap() -> None:
+    manager = _fake_manager("coder", "planner")
+    both_inside = threading.Barrier(2, timeout=5)
+    events = []
+
+    def generate(adapter, label):
+        with manager.use(adapter):
+            events.append(f"{label} start {manager.pipe.model.active}")
+            if label in ("first", "second"):
+                both_inside.wait()  # fails unless both requests are in the scope at once
+            time.sleep(0.05)
+            events.append(f"{label} end")
+
+    threads = [threading.Thread(target=generate, args=("coder", label)) for label in ("first", "second")]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    # A different adapter waits for the running requests instead of switching under them.
+    threads.append(threading.Thread(target=generate, args=("planner", "other")))
+    threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+
+    assert not both_inside.broken
+    assert events.index("other start planner") > max(events.index("first end"), events.index("second end"))
+    assert manager._users == 0
+
+
+def test_plain_requests_share_the_base_model() -> None:
+    manager = _fake_manager("coder")
+    both_inside = threading.Barrier(2, timeout=5)
+
+    def generate():
+        with manager.use(None):
+            both_inside.wait()
+
+    threads = [threading.Thread(target=generate) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not both_inside.broken
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.admission import BATCH, INTERACTIVE, AdmissionController, OverloadedError, priority_scope
+from src.agent_core import AgentCore, AgentState
+from src.cancellation import CancellationToken
+from src.models import ModelSettings
+from src.tools import ToolContext, ToolRegistry
+from src.tools.todo import TODO_TOOL
+
+
+class _Gate:
+    """Completion function that blocks until released and records the order of calls."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def __call__(self, messages, settings=None, cancel=None, **kwargs):
+        self.calls.append((messages, settings, kwargs))
+        self.started.set()
+        self.release.wait(5)
+        return f"reply to {messages}"
+
+
+def _background(fn, *args, **kwargs) -> threading.Thread:
+    thread = threading.Thread(target=fn, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for_depth(controller: AdmissionController, depth: int) -> None:
+    deadline = time.monotonic() + 5
+    while controller.stats().queue_depth < depth:
+        assert time.monotonic() < deadline, "requests never queued"
+        time.sleep(0.005)
+
+
+def test_interactive_requests_are_served_before_batch() -> None:
+    controller = AdmissionController(ModelSettings(), concurrency=1, max_queue=4, slo_seconds=60)
+    gate = _Gate()
+    completion = controller.wrap_completion(gate)
+    batch_completion = controller.wrap_completion(gate, priority=BATCH)
+
+    threads = [_background(completion, "first")]
+    assert gate.started.wait(5)
+    threads.append(_background(batch_completion, "batch"))
+    _wait_for_depth(controller, 1)
+    threads.append(_background(completion, "chat"))
+    _wait_for_depth(controller, 2)
+    gate.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [call[0] for call in gate.calls] == ["first", "chat", "batch"]
+    stats = controller.stats()
+    assert stats.admitted == 3 and stats.queue_depth == 0 and stats.in_flight == 0
+    assert stats.peak_depth == 2
+
+
+def test_full_queue_sheds_batch_before_interactive() -> None:
+    controller = AdmissionController(ModelSettings(), concurrency=1, max_queue=1, slo_seconds=60)
+    gate = _Gate()
+    errors = []
+
+    def call(text: str, level: str) -> None:
+        try:
+            with priority_scope(level):
+                controller.wrap_completion(gate)(text)
+        except OverloadedError as exc:
+            errors.append((text, exc))
+
+    threads = [_background(call, "first", INTERACTIVE)]
+    assert gate.started.wait(5)
+    threads.append(_background(call, "batch", BATCH))
+    _wait_for_depth(controller, 1)
+    # The queue is full: the interactive request takes the batch request's place.
+    threads.append(_background(call, "chat", INTERACTIVE))
+    deadline = time.monotonic() + 5
+    while not errors and time.monotonic() < deadline:
+        time.sleep(0.005)
+    # Nothing lower-priority is left to evict, so this one is rejected outright.
+    call("late", INTERACTIVE)
+    gate.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [text for text, _ in errors] == ["batch", "late"]
+    assert all(exc.retry_after >= 60 for _, exc in errors)
+    assert [call[0] for call in gate.calls] == ["first", "chat"]
+    assert controller.stats().shed == {INTERACTIVE: 1, BATCH: 1}
+
+
+def test_slow_queue_degrades_tokens_then_model() -> None:
+    settings = ModelSettings(max_new_tokens=512)
+    controller = AdmissionController(
+        settings, concurrency=1, max_queue=4, slo_seconds=0.05, degraded_max_new_tokens=64, fallback_model_id="tiny"
+    )
+    gate = _Gate()
+    completion = controller.wrap_completion(gate)
+
+    first = _background(completion, "first", adapter="coder")
+    assert gate.started.wait(5)
+    second = _background(completion, "second", adapter="coder")
+    _wait_for_depth(controller, 1)
+    time.sleep(0.15)
+    gate.release.set()
+    first.join(5)
+    second.join(5)
+
+    (_, fresh, fresh_kwargs), (_, late, late_kwargs) = gate.calls
+    assert fresh.max_new_tokens == 512 and fresh_kwargs == {"adapter": "coder"}
+    assert late.max_new_tokens == 64
+    assert late.model_id == "tiny"
+    assert late_kwargs == {}
+    stats = controller.stats()
+    assert stats.degraded_tokens == 1 and stats.degraded_model == 1
+
+
+def test_predicted_wait_over_slo_rejects_batch_only() -> None:
+    controller = AdmissionController(ModelSettings(), concurrency=1, max_queue=8, slo_seconds=0.05)
+    with controller.admit():
+        time.sleep(0.1)
+    gate = _Gate()
+    thread = _background(controller.wrap_completion(gate), "slow")
+    assert gate.started.wait(5)
+
+    with pytest.raises(OverloadedError):
+        controller.wrap_batch(lambda conversations, **kwargs: ["x"])([[]])
+    waiter = _background(controller.wrap_completion(gate), "chat")
+    _wait_for_depth(controller, 1)
+    gate.release.set()
+    thread.join(5)
+    waiter.join(5)
+    assert [call[0] for call in gate.calls] == ["slow", "chat"]
+
+
+def test_cancel_while_queued_returns_empty_reply() -> None:
+    controller = AdmissionController(ModelSettings(), concurrency=1, max_queue=4, slo_seconds=60)
+    gate = _Gate()
+    completion = controller.wrap_completion(gate)
+    thread = _background(completion, "first")
+    assert gate.started.wait(5)
+
+    assert completion("queued", cancel=CancellationToken(timeout=0.1)) == ""
+    assert controller.stats().queue_depth == 0
+    gate.release.set()
+    thread.join(5)
+    assert [call[0] for call in gate.calls] == ["first"]
+
+
+def test_shed_turn_leaves_history_untouched(tmp_path: Path) -> None:
+    def overloaded(messages, settings=None, on_token=None, cancel=None):
+        raise OverloadedError("busy", retry_after=3.0)
+
+    registry = ToolRegistry(default_context=ToolContext.build(base_path=tmp_path))
+    core = AgentCore(tool_registry=registry, base_path=tmp_path, completion_fn=overloaded, fast_path=False)
+    state = AgentState()
+
+    with pytest.raises(OverloadedError):
+        core.process_turn("hello", state=state)
+    assert state.history == []
+
+
+def test_follow_up_shed_after_tool_keeps_tool_messages(tmp_path: Path) -> None:
+    replies = iter(['{"tool": "todo", "args": {"operation": "add", "title": "water plants"}}'])
+
+    def shed_follow_up(messages, settings=None, on_token=None, cancel=None):
+        try:
+            return next(replies)
+        except StopIteration:
+            raise OverloadedError("busy", retry_after=3.0) from None
+
+    registry = ToolRegistry([TODO_TOOL], default_context=ToolContext.build(base_path=tmp_path))
+    core = AgentCore(tool_registry=registry, base_path=tmp_path, completion_fn=shed_follow_up, fast_path=False)
+    state = AgentState()
+
+    turn = core.process_turn("remind me to water the plants", state=state)
+
+    assert turn.truncated and turn.tool_used == "todo" and "busy" in turn.text
+    assert "water plants" in turn.tool_output
+    assert [m.role for m in state.history] == ["user", "assistant", "tool"]
+
+
+def test_queued_batch_work_does_not_degrade_interactive_calls() -> None:
+    controller = AdmissionController(
+        ModelSettings(max_new_tokens=512), concurrency=1, max_queue=8, slo_seconds=1.0, degraded_max_new_tokens=64
+    )
+    with controller.admit():
+        time.sleep(0.45)  # one call takes ~0.45s, so two batch calls queued ahead would break the SLO
+    gate = _Gate()
+    batch = controller.wrap_completion(gate, priority=BATCH)
+    threads = [_background(batch, "running")]
+    assert gate.started.wait(5)
+    threads += [_background(batch, f"queued {index}") for index in range(2)]
+    _wait_for_depth(controller, 2)
+    threads.append(_background(controller.wrap_completion(gate), "chat"))
+    _wait_for_depth(controller, 3)
+    gate.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    calls = {call[0]: call[1] for call in gate.calls}
+    assert list(calls) == ["running", "chat", "queued 0", "queued 1"]
+    assert calls["chat"].max_new_tokens == 512
+    assert controller.stats().degraded_tokens == 0
+
+
+def test_zero_queue_admits_while_a_slot_is_free() -> None:
+    controller = AdmissionController(ModelSettings(), concurrency=1, max_queue=0, slo_seconds=60)
+    gate = _Gate()
+    thread = _background(controller.wrap_completion(gate), "first")
+    assert gate.started.wait(5)
+
+    with pytest.raises(OverloadedError, match="queue full at 0"):
+        controller.wrap_completion(gate)("second")
+    gate.release.set()
+    thread.join(5)
+    assert controller.wrap_completion(gate)("third") == "reply to third"
+    assert [call[0] for call in gate.calls] == ["first", "third"]
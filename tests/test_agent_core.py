@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from src import agent_core as agent_core_module
+from src.agent_core import AgentCore, AgentState
+from src.cancellation import CancelledError
+from src.memory import ConversationMemory
+from src.tools import ToolContext, ToolRegistry, ToolSpec
+from src.tools.results import READ_RESULT_TOOL
+from src.tools.todo import TODO_TOOL
+
+
+class _NoArgs(BaseModel):
+    pass
+
+
+def _core(tmp_path: Path, **kwargs) -> AgentCore:
+    registry = ToolRegistry(default_context=ToolContext.build(base_path=tmp_path))
+    return AgentCore(tool_registry=registry, base_path=tmp_path, **kwargs)
+
+
+def test_fan_out_uses_one_batched_generation(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    batches = []
+
+    def fake_batch(conversations, settings=None, cancel=None):
+        batches.append(conversations)
+        return ["Shared context.\n\nResearch notes.", "Shared context.\n\n1. Step one."]
+
+    monkeypatch.setattr(agent_core_module, "generate_batch", fake_batch)
+    core = _core(tmp_path, fan_out_agents=["Researcher", "Planner"])
+    state = AgentState()
+
+    turn = core.process_turn("plan my week", state=state)
+
+    assert len(batches) == 1
+    researcher, planner = batches[0]
+    assert researcher[1:] == planner[1:]
+    assert researcher[0]["content"] != planner[0]["content"]
+    assert turn.agent == "Researcher+Planner"
+    assert [c.agent for c in turn.contributions] == ["Researcher", "Planner"]
+    assert turn.text.count("Shared context.") == 1
+    assert "Research notes." in turn.text and "1. Step one." in turn.text
+    assert [m.role for m in state.history] == ["user", "assistant"]
+
+
+def test_fan_out_reports_every_tool_and_batch_time(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    first = [
+        '{"tool": "todo", "args": {"operation": "add", "title": "water plants"}}',
+        '{"tool": "todo", "args": {"operation": "list"}}',
+    ]
+    replies = iter([first, ["Added.", "Listed."]])
+
+    def fake_batch(conversations, settings=None, cancel=None):
+        return next(replies)
+
+    monkeypatch.setattr(agent_core_module, "generate_batch", fake_batch)
+    core = _core(tmp_path, fan_out_agents=["Researcher", "Planner"])
+    core.tool_registry.register(TODO_TOOL)
+
+    turn = core.process_turn("plan my week", state=AgentState())
+
+    assert turn.tool_used == "todo+todo"
+    assert "**Researcher** (todo)" in turn.tool_output and "**Planner** (todo)" in turn.tool_output
+    researcher, planner = turn.contributions
+    # Both agents shared the same batched passes; only tool time is their own.
+    assert researcher.batch_seconds == planner.batch_seconds
+    assert researcher.tool_seconds > 0 and planner.tool_seconds > 0
+
+
+def test_fan_out_rejects_unknown_agents(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        _core(tmp_path, fan_out_agents=["Researcher", "Nobody"])
+
+
+def test_turn_deadline_returns_partial_text(tmp_path: Path) -> None:
+    def slow_completion(messages, settings=None, on_token=None, cancel=None):
+        words = []
+        while not cancel.cancelled:
+            words.append("word")
+            time.sleep(0.01)
+        return " ".join(words)
+
+    core = _core(tmp_path, completion_fn=slow_completion, turn_timeout=0.1)
+    state = AgentState()
+
+    turn = core.process_turn("explain everything", state=state)
+
+    assert turn.truncated
+    assert turn.text.startswith("word")
+    assert state.history[-1].content == turn.text
+
+
+def test_cancel_during_tool_answers_the_tool_request(tmp_path: Path) -> None:
+    class _SlowTool(BaseModel):
+        pass
+
+    def wait_for_cancel(params: _SlowTool, context: ToolContext) -> str:
+        # Stands in for a worker call abandoned when the turn deadline passes.
+        time.sleep(0.3)
+        raise CancelledError("deadline exceeded")
+
+    def completion(messages, settings=None, on_token=None, cancel=None):
+        return '{"tool": "slow", "args": {}}'
+
+    core = _core(tmp_path, completion_fn=completion, turn_timeout=0.2, fast_path=False)
+    core.tool_registry.register(
+        ToolSpec(name="slow", description="Sleeps.", input_model=_SlowTool, handler=wait_for_cancel)
+    )
+    state = AgentState()
+
+    turn = core.process_turn("run the slow tool", state=state)
+
+    assert turn.truncated
+    assert [m.role for m in state.history] == ["user", "assistant", "tool"]
+    assert state.history[-1].content == "(cancelled: deadline exceeded)"
+
+
+def test_memory_recalls_earlier_session(tmp_path: Path) -> None:
+    prompts = []
+
+    def completion(messages, settings=None, on_token=None, cancel=None):
+        prompts.append(messages[0]["content"])
+        return "Noted."
+
+    memory = ConversationMemory(tmp_path / "memory")
+    memory.remember("My cat is called Biscuit.", "What a lovely name for a cat!")
+    memory.flush()
+    core = _core(tmp_path, completion_fn=completion, memory=memory)
+
+    core.process_turn("What is my cat called?", state=AgentState())
+    memory.flush()
+
+    assert "Biscuit" in prompts[0]
+    assert len(memory) == 2
+    memory.close()
+
+
+def test_large_tool_output_is_stored_behind_a_handle(tmp_path: Path) -> None:
+    big_output = "\n".join(f"row {index}: " + "x" * 40 for index in range(400))
+    registry = ToolRegistry(
+        [ToolSpec("dump", "Dump rows.", _NoArgs, lambda params, context: big_output)],
+        default_context=ToolContext.build(base_path=tmp_path),
+    )
+    registry.register(READ_RESULT_TOOL)
+    prompts = []
+    replies = iter(['{"tool": "dump", "args": {}}', "Here are the rows."])
+
+    def completion(messages, settings=None, on_token=None, cancel=None):
+        prompts.append(messages)
+        return next(replies)
+
+    core = AgentCore(tool_registry=registry, base_path=tmp_path, completion_fn=completion)
+    state = AgentState()
+    turn = core.process_turn("dump the rows", state=state)
+
+    assert turn.tool_output == big_output and turn.tool_handle
+    tool_message = prompts[1][-1]["content"]
+    assert len(tool_message) < 1500 and turn.tool_handle in tool_message
+    assert registry.call("read_result", {"handle": turn.tool_handle, "start_line": 400}, registry.default_context).startswith(
+        "row 399:"
+    )
+
+
+def test_fast_path_answers_unambiguous_tool_intents(tmp_path: Path) -> None:
+    registry = ToolRegistry([TODO_TOOL], default_context=ToolContext.build(base_path=tmp_path))
+    prompts = []
+
+    def completion(messages, settings=None, on_token=None, cancel=None):
+        prompts.append(messages)
+        return "Start with the overdue ones."
+
+    core = AgentCore(tool_registry=registry, base_path=tmp_path, completion_fn=completion, fast_path_side_effects=True)
+    state = AgentState()
+
+    added = core.process_turn("Add todo: buy milk, please!", state=state)
+    done = core.process_turn("mark todo 1 as done", state=state)
+    listed = core.process_turn("show me my todos", state=state)
+    advice = core.process_turn("which tasks should I tackle first?", state=state)
+
+    assert added.fast_path and added.text == "Added todo #1: buy milk"
+    assert done.fast_path and "#1" in done.text
+    assert listed.fast_path and listed.text.startswith("Here is your todo list:") and "✅ #1 buy milk" in listed.text
+    assert not advice.fast_path and len(prompts) == 1
+    assert [m.role for m in state.history[:3]] == ["user", "tool", "assistant"]
+    stats = core.intent_router.stats
+    assert (stats.hits, stats.attempts) == (3, 4)
+
+
+def test_fast_path_falls_back_when_slots_are_invalid(tmp_path: Path) -> None:
+    registry = ToolRegistry([TODO_TOOL], default_context=ToolContext.build(base_path=tmp_path))
+    core = AgentCore(
+        tool_registry=registry,
+        base_path=tmp_path,
+        completion_fn=lambda messages, **kwargs: "No such todo.",
+        fast_path_side_effects=True,
+    )
+
+    turn = core.process_turn("mark todo 99 done", state=AgentState())
+
+    assert not turn.fast_path and turn.text == "No such todo."
+
+
+def test_fast_path_leaves_side_effects_to_the_model_by_default(tmp_path: Path) -> None:
+    registry = ToolRegistry([TODO_TOOL], default_context=ToolContext.build(base_path=tmp_path))
+    core = AgentCore(tool_registry=registry, base_path=tmp_path, completion_fn=lambda messages, **kwargs: "Sure.")
+    state = AgentState()
+
+    added = core.process_turn("add todo: buy milk", state=state)
+    listed = core.process_turn("list my todos", state=state)
+
+    assert not added.fast_path and added.text == "Sure."
+    assert listed.fast_path and "buy milk" not in listed.text
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from src.bench import BenchResult, recommend, write_report
+
+
+def _result(dtype: str, threads: int, batch_size: int, decode: float, total: float) -> BenchResult:
+    return BenchResult(
+        dtype=dtype,
+        threads=threads,
+        batch_size=batch_size,
+        prompt_length=128,
+        max_new_tokens=32,
+        load_seconds=1.0,
+        ttft_seconds=0.1,
+        decode_tokens_per_second=decode,
+        total_tokens_per_second=total,
+        peak_rss_mb=100.0,
+    )
+
+
+def test_recommend_prefers_fastest_single_request_layout(tmp_path: Path) -> None:
+    results = [
+        _result("float32", 4, 1, 20.0, 18.0),
+        _result("float32", 4, 4, 60.0, 55.0),
+        _result("bfloat16", 8, 1, 30.0, 28.0),
+        _result("bfloat16", 8, 4, 50.0, 45.0),
+    ]
+    recommended = recommend(results)
+    assert (recommended["dtype"], recommended["threads"]) == ("bfloat16", 8)
+    assert recommended["throughput_batch_size"] == 4
+    assert recommended["env"]["SMOLMIND_DTYPE"] == "bfloat16"
+
+    report = tmp_path / "report.json"
+    write_report(results, recommended, report)
+    assert len(json.loads(report.read_text())["results"]) == 4
+    write_report(results, recommended, tmp_path / "report.csv")
+    assert (tmp_path / "report.csv").read_text().startswith("dtype,threads")
+
+
+def test_sweep_on_tiny_local_model(tmp_path: Path) -> None:
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from src.bench import build_tiny_model, run_sweep
+    from src.models import ModelSettings
+
+    model_dir = build_tiny_model(tmp_path / "tiny")
+    settings = ModelSettings(model_id=str(model_dir), device_map="cpu")
+    results = run_sweep(settings, ["float32"], threads=[1], batch_sizes=[1, 2], prompt_lengths=[16], max_new_tokens=[8])
+
+    assert len(results) == 2
+    assert all(row.decode_tokens_per_second > 0 and row.ttft_seconds > 0 for row in results)
+    assert all(row.peak_rss_mb > 0 and row.rss_delta_mb >= 0 for row in results)
+
+
+def test_rss_sampler_sees_a_transient_peak() -> None:
+    from src.bench import _RssSampler
+
+    with _RssSampler() as rss:
+        block = b"x" * (64 * 2**20)
+        time.sleep(0.05)
+        del block
+    assert rss.peak_mb - rss.baseline_mb > 32
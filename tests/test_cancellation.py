@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from src.cancellation import CancellationToken, CancelledError
+
+
+def test_deadline_and_parent_cancellation() -> None:
+    token = CancellationToken(timeout=0.05)
+    assert not token.cancelled
+    time.sleep(0.06)
+    assert token.cancelled
+    assert token.reason == "deadline exceeded"
+    with pytest.raises(CancelledError):
+        token.raise_if_cancelled()
+
+    parent = CancellationToken()
+    child = CancellationToken(timeout=60, parent=parent)
+    fired = []
+    child.add_callback(lambda: fired.append(True))
+    parent.cancel("interrupted")
+    assert child.cancelled and child.reason == "interrupted"
+    assert fired == [True]
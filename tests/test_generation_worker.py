@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from src.agent_core import AgentState, AgentTurn
+from src.generation_worker import GenerationWorker, QueueFullError
+
+
+class _FakeCore:
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def process_turn(self, user_text, state=None, on_token=None, cancel=None):
+        state.history.append(user_text)  # type: ignore[arg-type]
+        for word in ("hello ", "there"):
+            on_token(word)
+        self.release.wait(5)
+        return AgentTurn(agent="Researcher", text="hello there")
+
+
+def test_jobs_stream_tokens_and_report_queue_position() -> None:
+    core = _FakeCore()
+    worker = GenerationWorker(core, max_queue=1)
+    try:
+        first_state, second_state = AgentState(), AgentState()
+        first = worker.submit("one", first_state)
+        while not first.started:
+            time.sleep(0.01)
+        second = worker.submit("two", second_state)
+        assert worker.position(second) == 1
+        with pytest.raises(QueueFullError):
+            worker.submit("three", AgentState())
+
+        core.release.set()
+        assert first.wait(5) and second.wait(5)
+        assert first.text == "hello there"
+        assert first.turn.text == "hello there"
+        assert worker.position(second) == 0
+        assert len(first_state.history) == len(second_state.history) == 1
+    finally:
+        worker.stop()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from src.memory import ConversationMemory, HashingEmbedder, MemoryRecord
+
+
+def test_recall_ranks_relevant_turns(tmp_path: Path) -> None:
+    memory = ConversationMemory(tmp_path)
+    memory.remember("Where did I park the car?", "Level 3 of the station garage.")
+    memory.remember("Recommend a pasta recipe", "Try cacio e pepe with pecorino.")
+    memory.remember("What time is the dentist?", "Thursday at 9am.")
+    memory.flush()
+
+    records = memory.recall("which garage level is my car parked on", k=2)
+
+    assert records[0].assistant == "Level 3 of the station garage."
+    assert all(record.score >= 0.15 for record in records)
+    assert memory.recall("garage car", exclude_recent=3) == []
+    memory.close()
+
+
+def test_store_is_append_only_and_reloads(tmp_path: Path) -> None:
+    memory = ConversationMemory(tmp_path)
+    memory.remember("favourite colour?", "Teal.")
+    memory.flush()
+    memory.close()
+    vector_bytes = (tmp_path / "vectors.f16").stat().st_size
+    # Simulate a crash that tore the final write.
+    with (tmp_path / "vectors.f16").open("ab") as handle:
+        handle.write(b"\x00\x01")
+
+    reopened = ConversationMemory(tmp_path)
+
+    assert len(reopened) == 1
+    assert (tmp_path / "vectors.f16").stat().st_size == vector_bytes == 256 * 2
+    assert reopened.recall("colour")[0].assistant == "Teal."
+    reopened.close()
+
+
+def test_recall_respects_token_budget(tmp_path: Path) -> None:
+    memory = ConversationMemory(tmp_path)
+    memory.remember("tell me about tea", "tea " * 400)
+    memory.remember("short tea fact", "Tea comes from Camellia sinensis.")
+    memory.flush()
+
+    records = memory.recall("tea", k=2, token_budget=64)
+
+    assert [record.user for record in records] == ["short tea fact"]
+    memory.close()
+
+
+def test_recall_over_large_histories(tmp_path: Path) -> None:
+    memory = ConversationMemory(tmp_path, embedder=HashingEmbedder())
+    # Populate the in-memory index directly; embedding 20k turns would only slow the test down.
+    rng = np.random.default_rng(0)
+    rows = rng.standard_normal((20_000, 256)).astype(np.float32)
+    memory._add_rows(
+        rows / np.linalg.norm(rows, axis=1, keepdims=True),
+        [MemoryRecord(id=i, user=f"u{i}", assistant="a") for i in range(20_000)],
+    )
+
+    records = memory.recall("anything about the garden", k=5, token_budget=10_000, min_score=-1.0)
+    assert len(records) == 5
+    assert all(first.score >= second.score for first, second in zip(records, records[1:]))
+    memory.close()
+
+
+def test_appends_grow_the_index_in_place(tmp_path: Path) -> None:
+    memory = ConversationMemory(tmp_path)
+    for index in range(100):
+        memory.remember(f"question {index}", f"answer {index}")
+    memory.flush()
+
+    assert len(memory) == 100
+    assert len(memory._matrix) == 128  # capacity doubles instead of copying on every append
+    assert memory.recall("question 42", k=1)[0].assistant == "answer 42"
+    memory.close()
+
+
+def _remember_many(root: str, prefix: str, count: int) -> None:
+    memory = ConversationMemory(Path(root))
+    for index in range(count):
+        memory.remember(f"{prefix} question {index}", f"{prefix} answer {index}")
+    memory.flush()
+    memory.close()
+
+
+def test_processes_can_share_one_store(tmp_path: Path) -> None:
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_remember_many, args=(str(tmp_path), name, 25)) for name in ("alpha", "beta")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    memory = ConversationMemory(tmp_path)
+    assert len(memory) == 50
+    assert sorted(record.id for record in memory._records) == list(range(50))
+    assert memory.recall("beta question 7", k=1)[0].assistant == "beta answer 7"
+    # A store that was already open picks up rows appended by others before writing its own.
+    other = ConversationMemory(tmp_path)
+    memory.remember("gamma question", "gamma answer")
+    memory.flush()
+    other.remember("delta question", "delta answer")
+    other.flush()
+    assert len(other) == 52 and other._records[-1].id == 51
+    memory.close()
+    other.close()
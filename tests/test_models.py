@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from src import models
+from src.models import GenerationStats, ModelSettings, _batch_replies, _enable_compiled_generation, generate_completion
+
+
+class _FakeTokenizer:
+    eos_token_id = 0
+
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": [1] * len(text.split())}
+
+    def decode(self, ids):
+        return " ".join("hello" for _ in ids)
+
+
+class _FailingPipe:
+    def __init__(self) -> None:
+        self.model = SimpleNamespace(
+            forward=lambda *args, **kwargs: None,
+            generation_config=SimpleNamespace(cache_implementation=None),
+        )
+        self.tokenizer = _FakeTokenizer()
+
+    def __call__(self, *args, **kwargs):
+        raise RuntimeError("compilation exploded")
+
+
+def test_compiled_generation_falls_back_to_eager() -> None:
+    pipe = _FailingPipe()
+    original_forward = pipe.model.forward
+
+    stats = _enable_compiled_generation(pipe, (16, 64))
+
+    assert not stats.compiled
+    assert stats.fallback_reason
+    assert pipe.model.forward is original_forward
+    assert pipe.model.generation_config.cache_implementation is None
+
+
+def test_generation_stats_tokens_per_second() -> None:
+    stats = GenerationStats()
+    assert stats.tokens_per_second == 0.0
+    stats.record(50, 2.0)
+    stats.record(50, 2.0)
+    assert stats.tokens_per_second == 25.0
+
+
+def test_settings_read_smolmind_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SMOLMIND_MAX_NEW_TOKENS", "77")
+    monkeypatch.setenv("SMOLMIND_DEVICE", "cpu")
+    settings = ModelSettings()
+    assert settings.max_new_tokens == 77
+    assert settings.device_map == "cpu"
+    # Field names keep working for programmatic construction.
+    assert ModelSettings(max_new_tokens=64).max_new_tokens == 64
+
+
+class _PaddingTokenizer:
+    eos_token = "</s>"
+
+    def __init__(self) -> None:
+        self.padding_side = "right"
+        self.pad_token = None
+
+    @property
+    def pad_token_id(self):
+        return None if self.pad_token is None else 0
+
+
+class _RecordingPipe:
+    def __init__(self) -> None:
+        self.tokenizer = _PaddingTokenizer()
+        self.seen = []
+
+    def __call__(self, prompts, batch_size=1, **kwargs):
+        self.seen.append((self.tokenizer.padding_side, self.tokenizer.pad_token))
+        return [[{"generated_text": f"reply {index}"}] for index in range(len(prompts))]
+
+
+def test_batch_left_pads_without_mutating_shared_tokenizer() -> None:
+    pipe = _RecordingPipe()
+    conversations = [[{"role": "user", "content": "hi"}]] * 2
+
+    assert _batch_replies(pipe, conversations, ModelSettings(), None) == ["reply 0", "reply 1"]
+    assert pipe.seen == [("left", "</s>")]
+    assert pipe.tokenizer.padding_side == "right"
+    assert pipe.tokenizer.pad_token is None
+
+
+class _OverflowingPipe(_FailingPipe):
+    """Compiled pipeline whose first call after warm-up overflows the static cache."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.model.forward = lambda *args, **kwargs: "compiled"
+        self.model.generation_config.cache_implementation = "static"
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.model.generation_config.cache_implementation == "static":
+            raise IndexError("static cache is full")
+        return [{"generated_text": "eager reply"}]
+
+
+def test_generation_failure_after_warmup_drops_to_eager(monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = ModelSettings(compile=True)
+    pipe = _OverflowingPipe()
+    eager_forward = lambda *args, **kwargs: "eager"  # noqa: E731
+    stats = GenerationStats(compiled=True, _eager_forward=eager_forward, _eager_cache=None)
+    monkeypatch.setattr(models, "get_chat_pipeline", lambda settings=None: pipe)
+    monkeypatch.setitem(models._GENERATION_STATS, models._pipeline_key(settings), stats)
+
+    reply = generate_completion([{"role": "user", "content": "a very long prompt"}], settings=settings)
+
+    assert reply == "eager reply"
+    assert pipe.calls == 2
+    assert pipe.model.forward is eager_forward
+    assert pipe.model.generation_config.cache_implementation is None
+    assert not stats.compiled and "static cache is full" in stats.fallback_reason
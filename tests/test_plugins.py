@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+from src.tools import ToolContext, load_default_tools
+from src.tools.plugins import LazyToolSpec, discover_tools
+
+PLUGIN_SOURCE = '''
+from pydantic import BaseModel
+
+from src.tools import ToolSpec
+
+IMPORTED = True
+
+
+class EchoInput(BaseModel):
+    text: str
+
+
+ECHO_TOOL = ToolSpec(
+    name="echo",
+    description="Echo text back.",
+    input_model=EchoInput,
+    handler=lambda params, context: params.text,
+)
+'''
+
+
+def _write_plugin(tmp_path: Path, module_name: str) -> ToolContext:
+    (tmp_path / f"{module_name}.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+    sys.path.insert(0, str(tmp_path))
+    context = ToolContext.build(base_path=tmp_path)
+    (context.data_dir / "tools.json").write_text(
+        json.dumps({"plugins": {"echo": f"{module_name}:ECHO_TOOL"}, "disabled": ["safe_shell"]}),
+        encoding="utf-8",
+    )
+    return context
+
+
+def test_default_tools_are_registered(tmp_path: Path) -> None:
+    registry = load_default_tools(base_path=tmp_path)
+    assert {"summarize_file", "summarize_tree", "todo", "safe_shell", "read_result"} <= set(registry.names())
+    assert registry.default_context is not None
+    assert "properties" in registry.schemas()["todo"]
+
+
+def test_config_plugin_is_imported_only_on_first_call(tmp_path: Path) -> None:
+    module_name = "smolmind_echo_plugin"
+    try:
+        context = _write_plugin(tmp_path, module_name)
+        discover_tools(context)  # populate the metadata cache
+        sys.modules.pop(module_name, None)
+
+        tools = {tool.name: tool for tool in discover_tools(context)}
+        assert "safe_shell" not in tools
+        echo = tools["echo"]
+        assert isinstance(echo, LazyToolSpec)
+        assert echo.description == "Echo text back."
+        assert module_name not in sys.modules
+
+        assert echo.run({"text": "hi"}, context) == "hi"
+        assert module_name in sys.modules
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop(module_name, None)
+
+
+def test_cache_hit_does_not_import_plugin_package(tmp_path: Path) -> None:
+    package = tmp_path / "smolmind_echo_pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("IMPORTED = True\n", encoding="utf-8")
+    (package / "echo.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        context = ToolContext.build(base_path=tmp_path)
+        (context.data_dir / "tools.json").write_text(
+            json.dumps({"plugins": {"echo": "smolmind_echo_pkg.echo:ECHO_TOOL"}}), encoding="utf-8"
+        )
+        discover_tools(context)
+        for name in ("smolmind_echo_pkg", "smolmind_echo_pkg.echo"):
+            sys.modules.pop(name, None)
+
+        tools = {tool.name: tool for tool in discover_tools(context)}
+        assert not tools["echo"].loaded
+        assert "smolmind_echo_pkg" not in sys.modules
+
+        # Editing the module invalidates its cached metadata.
+        (package / "echo.py").write_text(PLUGIN_SOURCE.replace("Echo text back.", "Echo it."), encoding="utf-8")
+        assert {tool.name: tool for tool in discover_tools(context)}["echo"].description == "Echo it."
+    finally:
+        sys.path.remove(str(tmp_path))
+        for name in ("smolmind_echo_pkg", "smolmind_echo_pkg.echo"):
+            sys.modules.pop(name, None)
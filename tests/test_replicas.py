@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from src.replicas import ReplicaPool, parse_cpulist, plan_layout
+
+
+def _echo_completion(messages, settings=None, on_token=None, cancel=None):
+    time.sleep(0.05)  # keep requests in flight long enough for routing to see the load
+    text = f"{os.getpid()}:{messages[-1]['content']}"
+    if on_token is not None:
+        on_token(text)
+    return text
+
+
+def _parent_pid(messages, settings=None, on_token=None, cancel=None):
+    return str(os.getppid())
+
+
+def _broken_send(message):
+    raise BrokenPipeError("pipe closed")
+
+
+def test_parse_cpulist() -> None:
+    assert parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+
+
+def test_plan_layout_spreads_replicas_across_nodes() -> None:
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert plan_layout(2, nodes=nodes) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert plan_layout(4, threads_per_replica=2, nodes=nodes) == [[0, 1], [4, 5], [2, 3], [6, 7]]
+    with pytest.raises(ValueError):
+        plan_layout(0, nodes=nodes)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_pool_routes_to_least_loaded_replica() -> None:
+    pool = ReplicaPool(replicas=2, threads_per_replica=1, completion_fn=_echo_completion).start()
+    try:
+        futures = [pool.submit([{"role": "user", "content": str(index)}]) for index in range(4)]
+        results = [future.result(timeout=10) for future in futures]
+        assert [result.text.split(":")[1] for result in results] == ["0", "1", "2", "3"]
+        assert {result.replica for result in results} == {0, 1}
+
+        streamed = []
+        text = pool.generate_completion([{"role": "user", "content": "hi"}], on_token=streamed.append)
+        assert streamed == [text]
+        assert pool.loads() == [0, 0]
+
+        # A fan-out batch stays together on one replica.
+        replies = pool.generate_batch([[{"role": "user", "content": "a"}], [{"role": "user", "content": "b"}]])
+        assert [reply.split(":")[1] for reply in replies] == ["a", "b"]
+        assert len({reply.split(":")[0] for reply in replies}) == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_replicas_are_not_forked_from_the_serving_process() -> None:
+    with pytest.raises(ValueError):
+        ReplicaPool(replicas=1, start_method="fork")
+    pool = ReplicaPool(replicas=2, threads_per_replica=1, completion_fn=_parent_pid).start()
+    try:
+        parents = {pool.generate_completion([{"role": "user", "content": "x"}]) for _ in range(4)}
+        assert len(parents) == 1
+        assert parents != {str(os.getpid())}
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_dead_replica_is_no_longer_routed_to() -> None:
+    pool = ReplicaPool(replicas=2, threads_per_replica=1, completion_fn=_echo_completion).start()
+    try:
+        dead, survivor = pool._replicas  # pylint: disable=protected-access
+        os.kill(dead.pid, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        while dead.alive and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.live_replicas() == [survivor.index]
+
+        for index in range(3):
+            assert pool.generate_completion([{"role": "user", "content": str(index)}]).startswith(f"{survivor.pid}:")
+        assert pool.loads() == [0, 0]
+
+        os.kill(survivor.pid, signal.SIGKILL)
+        survivor.reader.join(10)
+        with pytest.raises(RuntimeError, match="No live model replicas"):
+            pool.generate_completion([{"role": "user", "content": "late"}])
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_failed_send_releases_the_request() -> None:
+    pool = ReplicaPool(replicas=2, threads_per_replica=1, completion_fn=_echo_completion).start()
+    try:
+        broken, survivor = pool._replicas  # pylint: disable=protected-access
+        # Break the pipe from this side before the reader notices anything.
+        broken.conn.send = _broken_send
+        try:
+            assert pool.generate_completion([{"role": "user", "content": "x"}]).startswith(f"{survivor.pid}:")
+        finally:
+            del broken.conn.send  # let shutdown() stop the replica normally
+        assert not broken.alive and broken.load == 0
+        assert pool.loads() == [0, 0]
+    finally:
+        pool.shutdown()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from src import summarize as summarize_module
+from src.models import ModelSettings
+from src.summarize import ChunkSummaryCache, MapReduceSummarizer, chunk_text
+from src.tools.files import SummarizeFileInput
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def _document(sections: int) -> str:
+    return "\n\n".join(f"Section {index} " + "word " * 40 + "end." for index in range(sections))
+
+
+class _FakeBatch:
+    def __init__(self) -> None:
+        self.batches = []
+
+    def __call__(self, conversations, settings=None, cancel=None):
+        self.batches.append(conversations)
+        return [f"summary of: {messages[1]['content'].split()[0:2]}" for messages in conversations]
+
+
+def _summarizer(tmp_path: Path, fake: _FakeBatch) -> MapReduceSummarizer:
+    return MapReduceSummarizer(
+        ChunkSummaryCache(tmp_path / "cache"),
+        settings=ModelSettings(model_id="fake"),
+        chunk_tokens=100,
+        batch_size=3,
+        summary_tokens=32,
+        count_tokens=_words,
+        generate_fn=fake,
+    )
+
+
+def test_chunk_text_respects_token_budget() -> None:
+    long_paragraph = " ".join(f"Sentence {index} has five words." for index in range(60))
+    chunks = chunk_text(_document(5) + "\n\n" + long_paragraph, _words, chunk_tokens=100)
+
+    assert all(_words(chunk) <= 100 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join((_document(5) + " " + long_paragraph).split())
+
+
+def test_chunk_text_splits_text_without_paragraphs_or_sentences() -> None:
+    log = "\n".join(f"12:00:{index % 60:02d} INFO worker {index % 7} processed job {index}" for index in range(3000))
+    chunks = chunk_text(log, _words, chunk_tokens=100)
+
+    assert len(chunks) > 1 and all(_words(chunk) <= 100 for chunk in chunks)
+    assert "\n".join(chunks).split() == log.split()
+
+    def chars(text: str) -> int:
+        return (len(text) + 3) // 4
+
+    row = ",".join(str(index) for index in range(2000))
+    windows = chunk_text(row, chars, chunk_tokens=100)
+    assert len(windows) > 1 and all(chars(window) <= 100 for window in windows)
+    assert "".join(windows) == row
+
+
+def test_map_reduce_batches_and_reduces_hierarchically(tmp_path: Path) -> None:
+    fake = _FakeBatch()
+    events = []
+
+    report = _summarizer(tmp_path, fake).summarise(_document(12), progress=lambda *event: events.append(event))
+
+    assert report.chunks == 6
+    assert report.reduce_rounds >= 1 and report.summary.startswith("summary of")
+    assert all(len(batch) <= 3 for batch in fake.batches)
+    assert [len(batch) for batch in fake.batches][:2] == [3, 3]
+    assert events[0] == ("map", 0, 6) and ("map", 6, 6) in events
+    assert events[-1][0] == "reduce" and events[-1][1] == events[-1][2] == 1
+
+
+def test_edited_file_only_regenerates_changed_chunks(tmp_path: Path) -> None:
+    document = _document(12)
+    first = _summarizer(tmp_path, _FakeBatch()).summarise(document)
+
+    edited = document.replace("Section 11 word", "Section 11 changed")
+    fake = _FakeBatch()
+    second = _summarizer(tmp_path, fake).summarise(edited)
+
+    map_calls = sum(1 for batch in fake.batches for messages in batch if "parts of one" not in messages[0]["content"])
+    assert first.generated > second.generated
+    assert map_calls == 1
+    assert second.cached >= first.chunks - 1
+
+
+def test_summarize_file_rejects_unknown_mode() -> None:
+    with pytest.raises(ValidationError):
+        SummarizeFileInput(path="notes.md", mode="poetic")
+
+
+def test_installed_batch_fn_generates_summaries(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake = _FakeBatch()
+    # Only the tokenizer is loaded for counting, never the model.
+    monkeypatch.setattr(
+        summarize_module, "get_tokenizer", lambda settings: lambda text, add_special_tokens: {"input_ids": text.split()}
+    )
+    monkeypatch.setattr(summarize_module, "generate_batch", lambda *args, **kwargs: pytest.fail("in-process model"))
+    summarize_module.install_batch_fn(fake)
+    try:
+        summarizer = MapReduceSummarizer(
+            ChunkSummaryCache(tmp_path / "cache"), settings=ModelSettings(model_id="fake")
+        )
+        assert summarizer.count_tokens("three small words") == 3
+        report = summarizer.summarise(_document(3))
+    finally:
+        summarize_module.install_batch_fn(None)
+
+    assert report.generated >= 1 and fake.batches
+    assert summarize_module._default_generate_fn() is summarize_module.generate_batch
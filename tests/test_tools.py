@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
 
 import pytest
 
-from src.tools import ToolContext
-from src.tools.files import SummarizeFileInput, summarize_file
+from src.tools import IntentPattern, ToolContext, ToolRegistry, ToolSpec
+from src.tools.files import SUMMARIZE_FILE_TOOL, SummarizeFileInput, summarize_file
+from src.tools.intents import IntentRouter
+from src.tools.results import ReadResultInput, ResultStore, preview, read_result
+from src.tools.tree import SummarizeTreeInput, summarize_tree
 from src.tools.shell import SAFE_COMMAND_WHITELIST, SafeShellInput, safe_shell
-from src.tools.todo import TodoInput, todo_manager
+from src.tools.todo import TODO_TOOL, TodoInput, TodoStore, todo_manager
 
 
 def test_summarize_file(tmp_path: Path) -> None:
@@ -31,12 +35,64 @@ def test_todo_add_and_list(tmp_path: Path) -> None:
     listing = todo_manager(list_payload, context)
     assert "Write tests" in listing
 
-    todo_id = json.loads((context.data_dir / "todo.json").read_text())[0]["id"]
+    todo_id = TodoStore(context.data_dir / "todo.db").list()[0].id
     done_payload = TodoInput(operation="complete", todo_id=todo_id)
     done_response = todo_manager(done_payload, context)
     assert "Marked todo" in done_response
 
 
+def test_todo_list_filters_and_pagination(tmp_path: Path) -> None:
+    context = ToolContext.build(base_path=tmp_path)
+    store = TodoStore(context.data_dir / "todo.db")
+    for index in range(5):
+        store.add(f"item {index}")
+    store.complete(2)
+
+    assert [entry.id for entry in store.list(completed=True)] == [2]
+    assert [entry.id for entry in store.list(completed=False, limit=2, offset=1)] == [3, 4]
+    assert store.count() == 5
+
+    listing = todo_manager(TodoInput(operation="list", status="open", limit=2), context)
+    assert "showing 1-2 of 4" in listing
+
+
+def test_todo_migrates_legacy_json(tmp_path: Path) -> None:
+    context = ToolContext.build(base_path=tmp_path)
+    legacy = context.data_dir / "todo.json"
+    legacy.write_text(
+        json.dumps([{"id": 7, "title": "Legacy item", "completed": True, "created_at": "2024-01-01T00:00:00"}]),
+        encoding="utf-8",
+    )
+
+    store = TodoStore(context.data_dir / "todo.db")
+    (entry,) = store.list()
+    assert (entry.id, entry.title, entry.completed) == (7, "Legacy item", True)
+    assert not legacy.exists()
+    assert store.add("Next item").id == 8
+
+
+def test_todo_concurrent_writers_keep_every_item(tmp_path: Path) -> None:
+    import threading
+
+    store_path = tmp_path / "todo.db"
+    TodoStore(store_path)
+
+    def worker(prefix: str) -> None:
+        store = TodoStore(store_path)
+        for index in range(25):
+            store.add(f"{prefix}-{index}")
+
+    threads = [threading.Thread(target=worker, args=(f"t{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [entry.id for entry in TodoStore(store_path).list()]
+    assert len(ids) == 100
+    assert len(set(ids)) == 100
+
+
 def test_safe_shell_whitelist(tmp_path: Path) -> None:
     context = ToolContext.build(base_path=tmp_path)
     command = next(iter(SAFE_COMMAND_WHITELIST))
@@ -45,3 +101,152 @@ def test_safe_shell_whitelist(tmp_path: Path) -> None:
 
     with pytest.raises(PermissionError):
         safe_shell(SafeShellInput(command="rm -rf /"), context)
+
+
+def _write_docs(root: Path, count: int) -> None:
+    for index in range(count):
+        folder = root / "docs" / f"part{index % 3}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"note{index:03d}.md").write_text(f"Note {index} opens here. Second line.", encoding="utf-8")
+    (root / "docs" / "skip.log").write_text("not matched", encoding="utf-8")
+
+
+def test_summarize_tree_is_ordered_and_cached(tmp_path: Path) -> None:
+    _write_docs(tmp_path, 24)
+    context = ToolContext.build(base_path=tmp_path)
+    params = SummarizeTreeInput(path="docs", exclude=["part2/*"], max_sentences=1, workers=4)
+
+    first = summarize_tree(params, context)
+    second = summarize_tree(params, context)
+
+    headings = [line for line in first.splitlines() if line.startswith("## ")]
+    assert headings == sorted(headings)
+    assert len(headings) == 16 and not any("part2" in line for line in headings)
+    assert "- Note 0 opens here." in first and "skip.log" not in first
+    assert first == second
+    assert (context.data_dir / "tree_summaries.json").exists()
+
+
+def test_summary_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    from src.tools.tree import SummaryCache, _pool_context
+
+    files = []
+    for index in range(3):
+        path = tmp_path / f"f{index}.md"
+        path.write_text(f"File {index}.", encoding="utf-8")
+        files.append(path)
+    cache = SummaryCache(tmp_path / "cache.json", max_entries=2)
+    cache.put(files[0], 1, "zero")
+    cache.put(files[1], 1, "one")
+    assert cache.get(files[0], 1) == "zero"
+    cache.put(files[2], 1, "two")
+
+    assert len(cache) == 2
+    assert cache.get(files[1], 1) is None and cache.get(files[0], 1) == "zero"
+    assert _pool_context().get_start_method() != "fork"
+
+
+def test_summarize_tree_limits(tmp_path: Path) -> None:
+    _write_docs(tmp_path, 30)
+    context = ToolContext.build(base_path=tmp_path)
+
+    limited = summarize_tree(SummarizeTreeInput(path="docs", max_files=5), context)
+    assert limited.count("## ") == 5 and "25 more files skipped" in limited
+
+    capped = summarize_tree(SummarizeTreeInput(path="docs", max_output_chars=500), context)
+    assert len(capped) < 700 and "Output stopped after" in capped
+
+
+def test_result_store_and_read_result(tmp_path: Path) -> None:
+    context = ToolContext.build(base_path=tmp_path)
+    text = "\n".join(f"line {index}" for index in range(1, 501))
+    store = ResultStore.for_context(context)
+
+    handle = store.put(text)
+    assert store.put(text) == handle
+    assert len(list((context.data_dir / "results").rglob("*.txt"))) == 1
+
+    lines = read_result(ReadResultInput(handle=handle, start_line=10, end_line=12), context)
+    assert lines.splitlines()[:3] == ["line 10", "line 11", "line 12"]
+    assert "[lines 10-12 of 500]" in lines
+    sliced = read_result(ReadResultInput(handle=handle, offset=0, length=6), context)
+    assert sliced.startswith("line 1\n[chars 0-6 of")
+
+    shown = preview(text, handle, max_tokens=40)
+    assert shown.startswith("line 1\n") and handle in shown and len(shown) < 400
+    hint = json.loads(shown[shown.index("{") : shown.rindex("}") + 1])
+    assert hint["start_line"] == shown.count("\n") + 1 and hint["end_line"] == hint["start_line"] + 39
+    assert read_result(ReadResultInput(**hint), context).startswith(f"line {hint['start_line']}\n")
+
+    wide = "y" * 1000 + "\nsecond line"
+    wide_preview = preview(wide, store.put(wide), max_tokens=40)
+    wide_hint = json.loads(wide_preview[wide_preview.index("{") : wide_preview.rindex("}") + 1])
+    assert wide_hint["offset"] == 160 and "start_line" not in wide_hint
+
+    with pytest.raises(ValueError):
+        read_result(ReadResultInput(handle="../../etc/passwd"), context)
+
+
+def test_result_store_evicts_least_recently_used(tmp_path: Path) -> None:
+    store = ResultStore(tmp_path / "results", max_bytes=2500)
+    first = store.put("a" * 1000)
+    second = store.put("b" * 1000)
+    os.utime(store._path(first), (1, 1))
+    os.utime(store._path(second), (2, 2))
+    store.get(first)  # reading refreshes it, so the older second result goes first
+
+    third = store.put("c" * 1000)
+
+    assert store.get(first) == "a" * 1000 and store.get(third) == "c" * 1000
+    with pytest.raises(FileNotFoundError, match="evicted"):
+        store.get(second)
+
+
+def test_intent_router_matches_only_unambiguous_phrasings() -> None:
+    router = IntentRouter(ToolRegistry([TODO_TOOL, SUMMARIZE_FILE_TOOL]), allow_side_effects=True)
+
+    listed = router.match("Show me my open tasks please.")
+    assert listed is not None and listed.args == {"operation": "list", "status": "open"}
+    added = router.match("add buy eggs to my todo list")
+    assert added is not None and added.args == {"operation": "add", "title": "buy eggs"}
+    summary = router.match("can you summarize docs/notes.md?")
+    assert summary is not None and (summary.tool, summary.args) == ("summarize_file", {"path": "docs/notes.md"})
+
+    assert router.match("what tasks should I prioritise this week") is None
+    assert router.match("summarize the meeting and add a task") is None
+    assert router.stats.attempts == 5
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "create a task scheduler in python",
+        "add a task queue to my flask app",
+        "create a todo list app with react",
+        "add a todo to buy milk",
+        "add a todo list to the sidebar",
+    ],
+)
+def test_todo_intents_need_an_explicit_delimiter(text: str) -> None:
+    router = IntentRouter(ToolRegistry([TODO_TOOL]), allow_side_effects=True)
+
+    assert router.match(text) is None
+
+
+def test_intent_router_skips_side_effects_unless_allowed() -> None:
+    registry = ToolRegistry([TODO_TOOL])
+
+    assert IntentRouter(registry).match("add todo: buy milk") is None
+    assert IntentRouter(registry).match("mark todo 1 as done") is None
+    added = IntentRouter(registry, allow_side_effects=True).match("add todo: buy milk")
+    assert added is not None and added.args == {"operation": "add", "title": "buy milk"}
+
+
+def test_intent_router_rejects_matches_from_several_tools() -> None:
+    echo = ToolSpec(
+        "echo", "Echo.", SafeShellInput, lambda params, context: "", intents=[IntentPattern(r"list my (?:todos|tasks)")]
+    )
+    router = IntentRouter(ToolRegistry([TODO_TOOL, echo]))
+
+    assert router.match("list my todos") is None
+    assert router.stats.ambiguous == 1
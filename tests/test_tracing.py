@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from src.agent_core import AgentCore, AgentState
+from src.replay import RecordedModel, compare, core_from_config, replay
+from src.tools import ToolContext, ToolRegistry
+from src.tools.todo import TODO_TOOL
+from src.tracing import TraceRecorder, load_traces
+
+
+def _registry(base_path: Path) -> ToolRegistry:
+    registry = ToolRegistry(default_context=ToolContext.build(base_path=base_path))
+    registry.register(TODO_TOOL)
+    return registry
+
+
+def _record(tmp_path: Path, trace_path: Path, sessions: int = 3) -> None:
+    tool_call = '{"tool": "todo", "args": {"operation": "add", "title": "water plants"}}'
+    replies = iter([tool_call, "Added it.", "You're welcome."] * sessions)
+
+    def fake_completion(messages, settings=None, on_token=None, cancel=None):
+        return next(replies)
+
+    core = AgentCore(
+        tool_registry=_registry(tmp_path),
+        base_path=tmp_path,
+        completion_fn=fake_completion,
+        recorder=TraceRecorder(trace_path),
+        fast_path=False,
+    )
+    for _ in range(sessions):
+        state = AgentState()
+        core.process_turn("remind me to water the plants", state=state)
+        core.process_turn("thanks", state=state)
+
+
+def test_trace_is_compact_and_round_trips(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    _record(tmp_path / "work", trace_path)
+
+    records = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").splitlines()]
+    blobs = [record for record in records if record["type"] == "blob"]
+    turns = [record for record in records if record["type"] == "turn"]
+    assert len(turns) == 6
+    # The system prompt is repeated by every call but stored once.
+    assert len({blob["id"] for blob in blobs}) == len(blobs)
+    assert any("ref" in message for message in turns[-1]["calls"][0]["prompts"][0])
+
+    traces = load_traces(trace_path)
+    assert [trace.index for trace in traces] == [0, 1] * 3
+    assert len({trace.session for trace in traces}) == 3
+    first = traces[0]
+    assert first.user == "remind me to water the plants"
+    assert [call.kind for call in first.calls] == ["completion", "completion"]
+    assert first.calls[0].prompts[0][0]["role"] == "system"
+    assert len(first.calls[0].prompts[0][0]["content"]) >= 200
+    assert [tool.name for tool in first.tools] == ["todo"]
+    assert first.seconds > 0
+
+
+def test_recorded_replay_reports_latency(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    _record(tmp_path / "work", trace_path)
+    traces = load_traces(trace_path)
+
+    recorded = RecordedModel()
+    scratch = tmp_path / "replay"
+    core = AgentCore(
+        tool_registry=_registry(scratch),
+        base_path=scratch,
+        completion_fn=recorded.completion_fn,
+        batch_fn=recorded.batch_fn,
+        fast_path=False,
+    )
+    report = replay(core, traces, concurrency=3, recorded=recorded)
+
+    assert report.turns == 6
+    assert report.errors == 0
+    assert report.diverged == 0
+    assert sum(row["count"] for row in report.histogram()) == 6
+    summary = report.summary()
+    assert 0 < summary["p50"] <= summary["p99"] <= summary["max"]
+    assert report.render_histogram()
+
+    report_path = tmp_path / "report.json"
+    report.write(report_path)
+    assert json.loads(report_path.read_text(encoding="utf-8"))["turns"] == 6
+    assert set(compare(report, report_path)) == {"p50", "p90", "p99"}
+
+
+def test_recorded_replay_counts_divergence(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    _record(tmp_path / "work", trace_path, sessions=1)
+    traces = load_traces(trace_path)
+    for trace in traces:
+        trace.calls = trace.calls[:1]
+
+    recorded = RecordedModel()
+    core = AgentCore(
+        tool_registry=_registry(tmp_path / "replay"),
+        base_path=tmp_path / "replay",
+        completion_fn=recorded.completion_fn,
+        fast_path=False,
+    )
+    report = replay(core, traces, concurrency=1, recorded=recorded)
+
+    assert report.turns == 2
+    assert report.diverged == 1
+
+
+def test_replay_rebuilds_the_recorded_core(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    replies = iter(["Research notes.", "1. Step one.", "Plain answer."])
+
+    def fake_batch(conversations, settings=None, cancel=None):
+        return [next(replies) for _ in conversations]
+
+    core = AgentCore(
+        tool_registry=_registry(tmp_path / "work"),
+        base_path=tmp_path / "work",
+        completion_fn=lambda messages, **kwargs: next(replies),
+        batch_fn=fake_batch,
+        recorder=TraceRecorder(trace_path),
+        fan_out_agents=["Researcher", "Planner"],
+        fast_path=False,
+        turn_timeout=30.0,
+    )
+    state = AgentState()
+    core.process_turn("plan my week", state=state)
+    core.set_fan_out([])
+    core.process_turn("thanks", state=state)
+
+    records = [json.loads(line) for line in trace_path.read_text(encoding="utf-8").splitlines()]
+    headers = [record for record in records if record["type"] == "header"]
+    assert len(headers) == 2
+    assert headers[0]["config"]["fan_out_agents"] == ["Researcher", "Planner"]
+    assert headers[0]["config"]["fast_path"] is False and headers[0]["config"]["memory"] is False
+
+    traces = load_traces(trace_path)
+    assert [trace.config["fan_out_agents"] for trace in traces] == [["Researcher", "Planner"], []]
+    assert [call.kind for call in traces[0].calls] == ["batch"]
+
+    recorded = RecordedModel()
+    rebuilt = core_from_config(
+        traces[0].config,
+        tool_registry=_registry(tmp_path / "replay"),
+        base_path=tmp_path / "replay",
+        completion_fn=recorded.completion_fn,
+        batch_fn=recorded.batch_fn,
+    )
+    assert rebuilt.core_config() == traces[0].config
+    assert rebuilt.intent_router is None and rebuilt.turn_timeout == 30.0
+
+    report = replay(rebuilt, traces[:1], concurrency=1, recorded=recorded)
+    assert report.turns == 1 and report.diverged == 0 and report.errors == 0
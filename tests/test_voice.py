@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import math
+import wave
+from array import array
+from pathlib import Path
+
+from src.voice import SAMPLE_RATE, EnergyVAD, SentenceStreamer, WavFileSource
+
+
+def _write_wav(path: Path, pattern: list[tuple[float, bool]]) -> None:
+    samples = array("h")
+    for seconds, loud in pattern:
+        count = int(seconds * SAMPLE_RATE)
+        amplitude = 8000 if loud else 20
+        samples.extend(int(amplitude * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) for i in range(count))
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+
+
+def test_vad_splits_wav_into_utterances(tmp_path: Path) -> None:
+    sample = tmp_path / "speech.wav"
+    _write_wav(sample, [(0.5, False), (0.6, True), (1.0, False), (0.8, True), (0.9, False)])
+
+    segments = list(EnergyVAD().segments(WavFileSource(sample).frames()))
+    assert len(segments) == 2
+    assert all(len(segment) > 0.5 * SAMPLE_RATE * 2 for segment in segments)
+
+
+def test_vad_stops_after_start_timeout(tmp_path: Path) -> None:
+    sample = tmp_path / "silence.wav"
+    _write_wav(sample, [(3.0, False), (0.6, True)])
+
+    assert list(EnergyVAD().segments(WavFileSource(sample).frames(), start_timeout_s=1.0)) == []
+
+
+def test_sentence_streamer_emits_complete_sentences() -> None:
+    spoken: list[str] = []
+    streamer = SentenceStreamer(spoken.append)
+    for token in ["Hello", " there.", " How are", " you? I am", " fine"]:
+        streamer(token)
+    assert spoken == ["Hello there.", "How are you?"]
+    streamer.flush()
+    assert spoken[-1] == "I am fine"
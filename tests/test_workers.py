@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from src.tools import ToolContext, ToolRegistry, ToolSpec
+from src.tools.workers import WORKERS_SUPPORTED, ToolExecutor, WorkerLimits
+
+pytestmark = pytest.mark.skipif(not WORKERS_SUPPORTED, reason="worker pools need fork + rlimits")
+
+
+class SleepInput(BaseModel):
+    seconds: float = 0.0
+
+
+def _pid(params: SleepInput, context: ToolContext) -> str:
+    time.sleep(params.seconds)
+    return str(os.getpid())
+
+
+def _ppid(params: SleepInput, context: ToolContext) -> str:
+    return str(os.getppid())
+
+
+def _fail(params: SleepInput, context: ToolContext) -> str:
+    raise PermissionError("nope")
+
+
+def _allocate(params: SleepInput, context: ToolContext) -> str:
+    return str(len(bytearray(256 * 1024 * 1024)))
+
+
+def _registry() -> ToolRegistry:
+    return ToolRegistry(
+        tools=[
+            ToolSpec(name="pid", description="Return worker pid.", input_model=SleepInput, handler=_pid),
+            ToolSpec(name="ppid", description="Return worker parent pid.", input_model=SleepInput, handler=_ppid),
+            ToolSpec(name="fail", description="Always fails.", input_model=SleepInput, handler=_fail),
+            ToolSpec(name="allocate", description="Allocate memory.", input_model=SleepInput, handler=_allocate),
+        ]
+    )
+
+
+def test_calls_run_in_recycled_workers(tmp_path: Path) -> None:
+    context = ToolContext.build(base_path=tmp_path)
+    executor = ToolExecutor(_registry(), default_limits=WorkerLimits(max_calls=2))
+    try:
+        pids = [executor.call("pid", {}, context) for _ in range(3)]
+        assert str(os.getpid()) not in pids
+        assert pids[0] == pids[1] != pids[2]
+
+        with pytest.raises(PermissionError):
+            executor.call("fail", {}, context)
+    finally:
+        executor.shutdown()
+
+
+def test_timeout_and_memory_limits(tmp_path: Path) -> None:
+    context = ToolContext.build(base_path=tmp_path)
+    executor = ToolExecutor(
+        _registry(),
+        tool_limits={
+            "pid": WorkerLimits(timeout=0.5),
+            "allocate": WorkerLimits(memory_mb=64),
+        },
+    )
+    try:
+        with pytest.raises(TimeoutError):
+            executor.call("pid", {"seconds": 5}, context)
+        assert executor.call("pid", {}, context).isdigit()
+
+        with pytest.raises(MemoryError):
+            executor.call("allocate", {}, context)
+    finally:
+        executor.shutdown()
+
+
+def test_cancelled_call_frees_the_worker(tmp_path: Path) -> None:
+    import threading
+
+    from src.cancellation import CancellationToken, CancelledError
+
+    context = ToolContext.build(base_path=tmp_path)
+    executor = ToolExecutor(_registry())
+    try:
+        token = CancellationToken()
+        threading.Timer(0.2, token.cancel).start()
+        start = time.perf_counter()
+        with pytest.raises(CancelledError):
+            executor.call("pid", {"seconds": 10}, context, cancel=token)
+        assert time.perf_counter() - start < 2
+        assert executor.call("pid", {}, context).isdigit()
+    finally:
+        executor.shutdown()
+
+
+def test_replacement_workers_are_forked_by_the_zygote(tmp_path: Path) -> None:
+    context = ToolContext.build(base_path=tmp_path)
+    executor = ToolExecutor(_registry(), default_limits=WorkerLimits(timeout=0.5, max_calls=1))
+    try:
+        executor.start()
+        parents = {executor.call("ppid", {}, context) for _ in range(3)}
+        with pytest.raises(TimeoutError):
+            executor.call("pid", {"seconds": 5}, context)
+        parents.add(executor.call("ppid", {}, context))
+        # Every worker, including replacements after recycling and a timeout, has the same non-caller parent.
+        assert len(parents) == 1
+        assert str(os.getpid()) not in parents
+    finally:
+        executor.shutdown()